@@ -1,74 +1,317 @@
-import pyautogui
-from Rotation2Vector import Vector
+from Rotation2Vector import Vector, CursorMapper
+from inputBackends import InputBackend, create_backend
+from screenGeometry import ScreenGeometry
+from cursorFilters import EmaFilter
 import time
+import threading
+from collections import deque
 
 CLICK_PAUSE_TIME = 0.1
+DEFAULT_OUTPUT_RATE = 60  # cursor moves per second, roughly the monitor refresh rate
+LATENCY_HISTORY = 300  # frame-to-cursor latencies kept for get_output_latencies
+SCROLL_RATE = 60  # wheel events per second at most while scrolling, independent of the camera
+SCROLL_MAX_SPEED = 40  # wheel clicks per second at full head tilt
+SCROLL_DEADZONE = 0.1  # head vector offset from where scroll mode started that does not scroll
+SCROLL_EXPONENT = 2  # higher keeps small tilts slow
+SCROLL_STALE_SECONDS = 0.5  # stop scrolling when no head update arrived for this long (face lost)
 
-# One blink for left click, two blinks for right click, three blinks for double click
+# Blinks in quick succession click: two for left click, three for right click,
+# four or more for double click; a single blink is a normal blink and expires
+# All OS input calls happen on the output thread, the vision loop only posts
+# the latest cursor target (single-slot mailbox) and queues clicks
+# backend is an InputBackend or a name for create_backend ("auto", "pyautogui", "xlib", "recording")
+# cursor_filter is a CursorFilter from cursorFilters.py, defaults to an EMA with smoothing_alpha
+# cursor_mapper picks absolute/relative/hybrid mapping, see CursorMapper in Rotation2Vector.py
+# screen is a ScreenGeometry, defaults to the backend's monitor layout across the whole desktop
+# Stateful modes: scroll mode turns head pitch into a wheel velocity that the
+# output thread emits at SCROLL_RATE, drag-lock holds the left button while the
+# cursor moves, and held keys stay down until released.
 class Mouse:
-    def __init__(self, click_interval=0.2, smoothing_alpha=0.2):
-        self.size = pyautogui.size()
+    def __init__(self, click_interval=0.2, smoothing_alpha=0.2, output_rate=DEFAULT_OUTPUT_RATE, backend="auto",
+                 cursor_filter=None, cursor_mapper=None, screen=None):
+        self.backend = backend if isinstance(backend, InputBackend) else create_backend(backend)
+        self.screen = screen if screen is not None else ScreenGeometry(self.backend.layout_provider(),
+                                                                       fallback_size=self.backend.screen_size())
+        self.screen.watch()  # layout changes are picked up in the background, never per frame
+        self.screen_version = self.screen.version
         self.position = Vector(0, 0)
-        pyautogui.FAILSAFE = False
 
         self.click_count = 0
-        self.last_click_time = time.time()
+        # all click timing uses the perf_counter clock, same as frame timestamps
+        self.last_click_time = time.perf_counter()
 
         self.smoothing_alpha = smoothing_alpha
+        self.cursor_filter = cursor_filter if cursor_filter is not None else EmaFilter(smoothing_alpha)
+        self.setCursorMapper(cursor_mapper if cursor_mapper is not None else CursorMapper())
 
-        self.smoothed_vector = Vector(0,0)
-        self.last_action_time = time.time()
+        self.last_action_time = time.perf_counter()
 
         self.click_interval = click_interval
 
+        self.output_rate = output_rate
+        self.target = None
+        self.pending_actions = deque()
+        self.output_latencies = deque(maxlen=LATENCY_HISTORY)
+        self.output_condition = threading.Condition()
+        self.output_errors = 0
+        self.last_output_error = None
+
+        self.scroll_mode = False
+        self.scroll_anchor = None  # head vector y when scroll mode started
+        self.scroll_velocity = 0.0  # wheel clicks per second, positive scrolls up
+        self.scroll_update_time = None
+        self.scroll_remainder = 0.0
+        self.scroll_tick_time = None
+        self.dragging = False
+        self.held_keys = []
+
+        self.running = True
+        self.output_thread = threading.Thread(target=self.__output_loop, name="mouse-output", daemon=True)
+        self.output_thread.start()
+
+    def close(self, timeout=1.0):
+        # nothing stays pressed after the app exits
+        self.stop_drag()
+        self.release_keys()
+        with self.output_condition:
+            self.running = False
+            self.output_condition.notify()
+        self.output_thread.join(timeout)
+        self.screen.close()
+        self.backend.close()
+
+    def setOutputRate(self, newRate):
+        self.output_rate = newRate
+
+    def setCursorFilter(self, newFilter):
+        self.cursor_filter = newFilter
+
+    def setCursorMapper(self, newMapper):
+        # speeds in relative and hybrid mode depend on the screen size, in logical pixels so
+        # they feel the same on high-DPI displays
+        newMapper.calibrate(self.screen.logical_size)
+        self.cursor_mapper = newMapper
+
+    # (width, height) the cursor vector spans, in backend pixels
+    @property
+    def size(self):
+        return self.screen.size
+
+    # cursor range: "desktop" (all monitors) or "monitor" (the active one)
+    def setScreenSpan(self, span):
+        self.screen.set_span(span)
+
+    def nextMonitor(self):
+        return self.screen.next_monitor()
+
     def setClickInterval(self, newInterval):
         self.click_interval = newInterval
 
     def vector2pos(self, vector):
-        return Vector((1 + vector.x) * (self.size[0] / 2), (1 - vector.y) * (self.size[1] / 2))
+        return Vector(*self.screen.vector_to_pos(vector.x, vector.y))
+
+    # frame_time is the perf_counter timestamp of the camera frame behind this move,
+    # used to measure frame-to-cursor latency
+    def moveCursor(self, new_vector, frame_time=None):
+        # filter with the frame's own timestamp so the filter sees the real frame timing
+        if frame_time is None:
+            frame_time = time.perf_counter()
+        if frame_time - self.last_action_time < CLICK_PAUSE_TIME:
+            return
+
+        if self.screen.version != self.screen_version:
+            # monitors or span changed, relative speeds follow the new size
+            self.screen_version = self.screen.version
+            self.cursor_mapper.calibrate(self.screen.logical_size)
 
-    def moveCursor(self, new_vector):
-        # apply exponential smoothing to the new_vector
+        smoothed_vector = self.cursor_filter.filter(new_vector, frame_time)
+        new_pos = self.vector2pos(self.cursor_mapper.map(smoothed_vector, frame_time))
+        self.position = new_pos  # latest target, the output thread may still be emitting an older one
+        with self.output_condition:
+            # overwrite any target the output thread has not emitted yet
+            self.target = (new_pos, frame_time)
+            self.output_condition.notify()
 
-        if time.time() - self.last_action_time < CLICK_PAUSE_TIME:
+    # needs to be called in loop, now defaults to time.perf_counter(). blinking is True
+    # while the eyes are closed: blinks are only registered when the eyes reopen, so
+    # the gap between blinks is timed from one reopening to the next closure
+    def checkClick(self, verbose= False, now=None, blinking=False):
+        if now is None:
+            now = time.perf_counter()
+        if self.click_count == 0 or blinking or (now - self.last_click_time) <= self.click_interval:
             return
+        if self.click_count == 1:
+            self.click_count = 0  # a lone blink, must not add up with the next one
+            return
+        if self.click_count == 2:
+            self.left_click()
+            if verbose: print("left click")
+        elif self.click_count == 3:
+            self.right_click()
+            if verbose: print("right click")
+        else:
+            self.double_click()
+            if verbose: print("double click")
+        self.click_count = 0
+        self.last_action_time = now
 
-        self.smoothed_vector.x = (
-            self.smoothing_alpha * new_vector.x +
-            (1 - self.smoothing_alpha) * self.smoothed_vector.x
-        )
-
-        self.smoothed_vector.y = (
-            self.smoothing_alpha * new_vector.y +
-            (1 - self.smoothing_alpha) * self.smoothed_vector.y
-        )
-        new_pos = self.vector2pos(self.smoothed_vector)
-        pyautogui.moveTo(new_pos.x, new_pos.y)
-
-    # needs to be called in loop
-    def checkClick(self, verbose= False):
-        if self.click_count > 1 and (time.time() - self.last_click_time) > self.click_interval:
-            if self.click_count == 2:
-                pyautogui.leftClick()
-                if verbose: print("left click")
-            elif self.click_count == 3:
-                pyautogui.rightClick()
-                if verbose: print("right click")
-            else:
-                pyautogui.doubleClick()
-                if verbose: print("double click")
-            self.click_count = 0
-            self.last_action_time = time.time()
-
-    def registerClick(self):
+    # called once per blink event, timestamp is when the eyes reopened
+    def registerClick(self, timestamp=None):
         self.click_count += 1
-        self.last_click_time = time.time()
+        self.last_click_time = timestamp if timestamp is not None else time.perf_counter()
 
     def left_click(self):
-        pyautogui.leftClick()
+        self.__post_action(self.backend.click)
 
     def right_click(self):
-        pyautogui.rightClick()
+        self.__post_action(self.backend.right_click)
 
     def double_click(self):
-        pyautogui.doubleClick()
+        self.__post_action(self.backend.double_click)
+
+    def type_text(self, text):
+        self.__post_action(lambda: self.backend.type_text(text))
+
+    def press_key(self, key):
+        self.__post_action(lambda: self.backend.press_key(key))
+
+    # one-off wheel clicks, positive scrolls up
+    def scroll(self, clicks):
+        self.__post_action(lambda: self.backend.scroll(clicks))
+
+    def setScrollMode(self, enabled):
+        with self.output_condition:
+            self.scroll_mode = enabled
+            self.scroll_anchor = None
+            self.scroll_velocity = 0.0
+            self.scroll_remainder = 0.0
+            self.scroll_tick_time = None
+            self.output_condition.notify()
+
+    # In scroll mode the head vector sets the wheel velocity instead of moving the
+    # cursor; tilting up/down from where scroll mode started scrolls up/down
+    def scrollWithVector(self, vector, frame_time=None):
+        if frame_time is None:
+            frame_time = time.perf_counter()
+        if self.scroll_anchor is None:
+            self.scroll_anchor = vector.y
+        offset = vector.y - self.scroll_anchor
+        magnitude = min(1.0, abs(offset))
+        if magnitude <= SCROLL_DEADZONE:
+            velocity = 0.0
+        else:
+            velocity = SCROLL_MAX_SPEED * ((magnitude - SCROLL_DEADZONE) / (1 - SCROLL_DEADZONE)) ** SCROLL_EXPONENT
+            velocity = velocity if offset > 0 else -velocity
+        with self.output_condition:
+            self.scroll_velocity = velocity
+            self.scroll_update_time = frame_time
+            self.output_condition.notify()
+
+    # drag-lock: left button down until stop_drag, the cursor keeps following the head
+    def start_drag(self):
+        if not self.dragging:
+            self.dragging = True
+            self.__post_action(self.backend.mouse_down)
+
+    def stop_drag(self):
+        if self.dragging:
+            self.dragging = False
+            self.__post_action(self.backend.mouse_up)
+
+    # modifier (or any key) held until release_keys, e.g. shift for range selection
+    def hold_key(self, key):
+        if key not in self.held_keys:
+            self.held_keys.append(key)
+            self.__post_action(lambda: self.backend.key_down(key))
+
+    def release_keys(self):
+        for key in reversed(self.held_keys):
+            self.__post_action(lambda key=key: self.backend.key_up(key))
+        self.held_keys = []
+
+    # runs action on the output thread in order with the clicks, for callers that
+    # talk to self.backend directly (see KeystrokeBatcher in dictationSession.py)
+    def post_action(self, action):
+        self.__post_action(action)
+
+    # seconds from camera frame to cursor event for the most recent moves
+    def get_output_latencies(self):
+        return list(self.output_latencies)
+
+    def __post_action(self, action):
+        with self.output_condition:
+            self.pending_actions.append(action)
+            self.output_condition.notify()
+
+    # True while scroll mode has a fresh, non-zero velocity to emit
+    def __scrolling(self, now):
+        return (self.scroll_mode and self.scroll_velocity != 0 and self.scroll_update_time is not None
+                and now - self.scroll_update_time < SCROLL_STALE_SECONDS)
+
+    # seconds until the next move or scroll tick is due (0 = now), None if neither is pending
+    def __next_due(self, next_move_time, next_scroll_time):
+        now = time.perf_counter()
+        due = []
+        if self.target is not None:
+            due.append(next_move_time - now)
+        if self.__scrolling(now):
+            due.append(next_scroll_time - now)
+        return max(0.0, min(due)) if due else None
+
+    def __output_loop(self):
+        next_move_time = 0
+        next_scroll_time = 0
+        while True:
+            with self.output_condition:
+                # sleep until there is a click to run, a target that is due or a scroll tick
+                while self.running and not self.pending_actions:
+                    timeout = self.__next_due(next_move_time, next_scroll_time)
+                    if timeout == 0:
+                        break
+                    self.output_condition.wait(timeout)
+                actions = list(self.pending_actions)
+                self.pending_actions.clear()
+                target = None
+                if self.target is not None and time.perf_counter() >= next_move_time:
+                    target, self.target = self.target, None
+
+                # wheel clicks for the time since the last tick, fractions carry over
+                scroll_clicks = 0
+                now = time.perf_counter()
+                if not self.__scrolling(now):
+                    self.scroll_tick_time = None
+                elif now >= next_scroll_time:
+                    if self.scroll_tick_time is not None:
+                        self.scroll_remainder += self.scroll_velocity * min(now - self.scroll_tick_time, 0.1)
+                        scroll_clicks = int(self.scroll_remainder)
+                        self.scroll_remainder -= scroll_clicks
+                    self.scroll_tick_time = now
+                    next_scroll_time = now + 1 / SCROLL_RATE
+
+            # a failing backend call is reported and skipped, the thread has to keep
+            # running or every later move, click and keystroke would be lost
+            for action in actions:
+                self.__run_output(action)
+            if not self.running:
+                return  # after the queued actions, so typed text is not cut off by close()
+            if scroll_clicks:
+                self.__run_output(self.backend.scroll, scroll_clicks)
+            if target is not None:
+                pos, frame_time = target
+                if self.__run_output(self.backend.move, pos.x, pos.y) and frame_time is not None:
+                    self.output_latencies.append(time.perf_counter() - frame_time)
+                if self.output_rate:
+                    next_move_time = time.perf_counter() + 1 / self.output_rate
+
+    # returns False if the call raised
+    def __run_output(self, call, *args):
+        try:
+            call(*args)
+            return True
+        except Exception as e:
+            self.output_errors += 1
+            message = f"Mouse output failed ({self.backend.name}): {e!r}"
+            if message != self.last_output_error:  # a lost display fails every move, report it once
+                print(message)
+                self.last_output_error = message
+            return False
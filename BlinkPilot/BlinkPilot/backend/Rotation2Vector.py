@@ -16,19 +16,112 @@ class Vector:
         self.x = x
         self.y = y
 
+# max_pitch/max_yaw are the head angles that reach the screen edge, a
+# calibration profile can replace the defaults with the user's own range
 class SensitivityParams: 
-    def __init__(self, sensitivity, deadzone):
+    def __init__(self, sensitivity, deadzone, max_pitch=MAX_PITCH, max_yaw=MAX_YAW):
         self.sensitivity = sensitivity
         self.deadzone = deadzone
+        self.max_pitch = max_pitch
+        self.max_yaw = max_yaw
 
 def filterDeadzone(val, deadzone):
     if ((val > 0 and val > deadzone) or (val < 0 and val < deadzone)):
         return val
     return 0
 
-def rot2MouseVector(rotation: RotationVector, sensitivity: SensitivityParams):
+# cursor_filter (see cursorFilters.py) optionally smooths the vector before the
+# deadzone is applied, so jitter around the deadzone edge does not flicker
+def rot2MouseVector(rotation: RotationVector, sensitivity: SensitivityParams, cursor_filter=None, timestamp=None):
     scale = sensitivity.sensitivity
     thresh = sensitivity.deadzone
-    yaw = np.clip(round(rotation.yaw / MAX_YAW, NUM_PLACES_ROUND) * scale, -1, 1)
-    pitch = np.clip(round(rotation.pitch / MAX_PITCH, NUM_PLACES_ROUND) * scale, -1, 1)
-    return Vector(filterDeadzone(yaw, thresh), filterDeadzone(pitch, thresh))
\ No newline at end of file
+    yaw = np.clip(round(rotation.yaw / sensitivity.max_yaw, NUM_PLACES_ROUND) * scale, -1, 1)
+    pitch = np.clip(round(rotation.pitch / sensitivity.max_pitch, NUM_PLACES_ROUND) * scale, -1, 1)
+    if cursor_filter is not None:
+        filtered = cursor_filter.filter(Vector(yaw, pitch), timestamp)
+        yaw, pitch = filtered.x, filtered.y
+    return Vector(filterDeadzone(yaw, thresh), filterDeadzone(pitch, thresh))
+
+# Cursor mapping modes, applied to the [-1, 1] mouse vector:
+# absolute - the vector is the screen position (head angle -> position)
+# relative - the vector is a joystick, its size sets the cursor speed
+# hybrid   - fast head swings jump to the absolute position, small tilts
+#            away from where the swing stopped nudge the cursor like a joystick
+MAPPING_MODES = ("absolute", "relative", "hybrid")
+
+FINE_SPEED_PX = 300  # pixels per second near the deadzone edge, same on every screen
+CROSS_SCREEN_SECONDS = 0.8  # time to cross the screen at full tilt, sets the top speed
+ACCELERATION_EXPONENT = 3  # higher keeps small tilts slow for longer
+RELATIVE_DEADZONE = 0.05
+HYBRID_JUMP_SPEED = 1.5  # mouse-vector units per second that count as a big move
+
+
+class CursorMapper:
+    def __init__(self, mode="absolute", screen_size=(1920, 1080), fine_speed_px=FINE_SPEED_PX,
+                 cross_screen_seconds=CROSS_SCREEN_SECONDS, exponent=ACCELERATION_EXPONENT,
+                 deadzone=RELATIVE_DEADZONE, jump_speed=HYBRID_JUMP_SPEED):
+        if mode not in MAPPING_MODES:
+            raise ValueError(f"Unknown mapping mode '{mode}', expected one of {list(MAPPING_MODES)}")
+        self.mode = mode
+        self.fine_speed_px = fine_speed_px
+        self.cross_screen_seconds = cross_screen_seconds
+        self.exponent = exponent
+        self.deadzone = deadzone
+        self.jump_speed = jump_speed
+
+        self.position = Vector(0, 0)
+        self.anchor = Vector(0, 0)  # hybrid: head vector where the last big move ended
+        self.last_vector = None
+        self.last_time = None
+        self.calibrate(screen_size)
+
+    # speeds are set in pixels, the mapper works in [-1, 1] units, so convert per axis
+    def calibrate(self, screen_size):
+        width, height = screen_size
+        half_size = (width / 2, height / 2)
+        max_speed_px = (width / self.cross_screen_seconds, height / self.cross_screen_seconds)
+        self.fine_speed = tuple(self.fine_speed_px / half for half in half_size)
+        self.max_speed = tuple(max(fine, top / half) for fine, top, half in
+                               zip(self.fine_speed, max_speed_px, half_size))
+
+    def reset(self):
+        self.position = Vector(0, 0)
+        self.anchor = Vector(0, 0)
+        self.last_vector = None
+        self.last_time = None
+
+    # vector comes from rot2MouseVector, returns the absolute [-1, 1] position for Mouse.vector2pos
+    def map(self, vector, timestamp):
+        if self.mode == "absolute":
+            return vector
+
+        dt = 0.0 if self.last_time is None else max(0.0, timestamp - self.last_time)
+        last_vector = self.last_vector
+        self.last_time = timestamp
+        self.last_vector = Vector(vector.x, vector.y)
+
+        if self.mode == "relative":
+            offset = vector
+        else:
+            head_speed = 0.0
+            if last_vector is not None and dt > 0:
+                head_speed = np.hypot(vector.x - last_vector.x, vector.y - last_vector.y) / dt
+            if head_speed > self.jump_speed:
+                self.position = Vector(vector.x, vector.y)
+                self.anchor = Vector(vector.x, vector.y)
+                return Vector(self.position.x, self.position.y)
+            offset = Vector(vector.x - self.anchor.x, vector.y - self.anchor.y)
+
+        self.position.x = float(np.clip(self.position.x + self.__speed(offset.x, 0) * dt, -1, 1))
+        self.position.y = float(np.clip(self.position.y + self.__speed(offset.y, 1) * dt, -1, 1))
+        return Vector(self.position.x, self.position.y)
+
+    # acceleration curve: linear fine speed near the deadzone plus a power term up to the top speed
+    def __speed(self, offset, axis):
+        magnitude = min(1.0, abs(offset))
+        if magnitude <= self.deadzone:
+            return 0.0
+        magnitude = (magnitude - self.deadzone) / (1 - self.deadzone)
+        fine, top = self.fine_speed[axis], self.max_speed[axis]
+        speed = fine * magnitude + (top - fine) * magnitude ** self.exponent
+        return speed if offset > 0 else -speed
@@ -0,0 +1,214 @@
+import threading
+
+import numpy as np
+
+VAD_FRAME_MS = 30  # VAD decision granularity
+PRE_ROLL_MS = 300  # audio kept from before speech onset, so the first syllable reaches the recognizer
+HANGOVER_MS = 400  # silence that has to follow speech before the segment ends
+ONSET_FRAMES = 2  # consecutive loud frames needed to start a segment, single clicks and pops do not count
+SPEECH_RATIO = 3.0  # frame RMS has to be this many times the noise floor to count as speech
+MIN_SPEECH_RMS = 150  # absolute floor for 16-bit audio, keeps a silent room from triggering on hiss
+NOISE_ADAPT = 0.05  # per-frame EMA rate of the noise floor, only updated outside speech
+MAX_SEGMENT_MS = 10000  # longer "speech" is taken as a new, louder background and the floor is reset
+RING_SECONDS = 5.0
+
+
+# Fixed-size int16 ring of captured audio, addressed by absolute sample position
+class AudioRingBuffer:
+    def __init__(self, capacity):
+        self.data = np.zeros(capacity, dtype=np.int16)
+        self.written = 0  # total samples ever written
+        self.closed = False
+        self.condition = threading.Condition()
+
+    @property
+    def oldest(self):
+        return max(0, self.written - len(self.data))
+
+    def write(self, samples):
+        count = len(samples)
+        samples = samples[-len(self.data):]  # only the newest capacity samples survive anyway
+        with self.condition:
+            start = (self.written + count - len(samples)) % len(self.data)
+            first = min(len(samples), len(self.data) - start)
+            self.data[start:start + first] = samples[:first]
+            self.data[:len(samples) - first] = samples[first:]
+            self.written += count
+            self.condition.notify_all()
+
+    # samples [start, end), start must not be older than self.oldest
+    def read(self, start, end):
+        with self.condition:
+            indices = np.arange(start, end) % len(self.data)
+            samples = self.data[indices]
+            self.condition.notify_all()  # wakes a lossless writer waiting for space
+            return samples
+
+    # blocks until position samples are available (True) or the buffer is closed and drained (False)
+    def wait_for(self, position, timeout=None):
+        with self.condition:
+            while self.written < position and not self.closed:
+                if not self.condition.wait(timeout):
+                    return self.written >= position
+            return self.written >= position
+
+    # blocks a lossless writer until the reader is within capacity
+    def wait_for_space(self, reader_position, count):
+        with self.condition:
+            while self.written + count - reader_position() > len(self.data) and not self.closed:
+                self.condition.wait()
+
+    def close(self):
+        with self.condition:
+            self.closed = True
+            self.condition.notify_all()
+
+
+# Energy VAD whose threshold follows the ambient noise floor, with onset and
+# hangover so one segment covers a whole command including short pauses.
+# The floor cannot learn during speech, so a segment that outlasts max_segment_ms
+# (a fan or music switched on) is ended and the floor restarts from its quietest frame.
+class AdaptiveVad:
+    def __init__(self, frame_ms=VAD_FRAME_MS, speech_ratio=SPEECH_RATIO, min_rms=MIN_SPEECH_RMS,
+                 onset_frames=ONSET_FRAMES, hangover_ms=HANGOVER_MS, noise_adapt=NOISE_ADAPT,
+                 max_segment_ms=MAX_SEGMENT_MS):
+        self.speech_ratio = speech_ratio
+        self.min_rms = min_rms
+        self.onset_frames = onset_frames
+        self.hangover_frames = max(1, hangover_ms // frame_ms)
+        self.max_segment_frames = max(1, max_segment_ms // frame_ms)
+        self.noise_adapt = noise_adapt
+
+        self.noise_floor = None
+        self.active = False
+        self.loud_run = 0
+        self.quiet_run = 0
+        self.segment_frames = 0
+        self.segment_min_energy = None
+        self.floor_resets = 0
+
+    def threshold(self):
+        return max(self.min_rms, (self.noise_floor or 0.0) * self.speech_ratio)
+
+    # returns whether a segment is active after this frame
+    def update(self, frame):
+        energy = float(np.sqrt(np.mean(frame.astype(np.float32) ** 2))) if len(frame) else 0.0
+        if self.noise_floor is None:
+            self.noise_floor = energy
+        loud = energy > self.threshold()
+
+        if not self.active:
+            # the floor only learns from frames that are not part of speech
+            if not loud:
+                self.noise_floor += self.noise_adapt * (energy - self.noise_floor)
+            self.loud_run = self.loud_run + 1 if loud else 0
+            if self.loud_run >= self.onset_frames:
+                self.active = True
+                self.quiet_run = 0
+                self.segment_frames = 0
+                self.segment_min_energy = energy
+            return self.active
+
+        self.segment_frames += 1
+        self.segment_min_energy = min(self.segment_min_energy, energy)
+        if self.segment_frames >= self.max_segment_frames:
+            self.noise_floor = self.segment_min_energy
+            self.floor_resets += 1
+            self.active = False
+            self.loud_run = 0
+            return self.active
+
+        self.quiet_run = 0 if loud else self.quiet_run + 1
+        if self.quiet_run >= self.hangover_frames:
+            self.active = False
+            self.loud_run = 0
+        return self.active
+
+
+# Captures audio on its own thread into an AudioRingBuffer and, when iterated,
+# yields only speech: PCM chunks from PRE_ROLL_MS before onset until the VAD
+# hangover ends, then None to mark the end of the segment.
+# source is a MicrophoneSource/WavFileSource; lossless makes capture wait for
+# the reader instead of overwriting, for files that are read faster than real time.
+class AudioFrontEnd:
+    def __init__(self, source, vad=None, pre_roll_ms=PRE_ROLL_MS, ring_seconds=RING_SECONDS, lossless=False):
+        self.source = source
+        self.sample_rate = source.sample_rate
+        self.vad = vad if vad is not None else AdaptiveVad()
+        self.frame_samples = self.sample_rate * VAD_FRAME_MS // 1000
+        self.pre_roll_samples = self.sample_rate * pre_roll_ms // 1000
+        self.ring = AudioRingBuffer(int(self.sample_rate * ring_seconds))
+        self.lossless = lossless
+
+        self.read_position = 0
+        self.frames_seen = 0
+        self.frames_sent = 0
+        self.overruns = 0
+        self.running = False
+        self.capture_thread = None
+
+    # seconds of captured audio the VAD has looked at
+    @property
+    def stream_time(self):
+        return self.read_position / self.sample_rate
+
+    def start(self):
+        if self.running:
+            return
+        self.running = True
+        self.capture_thread = threading.Thread(target=self.__capture_loop, name="audio-capture", daemon=True)
+        self.capture_thread.start()
+
+    def close(self, timeout=1.0):
+        self.running = False
+        self.ring.close()
+        if self.capture_thread is not None and self.capture_thread is not threading.current_thread():
+            self.capture_thread.join(timeout)
+
+    def stats(self):
+        return {"frames": self.frames_seen, "speech_frames": self.frames_sent, "overruns": self.overruns,
+                "noise_floor": self.vad.noise_floor, "floor_resets": self.vad.floor_resets}
+
+    def __iter__(self):
+        self.start()
+        in_segment = False
+        self.read_position = self.ring.written
+        while self.running or self.ring.written >= self.read_position + self.frame_samples:
+            end = self.read_position + self.frame_samples
+            if not self.ring.wait_for(end):
+                break
+            if self.read_position < self.ring.oldest:
+                # the recognizer fell more than the ring behind, skip to what is left
+                self.overruns += 1
+                written = self.ring.written  # one snapshot, capture keeps writing meanwhile
+                self.read_position = written - self.frame_samples
+                end = written
+            frame = self.ring.read(self.read_position, end)
+            start, self.read_position = self.read_position, end
+            self.frames_seen += 1
+
+            active = self.vad.update(frame)
+            if active and not in_segment:
+                in_segment = True
+                # onset frames plus pre-roll, as far back as the ring still has
+                onset_start = start - (self.vad.onset_frames - 1) * self.frame_samples - self.pre_roll_samples
+                self.frames_sent += 1
+                yield self.ring.read(max(onset_start, self.ring.oldest), end).tobytes()
+            elif in_segment:
+                self.frames_sent += 1
+                yield frame.tobytes()
+                if not active:
+                    in_segment = False
+                    yield None
+        if in_segment:
+            yield None
+
+    def __capture_loop(self):
+        for chunk in self.source:
+            if not self.running:
+                break
+            samples = np.frombuffer(chunk, dtype=np.int16)
+            if self.lossless:
+                self.ring.wait_for_space(lambda: self.read_position, len(samples))
+            self.ring.write(samples)
+        self.ring.close()
@@ -0,0 +1,129 @@
+"""
+Replays recorded EAR traces through the blink detector and reports precision
+and recall against the labelled blinks.
+
+Trace files are CSV with a header: timestamp,left_ear,right_ear,blink
+(blink is 1 on frames inside a real blink, 0 otherwise).
+
+    python backend/blinkBenchmark.py trace.csv [more.csv ...]
+    python backend/blinkBenchmark.py --synthetic 120 --fps 30
+"""
+import argparse
+import csv
+
+import numpy as np
+
+from blinkDetector import BlinkDetector
+
+DEFAULT_THRESHOLD = 0.25  # EAR_THRESHOLD in headPoseEstimator.py
+MATCH_TOLERANCE = 0.1  # seconds a detection may sit outside its labelled blink
+
+
+def load_trace(path):
+    with open(path, newline="") as f:
+        rows = [(float(r["timestamp"]), float(r["left_ear"]), float(r["right_ear"]), int(r["blink"]))
+                for r in csv.DictReader(f)]
+    return np.array(rows, dtype=np.float64).reshape(-1, 4)
+
+
+def save_trace(path, trace):
+    with open(path, "w", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(["timestamp", "left_ear", "right_ear", "blink"])
+        for timestamp, left, right, blink in trace:
+            writer.writerow([f"{timestamp:.4f}", f"{left:.4f}", f"{right:.4f}", int(blink)])
+
+
+# Open eyes with noise, short blinks, plus long deliberate closures and
+# one-frame landmark glitches that should not count
+def synthetic_trace(seconds, fps, seed=0):
+    rng = np.random.default_rng(seed)
+    timestamps = np.arange(0, seconds, 1 / fps)
+    ears = 0.32 + rng.normal(0, 0.015, (len(timestamps), 2))
+    labels = np.zeros(len(timestamps))
+
+    t = 1.0
+    while t < seconds - 2:
+        kind = rng.choice(["blink", "blink", "blink", "long", "glitch"])
+        duration = {"blink": rng.uniform(0.1, 0.3), "long": rng.uniform(1.0, 2.0), "glitch": 1 / fps}[kind]
+        inside = (timestamps >= t) & (timestamps < t + duration)
+        ears[inside] = 0.1 + rng.normal(0, 0.02, (inside.sum(), 2))
+        if kind == "blink":
+            labels[inside] = 1
+        t += duration + rng.uniform(0.4, 3.0)
+
+    return np.column_stack([timestamps, ears, labels])
+
+
+def labelled_blinks(trace):
+    intervals = []
+    start = None
+    for timestamp, _, _, blink in trace:
+        if blink and start is None:
+            start = timestamp
+        elif not blink and start is not None:
+            intervals.append((start, timestamp))
+            start = None
+    if start is not None:
+        intervals.append((start, trace[-1, 0]))
+    return intervals
+
+
+# detections are (start, end) intervals; each labelled blink can be matched once
+def score(detections, truth):
+    matched = set()
+    true_positives = 0
+    for start, end in detections:
+        for i, (truth_start, truth_end) in enumerate(truth):
+            if i not in matched and start <= truth_end + MATCH_TOLERANCE and end >= truth_start - MATCH_TOLERANCE:
+                matched.add(i)
+                true_positives += 1
+                break
+    precision = true_positives / len(detections) if detections else 1.0
+    recall = true_positives / len(truth) if truth else 1.0
+    return precision, recall
+
+
+def run_detector(trace, threshold):
+    detector = BlinkDetector()
+    detections = []
+    for timestamp, left, right, _ in trace:
+        event = detector.update((left, right), (threshold, threshold), timestamp)
+        if event is not None:
+            detections.append((event.start_time, event.end_time))
+    return detections
+
+
+# the old behaviour: every frame under the threshold registered a click
+def run_per_frame(trace, threshold):
+    closed = (trace[:, 1] < threshold) | (trace[:, 2] < threshold)
+    return [(timestamp, timestamp) for timestamp in trace[closed, 0]]
+
+
+def report(name, trace, threshold):
+    truth = labelled_blinks(trace)
+    print(f"{name}: {len(trace)} frames, {len(truth)} labelled blinks")
+    for label, detections in (("per-frame", run_per_frame(trace, threshold)),
+                              ("detector", run_detector(trace, threshold))):
+        precision, recall = score(detections, truth)
+        print(f"  {label:<10} events={len(detections):<5} precision={precision:.3f} recall={recall:.3f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("traces", nargs="*", help="EAR trace CSV files")
+    parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD)
+    parser.add_argument("--synthetic", type=float, metavar="SECONDS", help="benchmark a generated trace")
+    parser.add_argument("--fps", type=float, default=30)
+    parser.add_argument("--save-synthetic", metavar="PATH", help="write the generated trace to a CSV file")
+    args = parser.parse_args()
+
+    if args.synthetic:
+        trace = synthetic_trace(args.synthetic, args.fps)
+        if args.save_synthetic:
+            save_trace(args.save_synthetic, trace)
+        report(f"synthetic {args.synthetic:.0f}s @ {args.fps:.0f} fps", trace, args.threshold)
+    for path in args.traces:
+        report(path, load_trace(path), args.threshold)
+    if not args.synthetic and not args.traces:
+        parser.print_help()
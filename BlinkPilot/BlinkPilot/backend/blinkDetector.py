@@ -0,0 +1,80 @@
+OPEN_HYSTERESIS = 1.15  # eye counts as open again once EAR is above close threshold * this
+MIN_BLINK_DURATION = 0.07  # seconds, shorter closures are landmark noise
+MAX_BLINK_DURATION = 0.6  # seconds, longer closures are deliberate (resting, looking down)
+
+
+class BlinkEvent:
+    def __init__(self, start_time, end_time, left, right):
+        self.start_time = start_time
+        self.end_time = end_time
+        self.left = left  # which eyes closed during the blink
+        self.right = right
+
+    @property
+    def duration(self):
+        return self.end_time - self.start_time
+
+    @property
+    def eyes(self):
+        if self.left and self.right:
+            return "both"
+        return "left" if self.left else "right"
+
+
+# Edge-triggered blink detection: one BlinkEvent per closed -> open transition
+# whose closure lasted between min_duration and max_duration, so a single blink
+# counts once no matter how many frames it spans
+class BlinkDetector:
+    def __init__(self, open_hysteresis=OPEN_HYSTERESIS, min_duration=MIN_BLINK_DURATION,
+                 max_duration=MAX_BLINK_DURATION):
+        self.open_hysteresis = open_hysteresis
+        self.min_duration = min_duration
+        self.max_duration = max_duration
+        self.events = 0  # blinks reported so far
+        self.last_event = None
+        self.reset()
+
+    def reset(self):
+        self.closed = False
+        self.closed_since = None
+        self.left_closed = False
+        self.right_closed = False
+
+    # True while a closure that may still become a blink is in progress
+    def closing(self, timestamp):
+        return self.closed and timestamp - self.closed_since <= self.max_duration
+
+    # ears is (left EAR, right EAR) or None when no face was found,
+    # thresholds is the (left, right) EAR closing threshold
+    def update(self, ears, thresholds, timestamp):
+        if ears is None:
+            # face lost mid-blink, the closure cannot be trusted
+            self.reset()
+            return None
+
+        left_ear, right_ear = ears
+        left_threshold, right_threshold = thresholds
+
+        if not self.closed:
+            left_closing = left_ear < left_threshold
+            right_closing = right_ear < right_threshold
+            if left_closing or right_closing:
+                self.closed = True
+                self.closed_since = timestamp
+                self.left_closed = left_closing
+                self.right_closed = right_closing
+            return None
+
+        # still closed until every eye clears the higher reopening threshold
+        self.left_closed |= left_ear < left_threshold
+        self.right_closed |= right_ear < right_threshold
+        if left_ear < left_threshold * self.open_hysteresis or right_ear < right_threshold * self.open_hysteresis:
+            return None
+
+        event = BlinkEvent(self.closed_since, timestamp, self.left_closed, self.right_closed)
+        self.reset()
+        if self.min_duration <= event.duration <= self.max_duration:
+            self.events += 1
+            self.last_event = event
+            return event
+        return None
@@ -0,0 +1,131 @@
+import json
+import os
+
+import numpy as np
+
+from Rotation2Vector import MAX_PITCH, MAX_YAW
+
+DEFAULT_PROFILE_PATH = os.path.join(os.path.expanduser("~"), ".blinkpilot", "profile.json")
+
+# (name, seconds, instructions shown to the user)
+CALIBRATION_PHASES = [
+    ("neutral", 2.0, "Look at the centre of the screen with your eyes open"),
+    ("range", 4.0, "Slowly turn your head towards each edge of the screen"),
+    ("blink", 4.0, "Blink normally a few times"),
+]
+
+RANGE_PERCENTILE = 95  # comfortable range ignores the most extreme head turns
+MIN_ANGLE_RANGE = 10  # degrees
+MAX_ANGLE_RANGE = 60
+CLOSED_PERCENTILE = 5  # EAR level treated as "closed" during the blink phase
+MIN_CLOSED_DROP = 0.8  # closed EAR must be below this fraction of open EAR to count as real blinks
+FALLBACK_THRESHOLD_RATIO = 0.7  # threshold as a fraction of open EAR when no blinks were seen
+
+
+class CalibrationProfile:
+    def __init__(self, neutral_pitch=0.0, neutral_yaw=0.0, max_pitch=MAX_PITCH, max_yaw=MAX_YAW,
+                 ear_threshold_left=None, ear_threshold_right=None):
+        self.neutral_pitch = neutral_pitch
+        self.neutral_yaw = neutral_yaw
+        self.max_pitch = max_pitch
+        self.max_yaw = max_yaw
+        self.ear_threshold_left = ear_threshold_left
+        self.ear_threshold_right = ear_threshold_right
+
+    def ear_thresholds(self):
+        if self.ear_threshold_left is None or self.ear_threshold_right is None:
+            return None
+        return self.ear_threshold_left, self.ear_threshold_right
+
+    def to_dict(self):
+        return dict(vars(self))
+
+    def save(self, path=DEFAULT_PROFILE_PATH):
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with open(path, "w") as f:
+            json.dump(self.to_dict(), f, indent=2)
+
+    # returns None when there is no usable profile at path
+    @classmethod
+    def load(cls, path=DEFAULT_PROFILE_PATH):
+        if not os.path.exists(path):
+            return None
+        try:
+            with open(path) as f:
+                return cls(**json.load(f))
+        except (OSError, ValueError, TypeError) as e:
+            print(f"Could not load calibration profile {path}: {e}")
+            return None
+
+
+# Collects (pitch, yaw, left EAR, right EAR) samples through CALIBRATION_PHASES
+# and fits a CalibrationProfile from them
+class Calibrator:
+    def __init__(self, phases=CALIBRATION_PHASES):
+        self.phases = phases
+        self.samples = {name: [] for name, _, _ in phases}
+        self.start_time = None
+        self.last_time = None
+
+    # moves the phase clock, also called on frames without a face
+    def advance(self, timestamp):
+        if self.start_time is None:
+            self.start_time = timestamp
+        self.last_time = timestamp
+
+    def add_sample(self, pitch, yaw, left_ear, right_ear, timestamp):
+        self.advance(timestamp)
+        phase = self.current_phase()
+        if phase is not None:
+            self.samples[phase[0]].append((pitch, yaw, left_ear, right_ear))
+
+    def elapsed(self):
+        if self.start_time is None:
+            return 0.0
+        return self.last_time - self.start_time
+
+    # (name, seconds, instructions) of the running phase, None once finished
+    def current_phase(self):
+        elapsed = self.elapsed()
+        for phase in self.phases:
+            if elapsed < phase[1]:
+                return phase
+            elapsed -= phase[1]
+        return None
+
+    def progress(self):
+        total = sum(seconds for _, seconds, _ in self.phases)
+        return min(1.0, self.elapsed() / total)
+
+    @property
+    def done(self):
+        return self.start_time is not None and self.current_phase() is None
+
+    def fit(self):
+        profile = CalibrationProfile()
+        neutral = np.array(self.samples["neutral"], dtype=np.float64).reshape(-1, 4)
+        head_range = np.array(self.samples["range"], dtype=np.float64).reshape(-1, 4)
+        blinks = np.array(self.samples["blink"], dtype=np.float64).reshape(-1, 4)
+
+        if len(neutral):
+            profile.neutral_pitch, profile.neutral_yaw = np.median(neutral[:, :2], axis=0).tolist()
+
+        if len(head_range):
+            offsets = np.abs(head_range[:, :2] - (profile.neutral_pitch, profile.neutral_yaw))
+            max_pitch, max_yaw = np.clip(np.percentile(offsets, RANGE_PERCENTILE, axis=0),
+                                         MIN_ANGLE_RANGE, MAX_ANGLE_RANGE).tolist()
+            profile.max_pitch, profile.max_yaw = max_pitch, max_yaw
+
+        if len(neutral):
+            open_ears = np.median(neutral[:, 2:], axis=0)
+            thresholds = open_ears * FALLBACK_THRESHOLD_RATIO
+            if len(blinks):
+                closed_ears = np.percentile(blinks[:, 2:], CLOSED_PERCENTILE, axis=0)
+                # halfway between open and closed, for each eye that actually closed
+                seen = closed_ears < open_ears * MIN_CLOSED_DROP
+                thresholds = np.where(seen, (open_ears + closed_ears) / 2, thresholds)
+            profile.ear_threshold_left, profile.ear_threshold_right = thresholds.tolist()
+
+        return profile
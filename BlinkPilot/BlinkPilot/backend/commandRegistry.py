@@ -0,0 +1,200 @@
+import difflib
+import re
+
+NUMBER_SLOT = "{n}"  # phrase word that matches a spoken or written number, e.g. "sensitivity {n}"
+FUZZY_CUTOFF = 0.75  # difflib ratio a misheard word needs to still count as the command word
+# fuzzy matches only apply to an utterance that is nothing but the (misheard) phrase;
+# inside longer speech a similar word is far more likely an ordinary word than a command
+FUZZY_MIN_LENGTH = 4  # shorter words are too easy to confuse ("left"/"lift" yes, "up"/"a" no)
+GRAMMAR_NUMBERS = range(0, 11)  # values a number slot is expanded to for the recognizer grammar
+
+NUMBER_WORDS = {
+    "zero": 0, "one": 1, "two": 2, "three": 3, "four": 4, "five": 5, "six": 6, "seven": 7,
+    "eight": 8, "nine": 9, "ten": 10, "eleven": 11, "twelve": 12, "thirteen": 13, "fourteen": 14,
+    "fifteen": 15, "sixteen": 16, "seventeen": 17, "eighteen": 18, "nineteen": 19, "twenty": 20,
+}
+# what recognizers tend to hear instead, only accepted in a number slot
+NUMBER_HOMOPHONES = {"oh": 0, "won": 1, "to": 2, "too": 2, "tree": 3, "for": 4, "fore": 4, "ate": 8}
+SPOKEN_NUMBERS = {value: word for word, value in NUMBER_WORDS.items()}
+WORD_PATTERN = re.compile(r"[A-Za-z0-9{}]+")  # punctuation and hyphens separate words
+
+
+def parse_number(word):
+    if word.isdigit():
+        return int(word)
+    if word in NUMBER_WORDS:
+        return NUMBER_WORDS[word]
+    return NUMBER_HOMOPHONES.get(word)
+
+
+def normalize(text):
+    return [word.group().lower() for word in WORD_PATTERN.finditer(text)]
+
+
+# Marks a method as a voice command handler, registered by CommandRegistry.register_object.
+# Number slots are passed to the handler as int arguments, in phrase order.
+# exact=True only accepts the phrase said on its own and never a misheard one, for
+# commands that are hard to undo ("quit" must not fire from "I want to quit smoking").
+# dictation=True keeps the command live while dictating (e.g. "stop typing"), every
+# other phrase is typed as text then.
+#   @voice_command("sensitivity {n}", description="Sets sensitivity (0-10)")
+#   def setSensitivityCommand(self, value): ...
+def voice_command(*phrases, description="", exact=False, dictation=False):
+    def mark(handler):
+        handler.voice_command = (phrases, description, exact, dictation)
+        return handler
+    return mark
+
+
+class Command:
+    def __init__(self, name, phrases, handler, description="", exact=False, dictation=False):
+        self.name = name
+        self.phrases = phrases
+        self.handler = handler
+        self.description = description
+        self.exact = exact  # only the whole utterance, no fuzzy matches
+        self.dictation = dictation  # also matched in dictated text
+
+    def __repr__(self):
+        return f"Command({self.name!r})"
+
+
+class CommandMatch:
+    def __init__(self, command, args, start, end, fuzzy, offset=0):
+        self.command = command
+        self.args = args  # parsed number slots
+        self.start = start  # word span of the match in the normalized text
+        self.end = end
+        self.fuzzy = fuzzy  # True if a misheard word had to be corrected
+        self.offset = offset  # character position of the match in the original text
+
+    def __repr__(self):
+        return f"CommandMatch({self.command.name!r}, args={self.args}, fuzzy={self.fuzzy})"
+
+
+class PhraseNode:
+    def __init__(self):
+        self.children = {}
+        self.number = None  # child for a NUMBER_SLOT word
+        self.command = None  # set where a phrase ends
+
+
+# Word-level trie over every command phrase. Matching walks it from each word of
+# the recognized text, so "exit" only matches as a whole word and the longest
+# phrase wins no matter in which order the commands were registered.
+class CommandRegistry:
+    def __init__(self, fuzzy_cutoff=FUZZY_CUTOFF):
+        self.fuzzy_cutoff = fuzzy_cutoff
+        self.commands = []
+        self.root = PhraseNode()
+
+    def register(self, phrases, handler, name=None, description="", exact=False, dictation=False):
+        if isinstance(phrases, str):
+            phrases = (phrases,)
+        command = Command(name or " ".join(normalize(phrases[0])), tuple(phrases), handler, description, exact,
+                          dictation)
+        for phrase in phrases:
+            node = self.root
+            words = normalize(phrase)
+            if not words:
+                raise ValueError(f"Empty phrase for command '{command.name}'")
+            for word in words:
+                if word == NUMBER_SLOT:
+                    node.number = node.number or PhraseNode()
+                    node = node.number
+                else:
+                    node = node.children.setdefault(word, PhraseNode())
+            if node.command is not None:
+                raise ValueError(f"'{phrase}' is already registered for '{node.command.name}'")
+            node.command = command
+        self.commands.append(command)
+        return command
+
+    # registers every @voice_command method of obj, in definition order
+    def register_object(self, obj):
+        seen = set()
+        for cls in type(obj).__mro__:
+            for attr, value in vars(cls).items():
+                if attr in seen or not hasattr(value, "voice_command"):
+                    continue
+                seen.add(attr)
+                phrases, description, exact, dictation = value.voice_command
+                self.register(phrases, getattr(obj, attr), name=attr, description=description, exact=exact,
+                              dictation=dictation)
+
+    # first command in text (longest at that position), or None; see match_all
+    def match(self, text, fuzzy=True, dictation=False):
+        matches = self.match_all(text, fuzzy, dictation)
+        return matches[0] if matches else None
+
+    # every command in text in order, without overlaps (longest at each position).
+    # With fuzzy, text that matches nothing exactly may still be one whole misheard
+    # phrase; dictation only considers commands registered with dictation=True.
+    def match_all(self, text, fuzzy=True, dictation=False):
+        offsets = [word.start() for word in WORD_PATTERN.finditer(text)]
+        words = normalize(text)
+        matches = []
+        start = 0
+        while start < len(words):
+            found = self.__walk(self.root, words, start, [], False, False, dictation)
+            if found is not None:
+                end, command, args, _ = found
+                if not command.exact or (start == 0 and end == len(words)):
+                    matches.append(CommandMatch(command, args, start, end, False, offsets[start]))
+                    start = end
+                    continue
+            start += 1
+        if not matches and fuzzy and words:
+            found = self.__walk(self.root, words, 0, [], False, True, dictation)
+            if found is not None and found[0] == len(words):
+                end, command, args, was_fuzzy = found
+                matches.append(CommandMatch(command, args, 0, end, was_fuzzy, offsets[0]))
+        return matches
+
+    # "phrase/phrase - description" lines for the help box
+    def help_lines(self):
+        lines = []
+        for command in self.commands:
+            keywords = "/".join(phrase.replace(NUMBER_SLOT, "<number>") for phrase in command.phrases)
+            lines.append(f"{keywords} - {command.description}" if command.description else keywords)
+        return lines
+
+    # every phrase with number slots spelled out, for a recognizer grammar
+    def grammar_phrases(self):
+        phrases = []
+        for command in self.commands:
+            for phrase in command.phrases:
+                expanded = [[]]
+                for word in normalize(phrase):
+                    choices = [SPOKEN_NUMBERS[n] for n in GRAMMAR_NUMBERS] if word == NUMBER_SLOT else [word]
+                    expanded = [prefix + [choice] for prefix in expanded for choice in choices]
+                phrases.extend(" ".join(words) for words in expanded)
+        return phrases
+
+    # longest (end, command, args, fuzzy) reachable from node at words[i], exact beats fuzzy on ties
+    def __walk(self, node, words, i, args, was_fuzzy, fuzzy, dictation):
+        best = None
+        command = node.command
+        if command is not None and not (was_fuzzy and command.exact) and (command.dictation or not dictation):
+            best = (i, command, list(args), was_fuzzy)
+        if i == len(words):
+            return best
+
+        word = words[i]
+        branches = []
+        if word in node.children:
+            branches.append((node.children[word], args, was_fuzzy))
+        if node.number is not None and parse_number(word) is not None:
+            branches.append((node.number, args + [parse_number(word)], was_fuzzy))
+        if not branches and fuzzy and len(word) >= FUZZY_MIN_LENGTH:
+            close = difflib.get_close_matches(word, node.children, n=1, cutoff=self.fuzzy_cutoff)
+            if close:
+                branches.append((node.children[close[0]], args, True))
+
+        for child, child_args, child_fuzzy in branches:
+            found = self.__walk(child, words, i + 1, child_args, child_fuzzy, fuzzy, dictation)
+            if found is None:
+                continue
+            if best is None or found[0] > best[0] or (found[0] == best[0] and best[3] and not found[3]):
+                best = found
+        return best
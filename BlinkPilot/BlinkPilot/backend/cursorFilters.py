@@ -0,0 +1,146 @@
+import math
+import time
+
+import numpy as np
+
+from Rotation2Vector import Vector
+
+MIN_DT = 1e-3  # seconds, guards against duplicate timestamps
+
+# One Euro defaults tuned for mouse vectors in [-1, 1]
+DEFAULT_MIN_CUTOFF = 1.0  # Hz, smoothing while the head is still
+DEFAULT_BETA = 0.7  # how quickly the cutoff opens up with speed
+DEFAULT_D_CUTOFF = 1.0  # Hz, smoothing of the speed estimate
+
+# Kalman defaults
+DEFAULT_PROCESS_NOISE = 0.2  # acceleration noise, higher follows fast moves more tightly
+DEFAULT_MEASUREMENT_NOISE = 1e-3  # variance of the jitter in the mouse vector
+DEFAULT_PREDICTION_HORIZON = 0.03  # seconds to extrapolate ahead, offsets pipeline latency
+
+
+# Cursor filters take a Vector plus the frame's timestamp (seconds, perf_counter
+# clock) and return the filtered Vector. The timestamps give them the real frame
+# timing rather than assuming a fixed rate.
+class CursorFilter:
+    def __init__(self):
+        self.last_time = None
+
+    def filter(self, vector, timestamp=None):
+        if timestamp is None:
+            timestamp = time.perf_counter()
+        if self.last_time is None:
+            self.last_time = timestamp
+            return self._start(vector)
+        dt = max(MIN_DT, timestamp - self.last_time)
+        self.last_time = timestamp
+        return self._step(vector, dt)
+
+    def reset(self):
+        self.last_time = None
+
+    def _start(self, vector):
+        raise NotImplementedError
+
+    def _step(self, vector, dt):
+        raise NotImplementedError
+
+
+# The original fixed-alpha exponential moving average, ignores dt
+class EmaFilter(CursorFilter):
+    def __init__(self, alpha=0.2):
+        super().__init__()
+        self.alpha = alpha
+        self.smoothed = Vector(0, 0)
+
+    def reset(self):
+        super().reset()
+        self.smoothed = Vector(0, 0)
+
+    def _start(self, vector):
+        # starts from the origin like the old Mouse smoothing did
+        return self._step(vector, None)
+
+    def _step(self, vector, dt):
+        self.smoothed.x = self.alpha * vector.x + (1 - self.alpha) * self.smoothed.x
+        self.smoothed.y = self.alpha * vector.y + (1 - self.alpha) * self.smoothed.y
+        return Vector(self.smoothed.x, self.smoothed.y)
+
+
+def _smoothing_factor(cutoff, dt):
+    tau = 1.0 / (2 * math.pi * cutoff)
+    return 1.0 / (1.0 + tau / dt)
+
+
+# One Euro filter (Casiez et al.): heavy smoothing at low speed, little lag at high speed
+class OneEuroFilter(CursorFilter):
+    def __init__(self, min_cutoff=DEFAULT_MIN_CUTOFF, beta=DEFAULT_BETA, d_cutoff=DEFAULT_D_CUTOFF):
+        super().__init__()
+        self.min_cutoff = min_cutoff
+        self.beta = beta
+        self.d_cutoff = d_cutoff
+        self.value = [0.0, 0.0]
+        self.speed = [0.0, 0.0]
+
+    def _start(self, vector):
+        self.value = [vector.x, vector.y]
+        self.speed = [0.0, 0.0]
+        return Vector(vector.x, vector.y)
+
+    def _step(self, vector, dt):
+        d_alpha = _smoothing_factor(self.d_cutoff, dt)
+        for axis, raw in enumerate((vector.x, vector.y)):
+            speed = (raw - self.value[axis]) / dt
+            self.speed[axis] += d_alpha * (speed - self.speed[axis])
+            cutoff = self.min_cutoff + self.beta * abs(self.speed[axis])
+            self.value[axis] += _smoothing_factor(cutoff, dt) * (raw - self.value[axis])
+        return Vector(self.value[0], self.value[1])
+
+
+# Constant-velocity Kalman filter on both axes, outputs the position predicted
+# prediction_horizon seconds ahead to hide some of the capture-to-cursor latency
+class KalmanFilter(CursorFilter):
+    def __init__(self, process_noise=DEFAULT_PROCESS_NOISE, measurement_noise=DEFAULT_MEASUREMENT_NOISE,
+                 prediction_horizon=DEFAULT_PREDICTION_HORIZON):
+        super().__init__()
+        self.process_noise = process_noise
+        self.measurement_noise = measurement_noise
+        self.prediction_horizon = prediction_horizon
+        self.state = np.zeros((2, 2))  # rows: x, y axis; columns: position, velocity
+        # both axes share F, Q, R and H, so they also share one covariance
+        self.covariance = np.eye(2)
+
+    def _start(self, vector):
+        self.state[:] = ((vector.x, 0.0), (vector.y, 0.0))
+        self.covariance = np.diag((self.measurement_noise, 1.0))
+        return Vector(vector.x, vector.y)
+
+    def _step(self, vector, dt):
+        transition = np.array(((1.0, dt), (0.0, 1.0)))
+        q = self.process_noise
+        process_cov = q * np.array(((dt ** 3 / 3, dt ** 2 / 2), (dt ** 2 / 2, dt)))
+
+        # predict
+        self.state = self.state @ transition.T
+        self.covariance = transition @ self.covariance @ transition.T + process_cov
+
+        # update with the measured position (H = [1, 0])
+        innovation = np.array((vector.x, vector.y)) - self.state[:, 0]
+        gain = self.covariance[:, 0] / (self.covariance[0, 0] + self.measurement_noise)
+        self.state += np.outer(innovation, gain)
+        self.covariance = self.covariance - np.outer(gain, self.covariance[0])
+
+        predicted = self.state[:, 0] + self.state[:, 1] * self.prediction_horizon
+        return Vector(float(predicted[0]), float(predicted[1]))
+
+
+FILTERS = {
+    "ema": EmaFilter,
+    "one_euro": OneEuroFilter,
+    "kalman": KalmanFilter,
+}
+
+
+def create_filter(name, **kwargs):
+    if name not in FILTERS:
+        raise ValueError(f"Unknown cursor filter '{name}', expected one of {list(FILTERS)}")
+    return FILTERS[name](**kwargs)
@@ -0,0 +1,217 @@
+import os
+import threading
+
+STABLE_TAIL_WORDS = 1  # last words of a partial result are held back, recognizers revise them most
+MAX_UTTERANCES = 50  # utterances kept for "scratch that", older text can no longer be edited by voice
+
+# spoken edits, applied where they occur in the dictated words
+EDIT_PHRASES = {
+    ("scratch", "that"): "scratch",
+    ("delete", "word"): "delete_word",
+    ("new", "line"): "\n",
+    ("new", "paragraph"): "\n\n",
+    ("period",): ".",
+    ("full", "stop"): ".",
+    ("comma",): ",",
+    ("question", "mark"): "?",
+    ("exclamation", "mark"): "!",
+    ("colon",): ":",
+}
+SUBMIT_PHRASES = (("press", "enter"), ("send", "message"))  # type everything so far, then press Enter
+SENTENCE_ENDS = ".?!"
+
+
+# Coalesces keystrokes into batches that run on Mouse's output thread, where all
+# OS input happens. While one batch is queued or typing, new edits are merged
+# into the next one, so backspaces for a revised partial result cancel text that
+# was never typed instead of being sent one key at a time.
+class KeystrokeBatcher:
+    def __init__(self, mouse):
+        self.mouse = mouse
+        self.backend = mouse.backend
+        self.lock = threading.Lock()
+        self.ops = []  # ["text"] or [key name, count]
+        self.scheduled = False
+        self.batches = 0
+        self.keystrokes = 0
+
+    # deletes backspaces characters before the cursor, then types text
+    def edit(self, backspaces, text):
+        with self.lock:
+            while backspaces and self.ops and isinstance(self.ops[-1], str):
+                # still queued text, drop it instead of typing and deleting it
+                cut = min(backspaces, len(self.ops[-1]))
+                self.ops[-1] = self.ops[-1][:len(self.ops[-1]) - cut]
+                backspaces -= cut
+                if not self.ops[-1]:
+                    self.ops.pop()
+            if backspaces:
+                self.__add_key("backspace", backspaces)
+            if text:
+                if self.ops and isinstance(self.ops[-1], str):
+                    self.ops[-1] += text
+                else:
+                    self.ops.append(text)
+            self.__schedule()
+
+    def press_key(self, key, count=1):
+        with self.lock:
+            self.__add_key(key, count)
+            self.__schedule()
+
+    def stats(self):
+        return {"batches": self.batches, "keystrokes": self.keystrokes}
+
+    def __add_key(self, key, count):
+        if self.ops and not isinstance(self.ops[-1], str) and self.ops[-1][0] == key:
+            self.ops[-1][1] += count
+        else:
+            self.ops.append([key, count])
+
+    def __schedule(self):
+        if self.ops and not self.scheduled:
+            self.scheduled = True
+            self.mouse.post_action(self.__flush)
+
+    # runs on the output thread
+    def __flush(self):
+        with self.lock:
+            ops, self.ops = self.ops, []
+            self.scheduled = False
+        self.batches += 1
+        for op in ops:
+            if isinstance(op, str):
+                self.backend.type_text(op)
+                self.keystrokes += len(op)
+            else:
+                key, count = op
+                for _ in range(count):
+                    self.backend.press_key(key)
+                self.keystrokes += count
+
+
+def find_phrase(words, i, phrases):
+    for phrase in phrases:
+        if tuple(words[i:i + len(phrase)]) == phrase:
+            return phrase
+    return None
+
+
+# Applies dictated words to a copy of the committed utterances and returns the
+# new utterance list (current utterance last). An utterance is a list of pieces,
+# each piece a word with its leading space or a punctuation/newline string.
+def render(utterances, words):
+    doc = [list(utterance) for utterance in utterances] + [[]]
+    i = 0
+    while i < len(words):
+        phrase = find_phrase(words, i, EDIT_PHRASES)
+        if phrase is None:
+            append_word(doc, words[i])
+            i += 1
+            continue
+        edit = EDIT_PHRASES[phrase]
+        i += len(phrase)
+        if edit == "scratch":
+            # the utterance so far, or the previous one if nothing was said yet
+            if doc[-1]:
+                doc[-1] = []
+            elif len(doc) > 1:
+                doc.pop(-2)
+        elif edit == "delete_word":
+            delete_word(doc)
+        else:
+            doc[-1].append(edit)
+    return doc
+
+
+def doc_text(doc):
+    return "".join(piece for utterance in doc for piece in utterance)
+
+
+def last_piece(doc):
+    for utterance in reversed(doc):
+        if utterance:
+            return utterance[-1]
+    return None
+
+
+def append_word(doc, word):
+    previous = last_piece(doc)
+    if previous is not None and previous[-1] in SENTENCE_ENDS:
+        word = word[:1].upper() + word[1:]
+    separator = "" if previous is None or previous.endswith("\n") else " "
+    doc[-1].append(separator + word)
+
+
+# removes the last word and the punctuation after it
+def delete_word(doc):
+    for utterance in reversed(doc):
+        while utterance:
+            piece = utterance.pop()
+            if piece.strip() and piece.strip() not in EDIT_PHRASES.values():
+                return
+
+
+# Turns streamed recognition results into keystrokes. Each partial result is
+# rendered into the text it stands for and diffed against what is already on
+# screen, so only the changed tail is retyped. Final results are committed and
+# can then only change through voice edits ("scratch that", "delete word").
+# Thread-safe; update() usually runs on the speech thread.
+class DictationSession:
+    def __init__(self, batcher, enter_after_utterance=False, stable_tail_words=STABLE_TAIL_WORDS):
+        self.batcher = batcher
+        self.enter_after_utterance = enter_after_utterance
+        self.stable_tail_words = stable_tail_words
+        self.lock = threading.Lock()
+        self.utterances = []
+        self.screen = ""  # text typed since the session started (or the last Enter)
+        self.pending = None  # words of the latest partial result, including the held-back tail
+
+    # hold_back=False types a partial result in full, for text known not to change
+    def update(self, text, is_final, hold_back=True):
+        words = text.lower().split()
+        with self.lock:
+            while True:
+                submit_at = next((i for i in range(len(words)) if find_phrase(words, i, SUBMIT_PHRASES)), None)
+                if submit_at is None:
+                    break
+                if not is_final:
+                    words = words[:submit_at]  # Enter is only pressed once the utterance is final
+                    break
+                self.__sync(render(self.utterances, words[:submit_at]))
+                self.__submit()
+                words = words[submit_at + len(find_phrase(words, submit_at, SUBMIT_PHRASES)):]
+
+            self.pending = None if is_final else words
+            if not is_final and hold_back and self.stable_tail_words:
+                words = words[:max(0, len(words) - self.stable_tail_words)]
+            doc = self.__sync(render(self.utterances, words))
+            if is_final:
+                self.utterances = [utterance for utterance in doc if utterance][-MAX_UTTERANCES:]
+                self.screen = doc_text(self.utterances)  # text of dropped utterances is out of reach now
+                if self.enter_after_utterance and words:
+                    self.__submit()
+
+    # types the latest partial result in full, held-back words included, and starts
+    # over; e.g. when typing mode ends mid-utterance
+    def finish(self):
+        with self.lock:
+            if self.pending:
+                self.__sync(render(self.utterances, self.pending))
+            self.utterances = []
+            self.screen = ""
+            self.pending = None
+
+    def __sync(self, doc):
+        target = doc_text(doc)
+        keep = len(os.path.commonprefix([self.screen, target]))
+        if keep < len(self.screen) or keep < len(target):
+            self.batcher.edit(len(self.screen) - keep, target[keep:])
+        self.screen = target
+        return doc
+
+    def __submit(self):
+        self.batcher.press_key("enter")
+        self.utterances = []
+        self.screen = ""
+        self.pending = None
@@ -0,0 +1,178 @@
+import threading
+import time
+from collections import deque
+
+import cv2
+
+from frameProfiler import NULL_PROFILER
+
+FPS_WINDOW = 30  # number of frame timestamps used to estimate a stage's FPS
+QUEUE_TIMEOUT = 0.1  # seconds a stage waits for input before re-checking if it should stop
+
+
+# Bounded queue where the newest frame always wins: putting into a full queue
+# drops the oldest unread frame instead of blocking the producer
+class LatestFrameQueue:
+    def __init__(self, maxsize=1):
+        self.items = deque(maxlen=maxsize)
+        self.condition = threading.Condition()
+        self.drops = 0
+        self.closed = False
+
+    def put(self, item):
+        with self.condition:
+            if len(self.items) == self.items.maxlen:
+                self.drops += 1
+            self.items.append(item)
+            self.condition.notify()
+
+    def get(self, timeout=None):
+        # blocks until a frame arrives, returns None on timeout or once closed
+        with self.condition:
+            if not self.items and not self.closed:
+                self.condition.wait(timeout)
+            if not self.items:
+                return None
+            return self.items.popleft()
+
+    def get_latest(self):
+        # non-blocking, skips straight to the newest frame
+        with self.condition:
+            if not self.items:
+                return None
+            item = self.items.pop()
+            self.drops += len(self.items)
+            self.items.clear()
+            return item
+
+    def close(self):
+        with self.condition:
+            self.closed = True
+            self.condition.notify_all()
+
+
+class StageStats:
+    def __init__(self, name):
+        self.name = name
+        self.frames = 0
+        self.timestamps = deque(maxlen=FPS_WINDOW)
+        self.lock = threading.Lock()
+
+    def tick(self):
+        with self.lock:
+            self.frames += 1
+            self.timestamps.append(time.perf_counter())
+
+    def fps(self):
+        with self.lock:
+            if len(self.timestamps) < 2:
+                return 0.0
+            elapsed = self.timestamps[-1] - self.timestamps[0]
+            if elapsed <= 0:
+                return 0.0
+            return (len(self.timestamps) - 1) / elapsed
+
+
+# Runs capture -> inference -> display on their own threads so the Tk loop
+# only has to pick up the newest finished frame.
+# display_fn runs on the display thread and turns a processed frame into
+# whatever the UI wants to show (e.g. a resized PIL image).
+# profiler (see frameProfiler.py) records the capture, color and display stages.
+class FrameEngine:
+    STAGES = ("capture", "inference", "display")
+
+    def __init__(self, cap, tracker, display_fn=None, queue_size=1, profiler=None):
+        self.cap = cap
+        self.tracker = tracker
+        self.display_fn = display_fn
+        self.profiler = profiler if profiler is not None else NULL_PROFILER
+
+        self.capture_queue = LatestFrameQueue(queue_size)
+        self.inference_queue = LatestFrameQueue(queue_size)
+        self.display_queue = LatestFrameQueue(queue_size)
+
+        self.stage_stats = {name: StageStats(name) for name in self.STAGES}
+        self.running = False
+        self.threads = []
+
+    def start(self):
+        if self.running:
+            return
+        self.running = True
+        self.threads = [
+            threading.Thread(target=self.__capture_loop, name="capture", daemon=True),
+            threading.Thread(target=self.__inference_loop, name="inference", daemon=True),
+            threading.Thread(target=self.__display_loop, name="display", daemon=True),
+        ]
+        for thread in self.threads:
+            thread.start()
+
+    def stop(self, timeout=1.0):
+        self.running = False
+        for queue in (self.capture_queue, self.inference_queue, self.display_queue):
+            queue.close()
+        for thread in self.threads:
+            thread.join(timeout)
+        self.threads = []
+
+    # called from the Tk loop, returns None if no new frame has finished since the last call
+    def latest(self):
+        return self.display_queue.get_latest()
+
+    def stats(self):
+        queues = {
+            "capture": self.capture_queue,
+            "inference": self.inference_queue,
+            "display": self.display_queue,
+        }
+        return {
+            name: {"fps": self.stage_stats[name].fps(), "drops": queues[name].drops}
+            for name in self.STAGES
+        }
+
+    def format_stats(self):
+        return " | ".join(
+            f"{name} {s['fps']:.1f}fps ({s['drops']} dropped)" for name, s in self.stats().items()
+        )
+
+    def __capture_loop(self):
+        while self.running and self.cap.isOpened():
+            with self.profiler.stage("capture"):
+                ret, frame = self.cap.read()
+            if not ret:
+                break
+            capture_time = time.perf_counter()
+            with self.profiler.stage("color"):
+                frame = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
+            self.capture_queue.put((frame, capture_time))
+            self.stage_stats["capture"].tick()
+        self.capture_queue.close()
+
+    def __inference_loop(self):
+        while self.running:
+            item = self.capture_queue.get(QUEUE_TIMEOUT)
+            if item is None:
+                if self.capture_queue.closed:
+                    break
+                continue
+            frame, capture_time = item
+            frame = self.tracker.process_img(frame, frameTime=capture_time)
+            self.stage_stats["inference"].tick()
+            # control-only mode returns None on frames without a preview
+            if frame is not None:
+                self.inference_queue.put(frame)
+        self.inference_queue.close()
+
+    def __display_loop(self):
+        while self.running:
+            frame = self.inference_queue.get(QUEUE_TIMEOUT)
+            if frame is None:
+                if self.inference_queue.closed:
+                    break
+                continue
+            if self.display_fn is not None:
+                with self.profiler.stage("display"):
+                    frame = self.display_fn(frame)
+            self.display_queue.put(frame)
+            self.stage_stats["display"].tick()
+        self.display_queue.close()
@@ -0,0 +1,123 @@
+import csv
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager, nullcontext
+
+import numpy as np
+
+# in pipeline order; "glasses" runs on its own thread and is reported separately
+STAGES = ("capture", "color", "flip", "detect", "euler", "mouse", "annotate", "blink", "click", "gesture", "display", "tk", "glasses")
+RING_SIZE = 600  # samples kept per stage, ~20 s at 30 fps
+PERCENTILES = (50, 95, 99)
+
+
+# Fixed-size (timestamp, seconds) buffer that overwrites its oldest sample
+class RingBuffer:
+    def __init__(self, size=RING_SIZE):
+        self.data = np.zeros((size, 2), dtype=np.float64)
+        self.index = 0
+        self.count = 0
+
+    def append(self, timestamp, value):
+        self.data[self.index] = (timestamp, value)
+        self.index = (self.index + 1) % len(self.data)
+        self.count = min(self.count + 1, len(self.data))
+
+    # oldest first
+    def values(self):
+        if self.count < len(self.data):
+            return self.data[:self.count].copy()
+        return np.roll(self.data, -self.index, axis=0)
+
+
+# Records how long each stage of a frame takes. Disabled profilers turn every
+# call into a no-op so the hooks can stay in the hot path.
+#     with profiler.stage("detect"):
+#         ...
+class FrameProfiler:
+    def __init__(self, enabled=True, stages=STAGES, size=RING_SIZE):
+        self.enabled = enabled
+        self.stages = stages
+        self.size = size
+        self.buffers = {name: RingBuffer(size) for name in stages}
+        self.lock = threading.Lock()
+
+    def record(self, name, seconds, timestamp=None):
+        if not self.enabled:
+            return
+        if timestamp is None:
+            timestamp = time.perf_counter()
+        with self.lock:
+            if name not in self.buffers:
+                self.buffers[name] = RingBuffer(self.size)
+            self.buffers[name].append(timestamp, seconds)
+
+    def stage(self, name):
+        if not self.enabled:
+            return nullcontext()
+        return self.__measure(name)
+
+    @contextmanager
+    def __measure(self, name):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            end = time.perf_counter()
+            self.record(name, end - start, end)
+
+    def reset(self):
+        with self.lock:
+            self.buffers = {name: RingBuffer(self.size) for name in self.stages}
+
+    # {stage: {"count", "mean_ms", "p50_ms", "p95_ms", "p99_ms", "max_ms"}}, stages without samples are left out
+    def summary(self):
+        with self.lock:
+            samples = {name: buffer.values()[:, 1] for name, buffer in self.buffers.items() if buffer.count}
+        result = {}
+        for name, durations in samples.items():
+            durations = durations * 1000
+            stats = {"count": len(durations), "mean_ms": float(durations.mean())}
+            for p, value in zip(PERCENTILES, np.percentile(durations, PERCENTILES)):
+                stats[f"p{p}_ms"] = float(value)
+            stats["max_ms"] = float(durations.max())
+            result[name] = stats
+        return result
+
+    # one line per stage, for the preview overlay
+    def format_overlay(self):
+        lines = [f"{'stage':<9}{'p50':>7}{'p95':>7}{'p99':>7}"]
+        for name, stats in self.summary().items():
+            lines.append(f"{name:<9}{stats['p50_ms']:>7.1f}{stats['p95_ms']:>7.1f}{stats['p99_ms']:>7.1f}")
+        return "\n".join(lines)
+
+    # .json writes the summary plus raw samples, anything else is a CSV of raw samples
+    # (stage, timestamp, duration_ms) for diffing runs across machines
+    def dump(self, path):
+        with self.lock:
+            samples = {name: buffer.values() for name, buffer in self.buffers.items() if buffer.count}
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        if path.lower().endswith(".json"):
+            data = {
+                "summary": self.summary(),
+                "samples": {name: [[t, d * 1000] for t, d in values.tolist()] for name, values in samples.items()},
+            }
+            with open(path, "w") as f:
+                json.dump(data, f, indent=2)
+            return
+
+        with open(path, "w", newline="") as f:
+            writer = csv.writer(f)
+            writer.writerow(["stage", "timestamp", "duration_ms"])
+            for name, values in samples.items():
+                for timestamp, seconds in values.tolist():
+                    writer.writerow([name, f"{timestamp:.6f}", f"{seconds * 1000:.3f}"])
+
+
+# shared no-op instance for components created without a profiler
+NULL_PROFILER = FrameProfiler(enabled=False)
@@ -0,0 +1,217 @@
+"""
+Records raw camera frames plus a sidecar with timestamps and landmarker
+outputs, and replays them through a HeadPoseEstimator without a camera.
+
+Frames go to a video file (.mp4/.avi/.mkv, lossy) or to a raw uint8 file that
+is read back as a memory-mapped (frames, h, w, 3) array (any other extension).
+The sidecar is <path>.npz with per-frame timestamps, a face flag, the (478, 3)
+landmarks and the 4x4 facial transformation matrix.
+
+    python backend/frameRecording.py session.frames --seconds 30
+    python backend/frameRecording.py session.mp4 --seconds 30 --no-landmarks
+"""
+import os
+import time
+
+import cv2
+import numpy as np
+
+from landmarkArray import NUM_FACE_LANDMARKS
+from frameProfiler import NULL_PROFILER
+
+VIDEO_CODECS = {".mp4": "mp4v", ".avi": "MJPG", ".mkv": "XVID"}
+DEFAULT_RECORDING_FPS = 30
+
+
+def sidecar_path(path):
+    return path + ".npz"
+
+
+def is_video_path(path):
+    return os.path.splitext(path)[1].lower() in VIDEO_CODECS
+
+
+# Appends frames as they come in; the sidecar is written on close()
+class FrameRecorder:
+    def __init__(self, path, fps=DEFAULT_RECORDING_FPS):
+        self.path = path
+        self.fps = fps
+        self.frame_shape = None
+        self.writer = None
+        self.raw_file = None
+
+        self.timestamps = []
+        self.has_face = []
+        self.landmarks = []
+        self.matrices = []
+
+    def __len__(self):
+        return len(self.timestamps)
+
+    # frame is the raw BGR camera frame; points/matrix are the landmarker outputs
+    # for it ((N, 3) and 4x4), or None when it found no face or was not run
+    def write(self, frame, timestamp, points=None, matrix=None):
+        if self.frame_shape is None:
+            self.__open(frame.shape)
+        elif frame.shape != self.frame_shape:
+            raise ValueError(f"Frame shape {frame.shape} does not match the recording's {self.frame_shape}")
+
+        if self.writer is not None:
+            self.writer.write(frame)
+        else:
+            self.raw_file.write(np.ascontiguousarray(frame, dtype=np.uint8).tobytes())
+
+        self.timestamps.append(timestamp)
+        self.has_face.append(points is not None)
+        face = np.zeros((NUM_FACE_LANDMARKS, 3), dtype=np.float32)
+        if points is not None:
+            face[:len(points)] = points[:NUM_FACE_LANDMARKS]
+        self.landmarks.append(face)
+        self.matrices.append(np.zeros((4, 4), dtype=np.float32) if matrix is None
+                             else np.asarray(matrix, dtype=np.float32).reshape(4, 4))
+
+    def close(self):
+        if self.writer is not None:
+            self.writer.release()
+            self.writer = None
+        if self.raw_file is not None:
+            self.raw_file.close()
+            self.raw_file = None
+        if self.frame_shape is None:
+            return
+
+        np.savez_compressed(
+            sidecar_path(self.path),
+            frame_shape=np.array(self.frame_shape),
+            fps=self.fps,
+            timestamps=np.array(self.timestamps, dtype=np.float64),
+            has_face=np.array(self.has_face, dtype=bool),
+            landmarks=np.array(self.landmarks, dtype=np.float32).reshape(-1, NUM_FACE_LANDMARKS, 3),
+            matrices=np.array(self.matrices, dtype=np.float32).reshape(-1, 4, 4),
+        )
+
+    def __open(self, shape):
+        self.frame_shape = shape
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        if is_video_path(self.path):
+            h, w = shape[:2]
+            fourcc = cv2.VideoWriter_fourcc(*VIDEO_CODECS[os.path.splitext(self.path)[1].lower()])
+            self.writer = cv2.VideoWriter(self.path, fourcc, self.fps, (w, h))
+            if not self.writer.isOpened():
+                raise OSError(f"Could not open video writer for {self.path}")
+        else:
+            self.raw_file = open(self.path, "wb")
+
+
+class FrameRecording:
+    def __init__(self, path):
+        self.path = path
+        with np.load(sidecar_path(path)) as sidecar:
+            self.frame_shape = tuple(sidecar["frame_shape"].tolist())
+            self.fps = float(sidecar["fps"])
+            self.timestamps = sidecar["timestamps"]
+            self.has_face = sidecar["has_face"]
+            self.landmarks = sidecar["landmarks"]
+            self.matrices = sidecar["matrices"]
+
+        self.frame_array = None
+        if not is_video_path(path):
+            # raw frames stay on disk, pages are loaded as replay touches them
+            self.frame_array = np.memmap(path, dtype=np.uint8, mode="r",
+                                         shape=(len(self.timestamps),) + self.frame_shape)
+
+    def __len__(self):
+        return len(self.timestamps)
+
+    # (N, 3) landmarks and 4x4 matrix recorded for frame i, or (None, None) without a face
+    def landmarker_output(self, i):
+        if not self.has_face[i]:
+            return None, None
+        return self.landmarks[i], self.matrices[i]
+
+    # yields (index, BGR frame, timestamp)
+    def frames(self):
+        if self.frame_array is not None:
+            for i in range(len(self)):
+                yield i, self.frame_array[i], float(self.timestamps[i])
+            return
+
+        cap = cv2.VideoCapture(self.path)
+        try:
+            for i in range(len(self)):
+                ret, frame = cap.read()
+                if not ret:
+                    break
+                yield i, frame, float(self.timestamps[i])
+        finally:
+            cap.release()
+
+
+# Feeds a recording to tracker.process_img like FrameEngine would (BGR -> RGB,
+# perf_counter frame times). Recorded timestamps are shifted onto the current
+# clock so filters and blink timing see the original frame spacing; realtime
+# also sleeps to keep that spacing, otherwise frames go in as fast as possible.
+# on_frame(index, display_img) is called after every frame.
+def replay(recording, tracker, realtime=False, profiler=None, on_frame=None):
+    profiler = profiler if profiler is not None else NULL_PROFILER
+    start = time.perf_counter()
+    first_timestamp = None
+    for i, frame, timestamp in recording.frames():
+        if first_timestamp is None:
+            first_timestamp = timestamp
+        frame_time = start + (timestamp - first_timestamp)
+        if realtime:
+            delay = frame_time - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+
+        with profiler.stage("color"):
+            frame = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
+        display_img = tracker.process_img(frame, frameTime=frame_time)
+        if on_frame is not None:
+            on_frame(i, display_img)
+    return time.perf_counter() - start
+
+
+if __name__ == "__main__":
+    import argparse
+
+    from headPoseEstimator import HeadPoseEstimator
+    from inputBackends import RecordingBackend
+
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("path", help="output file, .mp4/.avi/.mkv for video, anything else for raw frames")
+    parser.add_argument("--seconds", type=float, default=30)
+    parser.add_argument("--camera", type=int, default=0)
+    parser.add_argument("--no-landmarks", action="store_true", help="skip running the landmarker while recording")
+    args = parser.parse_args()
+
+    cap = cv2.VideoCapture(args.camera)
+    fps = cap.get(cv2.CAP_PROP_FPS) or DEFAULT_RECORDING_FPS
+    recorder = FrameRecorder(args.path, fps=fps)
+    # the cursor is not moved while recording, the estimator only supplies landmarker outputs
+    tracker = None if args.no_landmarks else HeadPoseEstimator(inputBackend=RecordingBackend(), profilePath=None)
+
+    print(f"Recording {args.seconds:.0f}s to {args.path}")
+    start = time.perf_counter()
+    try:
+        while cap.isOpened() and time.perf_counter() - start < args.seconds:
+            ret, frame = cap.read()
+            if not ret:
+                break
+            timestamp = time.perf_counter()
+            points, matrix = None, None
+            if tracker is not None:
+                tracker.process_img(cv2.cvtColor(frame, cv2.COLOR_BGR2RGB), moveMouse=False, frameTime=timestamp)
+                points, matrix = tracker.last_landmarker_output()
+            recorder.write(frame, timestamp, points, matrix)
+    except KeyboardInterrupt:
+        pass
+
+    recorder.close()
+    cap.release()
+    if tracker is not None:
+        tracker.close()
+    print(f"Saved {len(recorder)} frames and {sidecar_path(args.path)}")
@@ -0,0 +1,159 @@
+import numpy as np
+
+RELEASE_RATIO = 0.7  # a held gesture stays held until its scores drop below threshold * this
+DEFAULT_HOLD = 0.12  # seconds a gesture has to be held before it fires, filters single-frame spikes
+DEFAULT_COOLDOWN = 0.4  # minimum seconds between two firings of the same gesture
+DWELL_RADIUS_PX = 30  # cursor movement that still counts as resting on a target
+DWELL_SECONDS = 0.8
+
+
+# A facial gesture as conditions on blendshape scores (names as the landmarker
+# reports them; the preview is mirrored, so "Left" may look like the right eye):
+# every `on` score must reach its threshold, every `off` score must stay below its maximum
+class Gesture:
+    def __init__(self, name, on, off=(), hold=DEFAULT_HOLD, cooldown=DEFAULT_COOLDOWN):
+        if not on:
+            raise ValueError(f"Gesture '{name}' needs at least one 'on' condition")
+        self.name = name
+        self.on = list(on)  # [(blendshape, threshold)]
+        self.off = list(off)  # [(blendshape, maximum)]
+        self.hold = hold
+        self.cooldown = cooldown
+
+
+DEFAULT_GESTURES = [
+    Gesture("mouth_open", on=[("jawOpen", 0.6)], hold=0.25),  # longer hold, speech opens the mouth too
+    Gesture("smile", on=[("mouthSmileLeft", 0.7), ("mouthSmileRight", 0.7)], hold=0.2),
+    Gesture("brow_raise", on=[("browInnerUp", 0.6), ("browOuterUpLeft", 0.4), ("browOuterUpRight", 0.4)]),
+    # one eye shut, the other clearly open; a normal blink closes both and matches neither
+    Gesture("wink_left", on=[("eyeBlinkLeft", 0.6)], off=[("eyeBlinkRight", 0.3)]),
+    Gesture("wink_right", on=[("eyeBlinkRight", 0.6)], off=[("eyeBlinkLeft", 0.3)]),
+]
+# gesture -> action; mouse actions run directly, anything else goes to the tracker's
+# onGestureAction callback (the Frontend passes voice command phrases to process_command)
+DEFAULT_GESTURE_ACTIONS = {
+    "wink_left": "left_click",
+    "wink_right": "right_click",
+    "brow_raise": "double_click",
+    "mouth_open": "toggle scrolling",
+    "smile": "toggle drag",
+}
+MOUSE_ACTIONS = ("left_click", "right_click", "double_click")
+
+
+# Fires an action once when the cursor has rested within radius_px for seconds,
+# and re-arms after it moves away
+class DwellClicker:
+    def __init__(self, seconds=DWELL_SECONDS, radius_px=DWELL_RADIUS_PX, action="left_click"):
+        self.seconds = seconds
+        self.radius_px = radius_px
+        self.action = action
+        self.reset()
+
+    def reset(self):
+        self.anchor = None
+        self.since = None
+        self.fired = False
+
+    # position is the (x, y) cursor target in pixels, None when there is no face
+    def update(self, position, timestamp):
+        if position is None:
+            self.reset()
+            return None
+        if self.anchor is None or np.hypot(position[0] - self.anchor[0], position[1] - self.anchor[1]) > self.radius_px:
+            self.anchor = position
+            self.since = timestamp
+            self.fired = False
+            return None
+        if not self.fired and timestamp - self.since >= self.seconds:
+            self.fired = True
+            return self.action
+        return None
+
+
+# Evaluates every gesture from the frame's blendshape scores (see BlendshapeArray
+# in landmarkArray.py) in one vectorized comparison and turns gestures held for
+# their hold time into actions, each with its own cooldown. Actions fire as soon
+# as the gesture is recognized, there is no multi-blink counting window.
+class GestureEngine:
+    def __init__(self, gestures=DEFAULT_GESTURES, actions=DEFAULT_GESTURE_ACTIONS, dwell=None):
+        # only gestures bound to an action are evaluated
+        self.gestures = [gesture for gesture in gestures if actions.get(gesture.name)]
+        self.actions = dict(actions)
+        self.dwell = dwell
+        self.names = None  # blendshape names the condition arrays were built for
+        self.held_since = [None] * len(self.gestures)
+        self.fired = [False] * len(self.gestures)
+        self.last_fire = [float("-inf")] * len(self.gestures)
+        self.fire_count = 0
+
+    def set_action(self, gesture, action):
+        self.actions[gesture] = action
+
+    # names of the gestures currently held
+    def active(self):
+        return [gesture.name for gesture, since in zip(self.gestures, self.held_since) if since is not None]
+
+    # blendshapes is a BlendshapeArray after update(), cursor the (x, y) cursor target
+    # in pixels for dwell clicking (None pauses and resets the dwell timer);
+    # returns [(gesture name, action)] fired this frame
+    def update(self, blendshapes, timestamp, cursor=None):
+        events = []
+        scores = blendshapes.scores if blendshapes is not None else None
+        if scores is None or not self.gestures:
+            self.__release_all()
+        else:
+            if self.names is not blendshapes.names:
+                self.__build(blendshapes)
+            held = self.__evaluate(scores)
+            for i, gesture in enumerate(self.gestures):
+                if not held[i]:
+                    self.held_since[i] = None
+                    self.fired[i] = False
+                    continue
+                if self.held_since[i] is None:
+                    self.held_since[i] = timestamp
+                if (not self.fired[i] and timestamp - self.held_since[i] >= gesture.hold
+                        and timestamp - self.last_fire[i] >= gesture.cooldown):
+                    self.fired[i] = True  # once per hold, the gesture has to be released first
+                    self.last_fire[i] = timestamp
+                    events.append((gesture.name, self.actions[gesture.name]))
+
+        if self.dwell is not None:
+            action = self.dwell.update(cursor if scores is not None else None, timestamp)
+            if action is not None:
+                events.append(("dwell", action))
+        self.fire_count += len(events)
+        return events
+
+    # one flat condition list for all gestures: score * sign >= threshold * sign,
+    # sign -1 turns an `off` maximum into the same comparison
+    def __build(self, blendshapes):
+        indices, signs, thresholds, owners = [], [], [], []
+        for i, gesture in enumerate(self.gestures):
+            for conditions, sign in ((gesture.on, 1.0), (gesture.off, -1.0)):
+                for name, threshold in conditions:
+                    if name not in blendshapes.index:
+                        raise ValueError(f"Gesture '{gesture.name}' uses unknown blendshape '{name}'")
+                    indices.append(blendshapes.index[name])
+                    signs.append(sign)
+                    thresholds.append(threshold * sign)
+                    owners.append(i)
+        self.cond_index = np.array(indices, dtype=np.intp)
+        self.cond_sign = np.array(signs, dtype=np.float32)
+        self.cond_threshold = np.array(thresholds, dtype=np.float32)
+        # held gestures only need RELEASE_RATIO of their `on` thresholds
+        self.cond_release = np.where(self.cond_sign > 0, self.cond_threshold * RELEASE_RATIO, self.cond_threshold)
+        self.cond_owner = np.array(owners, dtype=np.intp)
+        self.cond_starts = np.flatnonzero(np.r_[True, np.diff(self.cond_owner) != 0])
+        self.names = blendshapes.names
+
+    def __evaluate(self, scores):
+        holding = np.array([since is not None for since in self.held_since])[self.cond_owner]
+        thresholds = np.where(holding, self.cond_release, self.cond_threshold)
+        met = scores[self.cond_index] * self.cond_sign >= thresholds
+        return np.minimum.reduceat(met, self.cond_starts)
+
+    def __release_all(self):
+        self.held_since = [None] * len(self.gestures)
+        self.fired = [False] * len(self.gestures)
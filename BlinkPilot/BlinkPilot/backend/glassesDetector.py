@@ -0,0 +1,134 @@
+import threading
+import time
+from collections import deque
+
+import cv2
+import numpy as np
+
+from landmarkArray import to_pixels
+from frameProfiler import NULL_PROFILER
+
+NOSE_REGION_HALF_SIZE = 50  # pixels around the nose bridge landmark
+REFRESH_INTERVAL = 5.0  # seconds between re-checks while the face stays put
+FACE_BOX_CHANGE = 0.3  # re-check early when the face moves/scales by this fraction of its size
+VERDICT_HISTORY = 5  # samples the verdict is smoothed over (majority vote)
+
+
+def nose_bridge_region(points, nose_bridge_index, width, height):
+    x, y = to_pixels(points, nose_bridge_index, width, height).tolist()
+    return (max(0, x - NOSE_REGION_HALF_SIZE), max(0, y - NOSE_REGION_HALF_SIZE),
+            x + NOSE_REGION_HALF_SIZE, y + NOSE_REGION_HALF_SIZE)
+
+
+# Looks for the vertical edge of a glasses bridge in the nose region
+def has_stick(roi):
+    if roi.size == 0:
+        return False
+    # Convert to grayscale and apply edge detection (Canny)
+    gray_roi = cv2.cvtColor(roi, cv2.COLOR_RGB2GRAY)
+    edges = cv2.Canny(gray_roi, 50, 150)
+
+    # Apply Hough Line Transform to detect lines
+    lines = cv2.HoughLinesP(edges, 1, np.pi / 180, threshold=50, minLineLength=50, maxLineGap=10)
+    if lines is None:
+        return False
+    lines = lines.reshape(-1, 4)  # rows of x1, y1, x2, y2
+    # vertical if the line's x barely changes
+    return bool(np.any(np.abs(lines[:, 0] - lines[:, 2]) < 10))
+
+
+# Glasses rarely come on or off mid-session, so the Canny/Hough check runs on a
+# background thread every refresh_interval seconds (or when the face box moves
+# a lot) and the per-frame call just returns the cached, smoothed verdict.
+# background=False runs the check inside update() instead, so replays and sweeps
+# see the verdict change on the same frame every run.
+class GlassesDetector:
+    def __init__(self, check_indices, nose_bridge_index, refresh_interval=REFRESH_INTERVAL,
+                 box_change=FACE_BOX_CHANGE, history=VERDICT_HISTORY, profiler=None, background=True):
+        self.check_indices = check_indices
+        self.nose_bridge_index = nose_bridge_index
+        self.refresh_interval = refresh_interval
+        self.box_change = box_change
+        self.profiler = profiler if profiler is not None else NULL_PROFILER
+
+        self.samples = deque(maxlen=history)
+        self.verdict = False
+        self.last_check_time = None
+        self.last_face_box = None
+        self.last_cost = 0.0  # seconds spent in the most recent background check
+        self.evaluations = 0
+
+        self.job = None
+        self.condition = threading.Condition()
+        self.running = True
+        self.worker = None
+        if background:
+            self.worker = threading.Thread(target=self.__worker_loop, name="glasses", daemon=True)
+            self.worker.start()
+
+    def close(self, timeout=1.0):
+        with self.condition:
+            self.running = False
+            self.condition.notify()
+        if self.worker is not None:
+            self.worker.join(timeout)
+
+    # called every frame, only copies the small nose region when a check is due
+    def update(self, image, points, timestamp):
+        face_box = self.__face_box(points)
+        if self.__check_due(face_box, timestamp):
+            h, w = image.shape[:2]
+            x0, y0, x1, y1 = nose_bridge_region(points, self.nose_bridge_index, w, h)
+            roi = np.array(image[y0:y1, x0:x1])
+            # Check for glasses based on eye and nose landmarks
+            x = points[self.check_indices, 0]
+            landmark_hint = bool(np.any((x < 0.25) | (x > 0.8)))  # Example condition, adjust based on tests
+            if self.worker is None:
+                self.last_check_time = timestamp
+                self.last_face_box = face_box
+                self.__evaluate(roi, landmark_hint)
+                return self.verdict
+            with self.condition:
+                if self.job is None:
+                    self.job = (roi, landmark_hint)
+                    self.last_check_time = timestamp
+                    self.last_face_box = face_box
+                    self.condition.notify()
+        return self.verdict
+
+    def stats(self):
+        return {"verdict": self.verdict, "last_cost": self.last_cost, "evaluations": self.evaluations}
+
+    def __face_box(self, points):
+        (x_min, y_min), (x_max, y_max) = points[:, :2].min(axis=0), points[:, :2].max(axis=0)
+        return ((x_min + x_max) / 2, (y_min + y_max) / 2, max(x_max - x_min, y_max - y_min))
+
+    def __check_due(self, face_box, timestamp):
+        if self.last_check_time is None or timestamp - self.last_check_time >= self.refresh_interval:
+            return True
+        cx, cy, size = face_box
+        last_cx, last_cy, last_size = self.last_face_box
+        moved = np.hypot(cx - last_cx, cy - last_cy) > self.box_change * last_size
+        scaled = abs(size - last_size) > self.box_change * last_size
+        return moved or scaled
+
+    def __worker_loop(self):
+        while True:
+            with self.condition:
+                while self.running and self.job is None:
+                    self.condition.wait()
+                if not self.running:
+                    return
+                roi, landmark_hint = self.job
+
+            self.__evaluate(roi, landmark_hint)
+            with self.condition:
+                self.job = None
+
+    def __evaluate(self, roi, landmark_hint):
+        start = time.perf_counter()
+        self.samples.append(landmark_hint or has_stick(roi))
+        self.verdict = sum(self.samples) * 2 > len(self.samples)
+        self.last_cost = time.perf_counter() - start
+        self.profiler.record("glasses", self.last_cost)
+        self.evaluations += 1
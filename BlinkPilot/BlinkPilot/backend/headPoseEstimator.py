@@ -1,14 +1,22 @@
 import cv2
 import mediapipe as mp
-from mediapipe import solutions
-from mediapipe.framework.formats import landmark_pb2
 from mediapipe.tasks import python
 from mediapipe.tasks.python import vision
 import time
+import threading
 import numpy as np
 
-from Rotation2Vector import RotationVector, SensitivityParams, rot2MouseVector
+from Rotation2Vector import RotationVector, SensitivityParams, rot2MouseVector, CursorMapper, MAPPING_MODES
 from MouseAction import Mouse
+from cursorFilters import FILTERS, create_filter
+from landmarkArray import LandmarkArray, BlendshapeArray, eye_indices, compute_ears, to_pixels
+from roiTracker import RoiTracker
+from calibration import Calibrator, CalibrationProfile, DEFAULT_PROFILE_PATH
+from blinkDetector import BlinkDetector
+from glassesDetector import GlassesDetector, nose_bridge_region
+from frameProfiler import FrameProfiler, NULL_PROFILER
+from meshRenderer import MeshRenderer, MESH_DETAIL_LEVELS, DEFAULT_MESH_DETAIL
+from gestureEngine import GestureEngine, DwellClicker, MOUSE_ACTIONS
 
 MODEL_PATH = "backend/face_landmarker.task"
 # eye landmarks needed to calculate EAR
@@ -18,210 +26,375 @@ LEFT_EYE_LANDMARKS = {"top": 159, "bottom": 145, "outer": 133, "inner": 33}
 RIGHT_EYE_LANDMARKS = {"top": 386, "bottom": 374, "outer": 362, "inner": 263}
 
 NOSE_LANDMARKS = [1, 2, 168, 169]
-EAR_THRESHOLD = 0.25  # Adjust based on testing
+NOSE_BRIDGE_LANDMARK = 168
+
+# index arrays for batched lookups into the (N, 3) landmark array
+EYE_INDICES = eye_indices(LEFT_EYE_LANDMARKS, RIGHT_EYE_LANDMARKS)  # rows: left, right
+GLASSES_CHECK_INDICES = np.concatenate([EYE_INDICES.ravel(), NOSE_LANDMARKS])
+
+EAR_THRESHOLD = 0.25  # Adjust based on testing, a calibration profile overrides these per eye
 EAR_THRESHOLD_GLASSES = 0.5  # increase threshold to accommodate glasses
 
 DEFAULT_SENSITIVITY = 1
 DEFAULT_DEADZONE = 0.05
 DEFAULT_CLICK_INTERVAL = 0.2
+DEFAULT_CURSOR_FILTER = "one_euro"  # "ema", "one_euro" or "kalman", see cursorFilters.py
+DEFAULT_MAPPING_MODE = "absolute"  # "absolute", "relative" or "hybrid", see CursorMapper
+DEFAULT_PREVIEW_INTERVAL = 10  # in control-only mode, annotate every Nth frame (0 = never)
+
+# "video" and "live_stream" let the landmarker track the face between frames
+# instead of running full face detection every time
+RUNNING_MODES = {
+	"image": vision.RunningMode.IMAGE,
+	"video": vision.RunningMode.VIDEO,
+	"live_stream": vision.RunningMode.LIVE_STREAM,
+}
+DEFAULT_RUNNING_MODE = "image"
+
+DEFAULT_INFERENCE_WIDTH = None  # pixels, None = feed the landmarker at camera resolution
 
 class HeadPoseEstimator:
-	def __init__(self, sensitivity=DEFAULT_SENSITIVITY, deadzone=DEFAULT_DEADZONE, blinkInterval=DEFAULT_CLICK_INTERVAL):
-		self.mouse = Mouse(click_interval=blinkInterval)
+	def __init__(self, sensitivity=DEFAULT_SENSITIVITY, deadzone=DEFAULT_DEADZONE, blinkInterval=DEFAULT_CLICK_INTERVAL,
+				 controlOnly=False, previewInterval=DEFAULT_PREVIEW_INTERVAL, runningMode=DEFAULT_RUNNING_MODE,
+				 inferenceWidth=DEFAULT_INFERENCE_WIDTH, roiTracking=False, inputBackend="auto",
+				 cursorFilter=DEFAULT_CURSOR_FILTER, mappingMode=DEFAULT_MAPPING_MODE, profilePath=DEFAULT_PROFILE_PATH,
+				 profiler=None, detector=None, meshDetail=DEFAULT_MESH_DETAIL, gazeTracker=None, gestures=None,
+				 blinkClicks=True, onGestureAction=None, backgroundGlasses=True, mouse=None):
+		if runningMode not in RUNNING_MODES:
+			raise ValueError(f"Unknown running mode '{runningMode}', expected one of {list(RUNNING_MODES)}")
+		if detector is not None and runningMode == "live_stream":
+			raise ValueError("A stand-in detector only supports the 'image' and 'video' running modes")
+		# per-stage timings, see frameProfiler.py; the default records nothing
+		self.profiler = profiler if profiler is not None else NULL_PROFILER
+		# mouse is an existing Mouse to drive instead of a new one on inputBackend; the
+		# caller keeps it (and closes it), e.g. the Frontend's for its voice commands
+		self.owns_mouse = mouse is None
+		if mouse is None:
+			mouse = Mouse(click_interval=blinkInterval, backend=inputBackend, cursor_filter=create_filter(cursorFilter),
+						  cursor_mapper=CursorMapper(mappingMode))
+		else:
+			mouse.setClickInterval(blinkInterval)
+			mouse.setCursorFilter(create_filter(cursorFilter))
+			mouse.setCursorMapper(CursorMapper(mappingMode))
+		self.mouse = mouse
 		self.sensitivity = SensitivityParams(sensitivity, deadzone)  # set sensitivity and deadzone
-		self.__init_model()
+		self.frame_count = 0
+		self.landmarks = LandmarkArray()
+		self.roi = RoiTracker(inference_width=inferenceWidth, track_roi=roiTracking)
+		self.blink_detector = BlinkDetector()
+		self.mesh_renderer = MeshRenderer(meshDetail)
+		# backgroundGlasses=False checks for glasses on the frame itself, for reproducible replays
+		self.glasses = GlassesDetector(GLASSES_CHECK_INDICES, NOSE_BRIDGE_LANDMARK, profiler=self.profiler,
+									   background=backgroundGlasses)
+		# gazeTracker.GazeTracker turns iris landmarks + head vector into the cursor vector, None = head pose only
+		self.gaze = gazeTracker
+		self.last_head_vector = None
+		# gestureEngine.GestureEngine clicks on face gestures and dwell; blinkClicks keeps the blink-count clicks.
+		# onGestureAction(action) receives gesture actions that are not mouse clicks
+		self.gestures = gestures
+		self.blendshapes = BlendshapeArray()
+		self.blink_clicks = blinkClicks
+		self.on_gesture_action = onGestureAction
+		self.set_control_only(controlOnly, previewInterval)
+
+		self.profile_path = profilePath
+		self.profile = None
+		self.calibrator = None
+		if profilePath is not None:
+			profile = CalibrationProfile.load(profilePath)
+			if profile is not None:
+				self.apply_profile(profile)
+
+		self.running_mode = runningMode
+		self.last_timestamp_ms = -1
+		# live_stream bookkeeping: frames waiting for their result, newest finished preview
+		self.live_lock = threading.Lock()
+		self.pending_frames = {}
+		self.latest_display = None
+		self.last_detection = None
+		# detector replaces the FaceLandmarker, e.g. landmarkStore.StoredLandmarker for offline sweeps
+		self.detector = detector
+		if detector is None:
+			self.__init_model()
 
 	def set_blink_interval(self, newInterval):
 		self.mouse.setClickInterval(newInterval)
 
-	def process_img(self, img, moveMouse=True, drawMask=True, blinkAnnot=True, displayAngle=True, verbose=False):
-		mp_image = mp.Image(image_format=mp.ImageFormat.SRGB, data=cv2.flip(img, 1))
-		detection_result = self.detector.detect(mp_image)
-		roll, pitch, yaw = self.__get_euler_angles(detection_result)
+	# control-only mode drives the mouse without copying or annotating frames,
+	# process_img then returns None except on every previewInterval-th frame
+	def set_control_only(self, enabled, previewInterval=None):
+		self.control_only = enabled
+		if previewInterval is not None:
+			self.preview_interval = max(0, int(previewInterval))
+
+	# In "live_stream" mode the frame is only submitted here; the mouse is driven from
+	# the landmarker's result callback and this returns the newest preview finished
+	# since the last call (or None)
+	# frameTime is the perf_counter timestamp of the capture, defaults to now
+	def process_img(self, img, moveMouse=True, drawMask=True, blinkAnnot=True, displayAngle=True, verbose=False,
+					frameTime=None):
+		if frameTime is None:
+			frameTime = time.perf_counter()
+		self.frame_count += 1
+		annotate = self.__should_annotate()
+		with self.profiler.stage("flip"):
+			frame = cv2.flip(img, 1)
+		# the landmarker only sees the (downscaled) face crop, results are mapped back to frame
+		inference_img, roi_box = self.roi.prepare(frame)
+		mp_image = mp.Image(image_format=mp.ImageFormat.SRGB, data=inference_img)
+		options = (annotate, moveMouse, drawMask, blinkAnnot, verbose)
+
+		if self.running_mode == "live_stream":
+			timestamp_ms = self.__next_timestamp_ms()
+			with self.live_lock:
+				self.pending_frames[timestamp_ms] = (frame, roi_box, frameTime, time.perf_counter(), options)
+				display_img, self.latest_display = self.latest_display, None
+			self.detector.detect_async(mp_image, timestamp_ms)
+			return display_img
+
+		with self.profiler.stage("detect"):
+			if self.running_mode == "video":
+				detection_result = self.detector.detect_for_video(mp_image, self.__next_timestamp_ms())
+			else:
+				detection_result = self.detector.detect(mp_image)
+		return self.__process_result(detection_result, frame, roi_box, frameTime, *options)
+
+	def __on_live_result(self, detection_result, mp_image, timestamp_ms):
+		with self.live_lock:
+			pending = self.pending_frames.pop(timestamp_ms, None)
+			# the landmarker skips frames while busy, forget options for any it dropped
+			for stale in [ts for ts in self.pending_frames if ts < timestamp_ms]:
+				del self.pending_frames[stale]
+		if pending is None:
+			return
+		frame, roi_box, frame_time, submit_time, options = pending
+		# async detection is timed from submission to result, including any queueing in the landmarker
+		self.profiler.record("detect", time.perf_counter() - submit_time)
+		display_img = self.__process_result(detection_result, frame, roi_box, frame_time, *options)
+		if display_img is not None:
+			with self.live_lock:
+				self.latest_display = display_img
+
+	def __next_timestamp_ms(self):
+		# VIDEO and LIVE_STREAM modes require strictly increasing timestamps
+		timestamp_ms = max(int(time.monotonic() * 1000), self.last_timestamp_ms + 1)
+		self.last_timestamp_ms = timestamp_ms
+		return timestamp_ms
+
+	def __process_result(self, detection_result, frame, roi_box, frame_time, annotate, moveMouse, drawMask, blinkAnnot, verbose):
+		self.last_detection = detection_result
+		points = self.landmarks.update(detection_result)
+		if points is not None:
+			self.roi.to_full_frame(points, roi_box, frame.shape)
+		self.roi.update(points, frame.shape)
+		with self.profiler.stage("euler"):
+			roll, pitch, yaw = self.__get_euler_angles(detection_result)
+
+		if self.calibrator is not None:
+			if points is not None:
+				self.calibrator.add_sample(pitch, yaw, *self.__calculate_EAR(points), frame_time)
+			else:
+				self.calibrator.advance(frame_time)
+			if self.calibrator.done:
+				self.__finish_calibration()
+			return frame if annotate else None
+
+		if self.profile is not None:
+			pitch -= self.profile.neutral_pitch
+			yaw -= self.profile.neutral_yaw
 		rotation = RotationVector(roll, pitch, yaw)
-		if moveMouse:
+		with self.profiler.stage("mouse"):
 			mouseVector = rot2MouseVector(rotation, self.sensitivity)
-			self.mouse.moveCursor(mouseVector)
-		display_img = mp_image.numpy_view()
-		if drawMask:
-			display_img = self.__draw_landmarks_on_image(display_img, detection_result)
-		display_img, glasses_detected = self.__detect_glasses(display_img, detection_result)
-		if glasses_detected:
+			self.last_head_vector = mouseVector if points is not None else None  # gaze calibration reads this
+			if self.gaze is not None:
+				mouseVector = self.gaze.update(points, mouseVector, frame.shape[1] / frame.shape[0], frame_time)
+			if moveMouse:
+				if self.mouse.scroll_mode:
+					# head pitch drives the wheel, the cursor stays where scrolling started;
+					# without a face the wheel stops once the last velocity goes stale
+					if self.last_head_vector is not None:
+						self.mouse.scrollWithVector(self.last_head_vector, frame_time)
+				else:
+					self.mouse.moveCursor(mouseVector, frame_time)
+		# frame is ours (flipped copy of the input), annotations are drawn on it in place
+		display_img = frame
+		with self.profiler.stage("annotate"):
+			# glasses first, so its nose crop is taken before anything is drawn over it
+			display_img, glasses_detected = self.__detect_glasses(display_img, points, frame_time, annotate)
+			if drawMask and annotate:
+				display_img = self.__draw_landmarks_on_image(display_img, points)
+		ear_thresholds = self.profile.ear_thresholds() if self.profile is not None else None
+		if ear_thresholds is None:
 			# increase threshold to accommodate glasses
-			ear_threshold = EAR_THRESHOLD_GLASSES
-		else:
-			ear_threshold = EAR_THRESHOLD
-		display_img, blinked = self.__detect_blink(display_img, detection_result, blinkAnnot, ear_threshold)
-		if blinked:
-			self.mouse.registerClick()
-		self.mouse.checkClick(verbose)
-
+			ear_threshold = EAR_THRESHOLD_GLASSES if glasses_detected else EAR_THRESHOLD
+			ear_thresholds = (ear_threshold, ear_threshold)
+		with self.profiler.stage("blink"):
+			display_img, ears = self.__detect_blink(display_img, points, blinkAnnot and annotate, ear_thresholds)
+			# one event per real blink, however many frames the eyes stay closed
+			blink_event = self.blink_detector.update(ears, ear_thresholds, frame_time)
+		with self.profiler.stage("click"):
+			if blink_event is not None:
+				if verbose: print(f"blink ({blink_event.eyes}, {blink_event.duration * 1000:.0f} ms)")
+				if self.blink_clicks:
+					self.mouse.registerClick(blink_event.end_time)
+			self.mouse.checkClick(verbose, frame_time, self.blink_detector.closing(frame_time))
+		if self.gestures is not None:
+			with self.profiler.stage("gesture"):
+				self.__run_gestures(detection_result, points, frame_time, moveMouse, verbose)
+
+		if not annotate:
+			return None
 		return display_img
 
+	def __run_gestures(self, detection_result, points, frame_time, moveMouse, verbose):
+		if points is not None and self.blendshapes.update(detection_result) is not None:
+			position = self.mouse.position
+			# the cursor rests while scrolling and may rest mid-drag, neither is a dwell on a target
+			cursor = None if self.mouse.scroll_mode or self.mouse.dragging else (position.x, position.y)
+			events = self.gestures.update(self.blendshapes, frame_time, cursor)
+		else:
+			events = self.gestures.update(None, frame_time)
+		for gesture, action in events:
+			if verbose: print(f"gesture {gesture} -> {action}")
+			if action in MOUSE_ACTIONS:
+				if moveMouse:
+					getattr(self.mouse, action)()
+					self.mouse.last_action_time = frame_time  # hold the cursor still like blink clicks do
+			elif self.on_gesture_action is not None:
+				self.on_gesture_action(action)
+
+	# copies of the most recent frame's (N, 3) full-frame landmarks and 4x4 facial
+	# transformation matrix, (None, None) when no face was found
+	def last_landmarker_output(self):
+		if self.last_detection is None or self.landmarks.count == 0:
+			return None, None
+		points = self.landmarks.buffer[:self.landmarks.count].copy()
+		matrices = self.last_detection.facial_transformation_matrixes
+		matrix = np.array(matrices[0]).reshape(4, 4) if matrices else None
+		return points, matrix
+
+	def __should_annotate(self):
+		if not self.control_only:
+			return True
+		return self.preview_interval > 0 and self.frame_count % self.preview_interval == 0
+
+	def apply_profile(self, profile):
+		self.profile = profile
+		self.sensitivity.max_pitch = profile.max_pitch
+		self.sensitivity.max_yaw = profile.max_yaw
+
+	# while calibrating, frames feed the calibrator and the mouse is left alone;
+	# the fitted profile is applied and saved to profilePath once all phases are done
+	def start_calibration(self):
+		self.calibrator = Calibrator()
+
+	def __finish_calibration(self):
+		profile = self.calibrator.fit()
+		self.calibrator = None
+		self.apply_profile(profile)
+		if self.profile_path is not None:
+			profile.save(self.profile_path)
+
+	# "full" or "contours", see meshRenderer.py
+	def set_mesh_detail(self, detail):
+		self.mesh_renderer.set_detail(detail)
+
+	def set_mapping_mode(self, mode):
+		self.mouse.setCursorMapper(CursorMapper(mode))
+
 	def set_sensitivity_params(self, sensitivity, deadzone):
 		self.sensitivity.sensitivity = sensitivity
 		self.sensitivity.deadzone = min(1, deadzone)
 
+	def close(self):
+		self.detector.close()
+		if self.owns_mouse:
+			self.mouse.close()
+		self.glasses.close()
+
 	def __init_model(self):
 		# Creating Face Landmarker Object
 		base_options = python.BaseOptions(model_asset_path=MODEL_PATH)
+		result_callback = self.__on_live_result if self.running_mode == "live_stream" else None
 		options = vision.FaceLandmarkerOptions(base_options=base_options,
+											   running_mode=RUNNING_MODES[self.running_mode],
+											   result_callback=result_callback,
 											   output_face_blendshapes=True,
 											   output_facial_transformation_matrixes=True,
 											   num_faces=1)
 		self.detector = vision.FaceLandmarker.create_from_options(options)
 
-	def __draw_landmarks_on_image(self, rgb_image, detection_result):
-		face_landmarks_list = detection_result.face_landmarks
-		annotated_image = np.copy(rgb_image)
-
-		# Loop through the detected faces to visualize.
-		for idx in range(len(face_landmarks_list)):
-			face_landmarks = face_landmarks_list[idx]
-
-			# Draw the face landmarks.
-			face_landmarks_proto = landmark_pb2.NormalizedLandmarkList()
-			face_landmarks_proto.landmark.extend([
-				landmark_pb2.NormalizedLandmark(x=landmark.x, y=landmark.y, z=landmark.z) for landmark in face_landmarks
-			])
-
-			solutions.drawing_utils.draw_landmarks(
-				image=annotated_image,
-				landmark_list=face_landmarks_proto,
-				connections=solutions.face_mesh.FACEMESH_TESSELATION,
-				landmark_drawing_spec=None,
-				connection_drawing_spec=solutions.drawing_styles
-				.get_default_face_mesh_tesselation_style())
-			solutions.drawing_utils.draw_landmarks(
-				image=annotated_image,
-				landmark_list=face_landmarks_proto,
-				connections=solutions.face_mesh.FACEMESH_CONTOURS,
-				landmark_drawing_spec=None,
-				connection_drawing_spec=solutions.drawing_styles
-				.get_default_face_mesh_contours_style())
-			solutions.drawing_utils.draw_landmarks(
-				image=annotated_image,
-				landmark_list=face_landmarks_proto,
-				connections=solutions.face_mesh.FACEMESH_IRISES,
-				landmark_drawing_spec=None,
-				connection_drawing_spec=solutions.drawing_styles
-				.get_default_face_mesh_iris_connections_style())
-
-		return annotated_image
-
-	def detect_stick_through_nose_bridge(self, image, face_landmarks):
-		h, w, _ = image.shape
-
-		# Landmark 168 for nose bridge (upper part)
-		nose_bridge_x = int(face_landmarks[168].x * w)
-		nose_bridge_y = int(face_landmarks[168].y * h)
-
-		# Define the region around landmark 168 (bounding box)
-		region_top_left = (nose_bridge_x - 50, nose_bridge_y - 50)
-		region_bottom_right = (nose_bridge_x + 50, nose_bridge_y + 50)
-		cv2.rectangle(image, region_top_left, region_bottom_right, (0, 255, 0), 2)
-
-		# Crop the region of interest around the nose bridge
-		roi = image[region_top_left[1]:region_bottom_right[1], region_top_left[0]:region_bottom_right[0]]
-
-		# Convert to grayscale and apply edge detection (Canny)
-		gray_roi = cv2.cvtColor(roi, cv2.COLOR_BGR2GRAY)
-		edges = cv2.Canny(gray_roi, 50, 150)
-
-		# Apply Hough Line Transform to detect lines
-		lines = cv2.HoughLinesP(edges, 1, np.pi / 180, threshold=50, minLineLength=50, maxLineGap=10)
-
-		# Check if any vertical lines are detected
-		if lines is not None:
-			for line in lines:
-				x1, y1, x2, y2 = line[0]
-				# Calculate the angle of the line (vertical if angle is near 90 degrees)
-				if abs(x1 - x2) < 10:  # Vertical line
-					cv2.line(roi, (x1, y1), (x2, y2), (0, 0, 255), 3)
-					cv2.putText(image, "Stick detected", (nose_bridge_x - 50, nose_bridge_y - 50),
-								cv2.FONT_HERSHEY_SIMPLEX, 1, (0, 0, 255), 2)
-					return True  # Stick detected in the region
-
-		return False  # No stick detected
-
-	# The main function for detecting glasses and stick detection
-	def __detect_glasses(self, srgb_image, detection_result):
-		face_landmarks_list = detection_result.face_landmarks
-		annotated_image = np.copy(srgb_image)
-		glasses_detected = False
-
-		for face_landmarks in face_landmarks_list:
-			h, w, _ = annotated_image.shape  # Image dimensions
-
-			# Check for glasses based on eye and nose landmarks
-			for idx in list(LEFT_EYE_LANDMARKS.values()) + list(RIGHT_EYE_LANDMARKS.values()) + NOSE_LANDMARKS:
-				landmark = face_landmarks[idx]
-				if landmark.x < 0.25 or landmark.x > 0.8:  # Example condition, adjust based on tests
-					glasses_detected = True
-					break
-
-			# Stick detection (through nose bridge, landmark 168)
-			if self.detect_stick_through_nose_bridge(annotated_image, face_landmarks.landmark):
-				glasses_detected = True
+	def __draw_landmarks_on_image(self, rgb_image, points):
+		# points are already mapped back to full-frame coordinates
+		if points is not None:
+			self.mesh_renderer.draw(rgb_image, points)
+		return rgb_image
+
+	# The glasses check itself runs in the background (see glassesDetector.py), this only
+	# reads the cached verdict and draws it
+	def __detect_glasses(self, srgb_image, points, frame_time, annotate=True):
+		annotated_image = srgb_image
+		if points is None:
+			return annotated_image, self.glasses.verdict
+
+		glasses_detected = self.glasses.update(srgb_image, points, frame_time)
+
+		if annotate:
+			h, w, _ = annotated_image.shape
+			x0, y0, x1, y1 = nose_bridge_region(points, NOSE_BRIDGE_LANDMARK, w, h)
+			cv2.rectangle(annotated_image, (x0, y0), (x1, y1), (0, 255, 0), 2)
+			if glasses_detected:
 				cv2.putText(annotated_image, "Glasses Detected - Adjusting Blink Sensitivity", (30, 100), cv2.FONT_HERSHEY_SIMPLEX, 1, (0, 0, 255), 2, cv2.LINE_AA)
 
 		return annotated_image, glasses_detected
 
-	# Function to draw landmarks, lines, and EAR, detects blinks
-	def __detect_blink(self, rgb_image, detection_result, draw_EAR, ear_threshold):
-		face_landmarks_list = detection_result.face_landmarks
-		annotated_image = np.copy(rgb_image)
-		blink = False
-
-		for face_landmarks in face_landmarks_list:
-			h, w, _ = annotated_image.shape  # Image dimensions
-
-			if draw_EAR:
-				for eye in [LEFT_EYE_LANDMARKS, RIGHT_EYE_LANDMARKS]:
-					# Get landmark coordinates
-					top = (int(face_landmarks[eye["top"]].x * w), int(face_landmarks[eye["top"]].y * h))
-					bottom = (int(face_landmarks[eye["bottom"]].x * w), int(face_landmarks[eye["bottom"]].y * h))
-					outer = (int(face_landmarks[eye["outer"]].x * w), int(face_landmarks[eye["outer"]].y * h))
-					inner = (int(face_landmarks[eye["inner"]].x * w), int(face_landmarks[eye["inner"]].y * h))
-
-					# Draw vertical line (green) - between top and bottom eyelid
-					cv2.line(annotated_image, top, bottom, (0, 255, 0), 2)
-
-					# Draw horizontal line (blue) - between inner and outer eye corners
-					cv2.line(annotated_image, inner, outer, (255, 0, 0), 2)
-
-					# Draw eye landmarks as yellow dots
-					for point in [top, bottom, outer, inner]:
-						cv2.circle(annotated_image, point, 4, (0, 255, 255), -1)
-
-			# Compute and display EAR
-			left_ear = self.__calculate_EAR(face_landmarks, LEFT_EYE_LANDMARKS)
-			right_ear = self.__calculate_EAR(face_landmarks, RIGHT_EYE_LANDMARKS)
-
-			if draw_EAR:
-				# Display EAR on the screen
-				cv2.putText(annotated_image, f"EAR_LEFT: {left_ear:.2f}, EAR_RIGHT: {right_ear:.2f}", (30, 50),
-							cv2.FONT_HERSHEY_SIMPLEX, 1, (0, 0, 255), 2, cv2.LINE_AA)
-
-			left_blink = left_ear < ear_threshold
-			right_blink = right_ear < ear_threshold
-
-			if left_blink or right_blink:
-				blink = True
-
-			if left_blink and right_blink and draw_EAR:
-				# Blink detection message
-				cv2.putText(annotated_image, "BLINKED BOTH EYES", (30, 90),
-							cv2.FONT_HERSHEY_SIMPLEX, 1, (0, 0, 255), 2, cv2.LINE_AA)
-			elif right_blink and draw_EAR:
-				cv2.putText(annotated_image, "BLINKED RIGHT EYE", (annotated_image.shape[1] - 300, 90),
-							cv2.FONT_HERSHEY_SIMPLEX, 1, (0, 0, 255), 2, cv2.LINE_AA)
-			elif left_blink and draw_EAR:
-				# Blink detection message
-				cv2.putText(annotated_image, "BLINKED LEFT EYE", (30, 90),
-							cv2.FONT_HERSHEY_SIMPLEX, 1, (0, 0, 255), 2, cv2.LINE_AA)
-
-		return annotated_image, blink
+	# Function to draw landmarks, lines, and EAR, returns (left EAR, right EAR) or None without a face
+	def __detect_blink(self, rgb_image, points, draw_EAR, ear_thresholds):
+		annotated_image = rgb_image
+		if points is None:
+			return annotated_image, None
+
+		h, w, _ = annotated_image.shape  # Image dimensions
+
+		if draw_EAR:
+			# (2 eyes, 4 points, xy) in pixels, points ordered top, bottom, outer, inner
+			for top, bottom, outer, inner in to_pixels(points, EYE_INDICES, w, h).tolist():
+				top, bottom, outer, inner = tuple(top), tuple(bottom), tuple(outer), tuple(inner)
+
+				# Draw vertical line (green) - between top and bottom eyelid
+				cv2.line(annotated_image, top, bottom, (0, 255, 0), 2)
+
+				# Draw horizontal line (blue) - between inner and outer eye corners
+				cv2.line(annotated_image, inner, outer, (255, 0, 0), 2)
+
+				# Draw eye landmarks as yellow dots
+				for point in [top, bottom, outer, inner]:
+					cv2.circle(annotated_image, point, 4, (0, 255, 255), -1)
+
+		# Compute and display EAR
+		left_ear, right_ear = self.__calculate_EAR(points)
+
+		if draw_EAR:
+			# Display EAR on the screen
+			cv2.putText(annotated_image, f"EAR_LEFT: {left_ear:.2f}, EAR_RIGHT: {right_ear:.2f}", (30, 50),
+						cv2.FONT_HERSHEY_SIMPLEX, 1, (0, 0, 255), 2, cv2.LINE_AA)
+
+		left_blink = left_ear < ear_thresholds[0]
+		right_blink = right_ear < ear_thresholds[1]
+
+		if left_blink and right_blink and draw_EAR:
+			# Blink detection message
+			cv2.putText(annotated_image, "BLINKED BOTH EYES", (30, 90),
+						cv2.FONT_HERSHEY_SIMPLEX, 1, (0, 0, 255), 2, cv2.LINE_AA)
+		elif right_blink and draw_EAR:
+			cv2.putText(annotated_image, "BLINKED RIGHT EYE", (annotated_image.shape[1] - 300, 90),
+						cv2.FONT_HERSHEY_SIMPLEX, 1, (0, 0, 255), 2, cv2.LINE_AA)
+		elif left_blink and draw_EAR:
+			# Blink detection message
+			cv2.putText(annotated_image, "BLINKED LEFT EYE", (30, 90),
+						cv2.FONT_HERSHEY_SIMPLEX, 1, (0, 0, 255), 2, cv2.LINE_AA)
+
+		return annotated_image, (left_ear, right_ear)
 
 	def __get_euler_angles(self, detection_result):
 		matrices = detection_result.facial_transformation_matrixes
@@ -235,67 +408,68 @@ class HeadPoseEstimator:
 		pitch, yaw, roll = cv2.RQDecomp3x3(rotation_matrix)[0]
 		return roll, -pitch, yaw
 
-	def __detect_pupil(self, eye_image):
-		gray_eye = cv2.cvtColor(eye_image, cv2.COLOR_BGR2GRAY)
-		blurred = cv2.GaussianBlur(gray_eye, (5, 5), 0)
-		circles = cv2.HoughCircles(blurred, cv2.HOUGH_GRADIENT, dp=1.2, minDist=30,
-								   param1=50, param2=30, minRadius=10, maxRadius=50)
-
-		if circles is not None:
-			circles = np.round(circles[0, :]).astype("int")
-			x, y, r = circles[0]
-			return (x, y, r)
-		return None
-
-	def __extract_eye_region(self, face_landmarks, eye_landmarks, image):
-		# Get bounding box coordinates for the eye region
-		eye_coords = [face_landmarks[i] for i in eye_landmarks]
-		x_coords = [coord[0] for coord in eye_coords]
-		y_coords = [coord[1] for coord in eye_coords]
-		x_min, x_max = min(x_coords), max(x_coords)
-		y_min, y_max = min(y_coords), max(y_coords)
-
-		# Crop the eye region
-		eye_image = image[y_min:y_max, x_min:x_max]
-		return eye_image
-
-	def map_to_screen(self, x, y, eye_image, screen_width, screen_height):
-		# Map coordinates from eye region to screen
-		screen_x = np.interp(x, [0, eye_image.shape[1]], [0, screen_width])
-		screen_y = np.interp(y, [0, eye_image.shape[0]], [0, screen_height])
-		return screen_x, screen_y
-
 	# Function to compute EAR
-	def __calculate_EAR(self, landmarks, eye):
-		"""Computes Eye Aspect Ratio (EAR)"""
-		top = np.array([landmarks[eye["top"]].x, landmarks[eye["top"]].y])
-		bottom = np.array([landmarks[eye["bottom"]].x, landmarks[eye["bottom"]].y])
-		outer = np.array([landmarks[eye["outer"]].x, landmarks[eye["outer"]].y])
-		inner = np.array([landmarks[eye["inner"]].x, landmarks[eye["inner"]].y])
-
-		vertical_dist = np.linalg.norm(top - bottom)
-		horizontal_dist = np.linalg.norm(outer - inner)
-
-		ear = vertical_dist / horizontal_dist
-		return ear
+	def __calculate_EAR(self, points):
+		"""Computes Eye Aspect Ratio (EAR) for the left and right eye in one batch"""
+		left_ear, right_ear = compute_ears(points, EYE_INDICES)
+		return float(left_ear), float(right_ear)
 
 if __name__ == "__main__":
+	import argparse
+
+	parser = argparse.ArgumentParser()
+	parser.add_argument("--control-only", action="store_true", help="drive the mouse without annotating frames")
+	parser.add_argument("--preview-every", type=int, default=DEFAULT_PREVIEW_INTERVAL,
+						help="in control-only mode, show every Nth frame (0 = no preview window)")
+	parser.add_argument("--running-mode", choices=list(RUNNING_MODES), default=DEFAULT_RUNNING_MODE,
+						help="landmarker running mode, video/live_stream track the face across frames")
+	parser.add_argument("--inference-width", type=int, default=DEFAULT_INFERENCE_WIDTH,
+						help="downscale the landmarker input to this width")
+	parser.add_argument("--roi", action="store_true", help="crop the landmarker input around the last face")
+	parser.add_argument("--cursor-filter", choices=list(FILTERS), default=DEFAULT_CURSOR_FILTER)
+	parser.add_argument("--mapping", choices=list(MAPPING_MODES), default=DEFAULT_MAPPING_MODE,
+						help="absolute, relative (joystick) or hybrid cursor mapping")
+	parser.add_argument("--mesh", choices=list(MESH_DETAIL_LEVELS), default=DEFAULT_MESH_DETAIL,
+						help="draw the full mesh or only the contours")
+	parser.add_argument("--gestures", action="store_true", help="click with winks/brow raise instead of blink counts")
+	parser.add_argument("--dwell", type=float, default=0, metavar="SECONDS",
+						help="left click after the cursor rests this long (0 = off)")
+	parser.add_argument("--profile", metavar="PATH",
+						help="record per-stage timings and write them to PATH (.csv or .json) on exit")
+	args = parser.parse_args()
+
 	cap = cv2.VideoCapture(0)
 	print("Initialized camera")
+	profiler = FrameProfiler(enabled=args.profile is not None)
 
-	tracker = HeadPoseEstimator()
+	tracker = HeadPoseEstimator(controlOnly=args.control_only, previewInterval=args.preview_every,
+								runningMode=args.running_mode, inferenceWidth=args.inference_width,
+								roiTracking=args.roi, cursorFilter=args.cursor_filter,
+								mappingMode=args.mapping, profiler=profiler, meshDetail=args.mesh,
+								gestures=GestureEngine(dwell=DwellClicker(args.dwell) if args.dwell else None)
+								if args.gestures or args.dwell else None, blinkClicks=not args.gestures)
 
-	while cap.isOpened():
-		success, img = cap.read()
+	try:
+		while cap.isOpened():
+			with profiler.stage("capture"):
+				success, img = cap.read()
 
-		if not success:
-			break
+			if not success:
+				break
 
-		img = tracker.process_img(img, verbose=True)
+			img = tracker.process_img(img, verbose=True)
 
-		cv2.imshow("test", img)
-		if cv2.waitKey(1) == ord('q'):
-			break
+			# in control-only mode most frames come back as None
+			if img is not None:
+				cv2.imshow("test", img)
+				if cv2.waitKey(1) == ord('q'):
+					break
+	except KeyboardInterrupt:
+		pass
 
+	tracker.close()
 	cap.release()
 	cv2.destroyAllWindows()
+	if args.profile:
+		print(profiler.format_overlay())
+		profiler.dump(args.profile)
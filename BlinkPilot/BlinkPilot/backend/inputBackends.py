@@ -0,0 +1,343 @@
+import sys
+import threading
+import time
+
+from screenGeometry import SingleScreenProvider, create_layout_provider
+
+DEFAULT_RECORDING_SCREEN_SIZE = (1920, 1080)
+
+
+# Low-level OS input used by Mouse. Every call happens on Mouse's output thread.
+class InputBackend:
+    name = "base"
+
+    def screen_size(self):
+        raise NotImplementedError
+
+    # where Mouse gets the monitor layout, see screenGeometry.py
+    def layout_provider(self):
+        return create_layout_provider("auto", fallback_size=self.screen_size())
+
+    def move(self, x, y):
+        raise NotImplementedError
+
+    def click(self):
+        raise NotImplementedError
+
+    def double_click(self):
+        raise NotImplementedError
+
+    def right_click(self):
+        raise NotImplementedError
+
+    def type_text(self, text):
+        raise NotImplementedError
+
+    # key names follow pyautogui ("enter", "backspace", "tab", ...)
+    def press_key(self, key):
+        raise NotImplementedError
+
+    # clicks of the wheel, positive scrolls up
+    def scroll(self, clicks):
+        raise NotImplementedError
+
+    def mouse_down(self):
+        raise NotImplementedError
+
+    def mouse_up(self):
+        raise NotImplementedError
+
+    def key_down(self, key):
+        raise NotImplementedError
+
+    def key_up(self, key):
+        raise NotImplementedError
+
+    def close(self):
+        pass
+
+
+class PyAutoGuiBackend(InputBackend):
+    name = "pyautogui"
+
+    def __init__(self):
+        # imported here so headless setups can still use the other backends
+        import pyautogui
+        self.pyautogui = pyautogui
+        pyautogui.FAILSAFE = False
+        # pyautogui sleeps PAUSE seconds after every call, Mouse's output thread paces itself instead
+        pyautogui.PAUSE = 0
+
+    def screen_size(self):
+        return tuple(self.pyautogui.size())
+
+    def move(self, x, y):
+        self.pyautogui.moveTo(x, y)
+
+    def click(self):
+        self.pyautogui.leftClick()
+
+    def double_click(self):
+        self.pyautogui.doubleClick()
+
+    def right_click(self):
+        self.pyautogui.rightClick()
+
+    def type_text(self, text):
+        self.pyautogui.write(text)
+
+    def press_key(self, key):
+        self.pyautogui.press(key)
+
+    def scroll(self, clicks):
+        self.pyautogui.scroll(clicks)
+
+    def mouse_down(self):
+        self.pyautogui.mouseDown()
+
+    def mouse_up(self):
+        self.pyautogui.mouseUp()
+
+    def key_down(self, key):
+        self.pyautogui.keyDown(key)
+
+    def key_up(self, key):
+        self.pyautogui.keyUp(key)
+
+
+# Talks to the X server directly through the XTEST extension (python-xlib),
+# skipping pyautogui's per-call overhead
+class XlibBackend(InputBackend):
+    name = "xlib"
+
+    LEFT_BUTTON = 1
+    RIGHT_BUTTON = 3
+    WHEEL_UP_BUTTON = 4
+    WHEEL_DOWN_BUTTON = 5
+    KEY_NAMES = {
+        "enter": "Return",
+        "return": "Return",
+        "backspace": "BackSpace",
+        "tab": "Tab",
+        "space": "space",
+        "esc": "Escape",
+        "escape": "Escape",
+        "delete": "Delete",
+        "shift": "Shift_L",
+        "ctrl": "Control_L",
+        "alt": "Alt_L",
+    }
+    CHAR_NAMES = {" ": "space", "\n": "Return", "\t": "Tab"}
+    UNICODE_KEYSYM_OFFSET = 0x01000000  # keysym of a character outside Latin-1 is this + code point
+
+    def __init__(self):
+        from Xlib import X, XK, display
+        from Xlib.ext import xtest
+        self.X = X
+        self.XK = XK
+        self.xtest = xtest
+        self.display = display.Display()
+        self.shift_keycode = self.display.keysym_to_keycode(XK.string_to_keysym("Shift_L"))
+        self.spare_keycode = None  # unused keycode, remapped for characters the layout has no key for
+        self.spare_keysym = None
+
+    def screen_size(self):
+        screen = self.display.screen()
+        return screen.width_in_pixels, screen.height_in_pixels
+
+    def move(self, x, y):
+        self.xtest.fake_input(self.display, self.X.MotionNotify, x=int(x), y=int(y))
+        self.display.sync()
+
+    def click(self):
+        self.__click(self.LEFT_BUTTON)
+
+    def double_click(self):
+        self.__click(self.LEFT_BUTTON)
+        self.__click(self.LEFT_BUTTON)
+
+    def right_click(self):
+        self.__click(self.RIGHT_BUTTON)
+
+    def type_text(self, text):
+        for char in text:
+            self.__tap_keysym(self.__char_keysym(char))
+        self.display.sync()
+
+    def press_key(self, key):
+        self.__tap_keysym(self.__key_keysym(key))
+        self.display.sync()
+
+    def scroll(self, clicks):
+        button = self.WHEEL_UP_BUTTON if clicks > 0 else self.WHEEL_DOWN_BUTTON
+        for _ in range(abs(clicks)):
+            self.xtest.fake_input(self.display, self.X.ButtonPress, button)
+            self.xtest.fake_input(self.display, self.X.ButtonRelease, button)
+        self.display.sync()
+
+    def mouse_down(self):
+        self.xtest.fake_input(self.display, self.X.ButtonPress, self.LEFT_BUTTON)
+        self.display.sync()
+
+    def mouse_up(self):
+        self.xtest.fake_input(self.display, self.X.ButtonRelease, self.LEFT_BUTTON)
+        self.display.sync()
+
+    def key_down(self, key):
+        self.xtest.fake_input(self.display, self.X.KeyPress, self.__keycode(key))
+        self.display.sync()
+
+    def key_up(self, key):
+        self.xtest.fake_input(self.display, self.X.KeyRelease, self.__keycode(key))
+        self.display.sync()
+
+    def close(self):
+        if self.spare_keysym is not None:
+            self.__map_spare_keycode(0)
+        self.display.close()
+
+    def __click(self, button):
+        self.xtest.fake_input(self.display, self.X.ButtonPress, button)
+        self.xtest.fake_input(self.display, self.X.ButtonRelease, button)
+        self.display.sync()
+
+    def __keycode(self, key):
+        keycode = self.display.keysym_to_keycode(self.__key_keysym(key))
+        if keycode == 0:
+            raise ValueError(f"No key for '{key}' on this keyboard layout")
+        return keycode
+
+    # key names as in press_key, or X keysym names ("Page_Up", "F5", ...)
+    def __key_keysym(self, key):
+        keysym = self.XK.string_to_keysym(self.KEY_NAMES.get(key, key))
+        if keysym == self.X.NoSymbol:
+            raise ValueError(f"Unknown key '{key}'")
+        return keysym
+
+    # keysyms are named ("comma", "period"), so characters go by code point instead
+    def __char_keysym(self, char):
+        if char in self.CHAR_NAMES:
+            return self.XK.string_to_keysym(self.CHAR_NAMES[char])
+        code = ord(char)
+        if 0x20 <= code <= 0x7e or 0xa0 <= code <= 0xff:
+            return code  # Latin-1 keysyms are the code point
+        return self.UNICODE_KEYSYM_OFFSET + code
+
+    def __tap_keysym(self, keysym):
+        keycode = self.display.keysym_to_keycode(keysym)
+        if keycode == 0:
+            # no key on this layout produces the symbol ("é" on a US layout), borrow a spare one
+            keycode = self.__map_spare_keycode(keysym)
+            shifted = False
+        else:
+            # characters on the shifted level of their key (capitals, "!", ...) need shift held
+            shifted = self.display.keycode_to_keysym(keycode, 0) != keysym
+        if shifted:
+            self.xtest.fake_input(self.display, self.X.KeyPress, self.shift_keycode)
+        self.xtest.fake_input(self.display, self.X.KeyPress, keycode)
+        self.xtest.fake_input(self.display, self.X.KeyRelease, keycode)
+        if shifted:
+            self.xtest.fake_input(self.display, self.X.KeyRelease, self.shift_keycode)
+
+    # maps keysym (0 = unmap) to the spare keycode on every level, returns the keycode.
+    # The mapping stays until the next character needs the key, the X server sends
+    # clients the remap in order with the key events.
+    def __map_spare_keycode(self, keysym):
+        if self.spare_keycode is None:
+            info = self.display.display.info
+            count = info.max_keycode - info.min_keycode + 1
+            mapping = self.display.get_keyboard_mapping(info.min_keycode, count)
+            spare = next((i for i in reversed(range(count)) if not any(mapping[i])), None)
+            if spare is None:
+                raise ValueError(f"No key for keysym {keysym:#x} and no spare keycode to map it to")
+            self.spare_keycode = info.min_keycode + spare
+            self.levels = len(mapping[spare])
+        if keysym != self.spare_keysym:
+            self.display.change_keyboard_mapping(self.spare_keycode, [(keysym,) * self.levels])
+            self.display.sync()
+            self.spare_keysym = keysym
+        return self.spare_keycode
+
+
+# Keeps every event in memory with a perf_counter timestamp instead of touching
+# the OS, used for headless latency measurements and backend comparisons
+class RecordingBackend(InputBackend):
+    name = "recording"
+
+    def __init__(self, size=DEFAULT_RECORDING_SCREEN_SIZE):
+        self.size = tuple(size)
+        self.events = []  # (timestamp, kind, args)
+        self.lock = threading.Lock()
+
+    def screen_size(self):
+        return self.size
+
+    # replays must not depend on the monitors of the machine they run on
+    def layout_provider(self):
+        return SingleScreenProvider(self.size)
+
+    def move(self, x, y):
+        self.__record("move", (x, y))
+
+    def click(self):
+        self.__record("click", ())
+
+    def double_click(self):
+        self.__record("double_click", ())
+
+    def right_click(self):
+        self.__record("right_click", ())
+
+    def type_text(self, text):
+        self.__record("type", (text,))
+
+    def press_key(self, key):
+        self.__record("key", (key,))
+
+    def scroll(self, clicks):
+        self.__record("scroll", (clicks,))
+
+    def mouse_down(self):
+        self.__record("mouse_down", ())
+
+    def mouse_up(self):
+        self.__record("mouse_up", ())
+
+    def key_down(self, key):
+        self.__record("key_down", (key,))
+
+    def key_up(self, key):
+        self.__record("key_up", (key,))
+
+    def events_of(self, kind):
+        with self.lock:
+            return [event for event in self.events if event[1] == kind]
+
+    def clear(self):
+        with self.lock:
+            self.events = []
+
+    def __record(self, kind, args):
+        with self.lock:
+            self.events.append((time.perf_counter(), kind, args))
+
+
+BACKENDS = {
+    "pyautogui": PyAutoGuiBackend,
+    "xlib": XlibBackend,
+    "recording": RecordingBackend,
+}
+
+
+# "auto" prefers the direct X11 path on Linux and falls back to pyautogui
+def create_backend(name="auto"):
+    if name == "auto":
+        if sys.platform.startswith("linux"):
+            try:
+                return XlibBackend()
+            except Exception:
+                pass
+        return PyAutoGuiBackend()
+    if name not in BACKENDS:
+        raise ValueError(f"Unknown input backend '{name}', expected one of {['auto'] + list(BACKENDS)}")
+    return BACKENDS[name]()
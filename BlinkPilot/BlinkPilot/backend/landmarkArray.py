@@ -0,0 +1,97 @@
+import numpy as np
+
+NUM_FACE_LANDMARKS = 478  # 468 face mesh points + 10 iris points
+EYE_POINT_ORDER = ("top", "bottom", "outer", "inner")
+
+
+# Builds a (num_eyes, 4) index array from eye landmark dicts, columns follow EYE_POINT_ORDER
+def eye_indices(*eyes):
+    return np.array([[eye[key] for key in EYE_POINT_ORDER] for eye in eyes], dtype=np.intp)
+
+
+# Turns a FaceLandmarker result into one contiguous (N, 3) float32 array of
+# normalized x, y, z. The buffer is allocated once and reused every frame.
+class LandmarkArray:
+    def __init__(self, num_landmarks=NUM_FACE_LANDMARKS):
+        self.buffer = np.zeros((num_landmarks, 3), dtype=np.float32)
+        self.count = 0
+
+    # returns a view of the buffer, or None when no face was detected
+    def update(self, detection_result, face=0):
+        faces = detection_result.face_landmarks
+        if faces is None or len(faces) <= face:
+            self.count = 0
+            return None
+
+        landmarks = faces[face]
+        count = len(landmarks)
+        if count > len(self.buffer):
+            self.buffer = np.zeros((count, 3), dtype=np.float32)
+
+        if isinstance(landmarks, np.ndarray):
+            # stored results (see landmarkStore.py) already hold an (N, 3) array
+            self.buffer[:count] = landmarks
+        else:
+            # single pass over the landmark objects, no per-point arrays
+            flat = np.fromiter((value for lm in landmarks for value in (lm.x, lm.y, lm.z)),
+                               dtype=np.float32, count=3 * count)
+            self.buffer[:count] = flat.reshape(count, 3)
+        self.count = count
+        return self.buffer[:count]
+
+
+
+# The landmarker's blendshape categories as one reused float32 score array;
+# index maps category names ("jawOpen", "eyeBlinkLeft", ...) to positions
+class BlendshapeArray:
+    def __init__(self):
+        self.scores = None
+        self.names = None
+        self.index = {}
+
+    # returns the score array, or None when there is no face or no blendshapes
+    def update(self, detection_result, face=0):
+        stored = getattr(detection_result, "blendshape_scores", None)
+        if stored is not None and detection_result.face_landmarks:
+            # landmarkStore.StoredResult, scores are already an array
+            self.__set_names(detection_result.blendshape_names)
+            self.scores[:] = stored
+            return self.scores
+
+        faces = detection_result.face_blendshapes
+        if not faces or len(faces) <= face:
+            return None
+        categories = faces[face]
+        if self.names is None or len(categories) != len(self.names):
+            self.__set_names([category.category_name for category in categories])
+        self.scores[:] = np.fromiter((category.score for category in categories), dtype=np.float32,
+                                     count=len(categories))
+        return self.scores
+
+    def __set_names(self, names):
+        if self.names is not None and list(names) == self.names:
+            return
+        self.names = list(names)
+        self.index = {name: i for i, name in enumerate(self.names)}
+        self.scores = np.zeros(len(self.names), dtype=np.float32)
+
+
+# Eye Aspect Ratio for every row of an eye_indices() array at once
+def compute_ears(points, eye_index_array):
+    eyes = points[eye_index_array, :2]  # (num_eyes, 4, 2)
+    vertical = np.linalg.norm(eyes[:, 0] - eyes[:, 1], axis=-1)
+    horizontal = np.linalg.norm(eyes[:, 2] - eyes[:, 3], axis=-1)
+    return vertical / horizontal
+
+
+# Normalized landmarks -> integer pixel coordinates, keeps the shape of indices
+def to_pixels(points, indices, width, height):
+    return (points[indices, :2] * (width, height)).astype(np.int32)
+
+
+# (x_min, y_min, x_max, y_max) in pixels around the given landmarks
+def bounding_box(points, indices, width, height):
+    pixels = to_pixels(points, indices, width, height).reshape(-1, 2)
+    x_min, y_min = pixels.min(axis=0)
+    x_max, y_max = pixels.max(axis=0)
+    return int(x_min), int(y_min), int(x_max), int(y_max)
@@ -0,0 +1,211 @@
+"""
+Columnar store of FaceLandmarker results, so everything downstream of the
+landmarker (rot2MouseVector, blink logic, Mouse filtering) can be re-run
+thousands of times faster than real time.
+
+A store is a directory with one .npy file per column, loaded memory-mapped:
+    timestamps (F,)  has_face (F,)  landmarks (F, 478, 3)
+    blendshapes (F, B)  matrices (F, 4, 4)  plus meta.json
+StoredLandmarker plays a store back in place of the real FaceLandmarker,
+see HeadPoseEstimator(detector=...).
+
+    python backend/landmarkStore.py session.frames session.landmarks          # from the recording's sidecar
+    python backend/landmarkStore.py session.frames session.landmarks --rerun  # re-run the landmarker, adds blendshapes
+"""
+import json
+import os
+import time
+
+import numpy as np
+
+from landmarkArray import NUM_FACE_LANDMARKS
+
+COLUMNS = ("timestamps", "has_face", "landmarks", "blendshapes", "matrices")
+META_FILE = "meta.json"
+
+
+class StoredCategory:
+    def __init__(self, index, category_name, score):
+        self.index = index
+        self.category_name = category_name
+        self.score = score
+
+
+# Quacks like a FaceLandmarkerResult; landmarks stay an (N, 3) array, which
+# LandmarkArray.update copies without going through per-point objects
+class StoredResult:
+    def __init__(self, landmarks=None, blendshapes=None, matrix=None, blendshape_names=()):
+        self.face_landmarks = [] if landmarks is None else [landmarks]
+        self.facial_transformation_matrixes = [] if matrix is None else [matrix]
+        self.blendshape_scores = blendshapes
+        self.blendshape_names = blendshape_names
+
+    # built on first use, most consumers never look at blendshapes
+    @property
+    def face_blendshapes(self):
+        if self.blendshape_scores is None or not self.face_landmarks:
+            return []
+        return [[StoredCategory(i, name, float(score))
+                 for i, (name, score) in enumerate(zip(self.blendshape_names, self.blendshape_scores.tolist()))]]
+
+
+class LandmarkStoreWriter:
+    def __init__(self, path, frame_shape):
+        self.path = path
+        self.frame_shape = tuple(frame_shape)
+        self.blendshape_names = None
+        self.columns = {name: [] for name in COLUMNS}
+
+    def __len__(self):
+        return len(self.columns["timestamps"])
+
+    # points (N, 3) in full-frame normalized coordinates or None, matrix 4x4 or None,
+    # blendshapes the landmarker's category list for the face or None
+    def append(self, timestamp, points, matrix=None, blendshapes=None):
+        scores = None
+        if points is not None and blendshapes:
+            if self.blendshape_names is None:
+                self.blendshape_names = [category.category_name for category in blendshapes]
+            scores = [category.score for category in blendshapes]
+
+        face = np.zeros((NUM_FACE_LANDMARKS, 3), dtype=np.float32)
+        if points is not None:
+            face[:len(points)] = points[:NUM_FACE_LANDMARKS]
+        self.columns["timestamps"].append(timestamp)
+        self.columns["has_face"].append(points is not None)
+        self.columns["landmarks"].append(face)
+        self.columns["blendshapes"].append(scores)
+        self.columns["matrices"].append(np.zeros((4, 4), dtype=np.float32) if matrix is None
+                                        else np.asarray(matrix, dtype=np.float32).reshape(4, 4))
+
+    def close(self):
+        os.makedirs(self.path, exist_ok=True)
+        names = self.blendshape_names or []
+        # frames without a face (or recorded without blendshapes) get zero scores
+        blendshapes = np.zeros((len(self), len(names)), dtype=np.float32)
+        for i, scores in enumerate(self.columns["blendshapes"]):
+            if scores is not None:
+                blendshapes[i] = scores
+
+        arrays = {
+            "timestamps": np.array(self.columns["timestamps"], dtype=np.float64),
+            "has_face": np.array(self.columns["has_face"], dtype=bool),
+            "landmarks": np.array(self.columns["landmarks"], dtype=np.float32).reshape(-1, NUM_FACE_LANDMARKS, 3),
+            "blendshapes": blendshapes,
+            "matrices": np.array(self.columns["matrices"], dtype=np.float32).reshape(-1, 4, 4),
+        }
+        for name, array in arrays.items():
+            np.save(os.path.join(self.path, name + ".npy"), array)
+        with open(os.path.join(self.path, META_FILE), "w") as f:
+            json.dump({"frames": len(self), "frame_shape": list(self.frame_shape), "blendshape_names": names},
+                      f, indent=2)
+
+
+class LandmarkStore:
+    def __init__(self, path):
+        self.path = path
+        with open(os.path.join(path, META_FILE)) as f:
+            meta = json.load(f)
+        self.frame_shape = tuple(meta["frame_shape"])
+        self.blendshape_names = meta["blendshape_names"]
+        # memory-mapped, only the frames a run touches are read from disk
+        for name in COLUMNS:
+            setattr(self, name, np.load(os.path.join(path, name + ".npy"), mmap_mode="r"))
+
+    def __len__(self):
+        return len(self.timestamps)
+
+    def result(self, i):
+        if not self.has_face[i]:
+            return StoredResult()
+        blendshapes = self.blendshapes[i] if self.blendshape_names else None
+        return StoredResult(self.landmarks[i], blendshapes, self.matrices[i], self.blendshape_names)
+
+
+# Stand-in for vision.FaceLandmarker in "image" and "video" mode: ignores the
+# image and returns the store's results in order, wrapping around at the end
+class StoredLandmarker:
+    def __init__(self, store):
+        self.store = store
+        self.index = 0
+
+    def reset(self):
+        self.index = 0
+
+    def detect(self, image):
+        result = self.store.result(self.index)
+        self.index = (self.index + 1) % len(self.store)
+        return result
+
+    def detect_for_video(self, image, timestamp_ms):
+        return self.detect(image)
+
+    def close(self):
+        pass
+
+
+# Feeds a store to tracker.process_img through a StoredLandmarker (the tracker's
+# detector) like frameRecording.replay does for recordings: stored timestamps are
+# shifted onto the current clock, realtime sleeps to keep the recorded spacing.
+# Only a small stand-in frame is passed, landmarks are normalized.
+def replay_store(store, tracker, realtime=False, on_frame=None, stand_in_scale=8):
+    h, w = store.frame_shape[:2]
+    frame = np.zeros((max(1, h // stand_in_scale), max(1, w // stand_in_scale), 3), dtype=np.uint8)
+    start = time.perf_counter()
+    first_timestamp = float(store.timestamps[0]) if len(store) else 0.0
+    for i in range(len(store)):
+        frame_time = start + (float(store.timestamps[i]) - first_timestamp)
+        if realtime:
+            delay = frame_time - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+        display_img = tracker.process_img(frame, frameTime=frame_time)
+        if on_frame is not None:
+            on_frame(i, display_img)
+    return time.perf_counter() - start
+
+
+# store built from a frameRecording.py sidecar, no blendshapes
+def from_recording(recording, path):
+    writer = LandmarkStoreWriter(path, recording.frame_shape)
+    for i in range(len(recording)):
+        points, matrix = recording.landmarker_output(i)
+        writer.append(float(recording.timestamps[i]), points, matrix)
+    writer.close()
+    return LandmarkStore(path)
+
+
+if __name__ == "__main__":
+    import argparse
+
+    import cv2
+
+    from frameRecording import FrameRecording
+
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("recording", help="recording made with frameRecording.py")
+    parser.add_argument("store", help="output directory")
+    parser.add_argument("--rerun", action="store_true", help="run the landmarker on every frame instead of "
+                                                             "reusing the sidecar, also stores blendshapes")
+    args = parser.parse_args()
+
+    recording = FrameRecording(args.recording)
+    if not args.rerun:
+        store = from_recording(recording, args.store)
+    else:
+        from headPoseEstimator import HeadPoseEstimator
+        from inputBackends import RecordingBackend
+
+        tracker = HeadPoseEstimator(runningMode="video", inputBackend=RecordingBackend(), profilePath=None,
+                                    controlOnly=True, previewInterval=0)
+        writer = LandmarkStoreWriter(args.store, recording.frame_shape)
+        for i, frame, timestamp in recording.frames():
+            tracker.process_img(cv2.cvtColor(frame, cv2.COLOR_BGR2RGB), moveMouse=False, frameTime=timestamp)
+            # landmarks come back already mapped to the full (mirrored) frame
+            points, matrix = tracker.last_landmarker_output()
+            blendshapes = tracker.last_detection.face_blendshapes
+            writer.append(timestamp, points, matrix, blendshapes[0] if blendshapes else None)
+        tracker.close()
+        writer.close()
+        store = LandmarkStore(args.store)
+    print(f"Stored {len(store)} frames ({int(np.sum(store.has_face))} with a face) in {args.store}")
@@ -0,0 +1,52 @@
+from collections import defaultdict
+
+import cv2
+import numpy as np
+from mediapipe import solutions
+
+# "full" draws tesselation, contours and irises like mediapipe's drawing_utils,
+# "contours" skips the tesselation (most of the lines)
+MESH_DETAIL_LEVELS = ("full", "contours")
+DEFAULT_MESH_DETAIL = "full"
+
+
+# [(segments (K, 2) landmark indices, color, thickness)], one entry per distinct drawing spec
+def build_layers(connections, style):
+    groups = defaultdict(list)
+    for connection in sorted(connections):
+        spec = style[connection] if isinstance(style, dict) else style
+        groups[(tuple(spec.color), spec.thickness)].append(connection)
+    return [(np.array(segments, dtype=np.intp), color, thickness)
+            for (color, thickness), segments in groups.items()]
+
+
+# Draws the face mesh with the same connections and colors as
+# solutions.drawing_utils.draw_landmarks, but the connection index arrays are
+# built once and every frame is one vectorized projection plus one
+# cv2.polylines call per drawing spec
+class MeshRenderer:
+    def __init__(self, detail=DEFAULT_MESH_DETAIL):
+        face_mesh, styles = solutions.face_mesh, solutions.drawing_styles
+        self.detail_layers = {
+            "tesselation": build_layers(face_mesh.FACEMESH_TESSELATION,
+                                        styles.get_default_face_mesh_tesselation_style()),
+            "contours": build_layers(face_mesh.FACEMESH_CONTOURS, styles.get_default_face_mesh_contours_style()),
+            "irises": build_layers(face_mesh.FACEMESH_IRISES, styles.get_default_face_mesh_iris_connections_style()),
+        }
+        self.set_detail(detail)
+
+    def set_detail(self, detail):
+        if detail not in MESH_DETAIL_LEVELS:
+            raise ValueError(f"Unknown mesh detail '{detail}', expected one of {list(MESH_DETAIL_LEVELS)}")
+        self.detail = detail
+        names = ("tesselation", "contours", "irises") if detail == "full" else ("contours", "irises")
+        self.layers = [layer for name in names for layer in self.detail_layers[name]]
+
+    # draws in place; points is the (N, 3) normalized landmark array
+    def draw(self, image, points):
+        h, w = image.shape[:2]
+        pixels = (points[:, :2] * (w, h)).astype(np.int32)
+        for segments, color, thickness in self.layers:
+            # (K, 2, 2): K two-point polylines in one call
+            cv2.polylines(image, pixels[segments], False, color, thickness)
+        return image
@@ -0,0 +1,107 @@
+"""
+Grid-searches cursor and blink parameters against a landmark store (see
+landmarkStore.py). The landmarker is not run, every combination replays the
+stored results through HeadPoseEstimator with a recording mouse backend.
+
+    python backend/parameterSweep.py session.landmarks --sensitivity 0.5 1 2 --deadzone 0 0.05 0.1
+    python backend/parameterSweep.py session.landmarks --ear-threshold 0.2 0.25 0.3 --csv sweep.csv
+"""
+import argparse
+import csv
+import itertools
+import time
+
+import numpy as np
+
+from calibration import CalibrationProfile
+from cursorFilters import FILTERS
+from headPoseEstimator import HeadPoseEstimator, DEFAULT_SENSITIVITY, DEFAULT_DEADZONE, DEFAULT_CURSOR_FILTER, \
+    DEFAULT_MAPPING_MODE
+from inputBackends import RecordingBackend
+from landmarkStore import LandmarkStore, StoredLandmarker
+from Rotation2Vector import MAPPING_MODES
+
+# landmarks are normalized, so the stand-in frame only has to exist; keeping it
+# small keeps flip/copy costs out of the sweep
+STAND_IN_SCALE = 8
+OUTPUT_SETTLE_TIME = 0.05  # seconds given to the mouse output thread to run queued clicks
+
+
+# replays the whole store once with one parameter combination
+def run_once(store, sensitivity, deadzone, earThreshold=None, cursorFilter=DEFAULT_CURSOR_FILTER,
+             mappingMode=DEFAULT_MAPPING_MODE):
+    backend = RecordingBackend()
+    tracker = HeadPoseEstimator(sensitivity=sensitivity, deadzone=deadzone, controlOnly=True, previewInterval=0,
+                                cursorFilter=cursorFilter, mappingMode=mappingMode, inputBackend=backend,
+                                profilePath=None, detector=StoredLandmarker(store), backgroundGlasses=False)
+    if earThreshold is not None:
+        tracker.apply_profile(CalibrationProfile(ear_threshold_left=earThreshold, ear_threshold_right=earThreshold))
+
+    h, w = store.frame_shape[:2]
+    frame = np.zeros((max(1, h // STAND_IN_SCALE), max(1, w // STAND_IN_SCALE), 3), dtype=np.uint8)
+    positions = np.zeros((len(store), 2))
+    start = time.perf_counter()
+    first_timestamp = float(store.timestamps[0])
+    try:
+        for i in range(len(store)):
+            # stored frame spacing, shifted onto the perf_counter clock
+            frame_time = start + (float(store.timestamps[i]) - first_timestamp)
+            tracker.process_img(frame, frameTime=frame_time)
+            positions[i] = (tracker.mouse.position.x, tracker.mouse.position.y)
+        elapsed = time.perf_counter() - start
+        # clicks are timed on the stored clock, finish the last sequence there too
+        tracker.mouse.checkClick(now=frame_time + tracker.mouse.click_interval + 1e-3)
+        time.sleep(OUTPUT_SETTLE_TIME)
+    finally:
+        tracker.close()
+
+    steps = np.linalg.norm(np.diff(positions, axis=0), axis=1)
+    return {
+        "fps": len(store) / elapsed if elapsed > 0 else 0.0,
+        "blinks": tracker.blink_detector.events,
+        "left_clicks": len(backend.events_of("click")),
+        "right_clicks": len(backend.events_of("right_click")),
+        "double_clicks": len(backend.events_of("double_click")),
+        "cursor_path_px": float(steps.sum()),
+        # small frame-to-frame moves are mostly jitter while the head is still
+        "jitter_px": float(np.median(steps[steps > 0])) if np.any(steps > 0) else 0.0,
+        "still_fraction": float(np.mean(steps == 0)) if len(steps) else 1.0,
+    }
+
+
+def sweep(store, sensitivities, deadzones, earThresholds, cursorFilters, mappingModes):
+    rows = []
+    for sensitivity, deadzone, earThreshold, cursorFilter, mappingMode in itertools.product(
+            sensitivities, deadzones, earThresholds, cursorFilters, mappingModes):
+        params = {"sensitivity": sensitivity, "deadzone": deadzone, "ear_threshold": earThreshold,
+                  "cursor_filter": cursorFilter, "mapping": mappingMode}
+        rows.append({**params, **run_once(store, sensitivity, deadzone, earThreshold, cursorFilter, mappingMode)})
+    return rows
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("store", help="landmark store directory")
+    parser.add_argument("--sensitivity", type=float, nargs="+", default=[DEFAULT_SENSITIVITY])
+    parser.add_argument("--deadzone", type=float, nargs="+", default=[DEFAULT_DEADZONE])
+    parser.add_argument("--ear-threshold", type=float, nargs="+", default=[None],
+                        help="EAR closing threshold for both eyes (default: the tracker's glasses-aware default)")
+    parser.add_argument("--cursor-filter", choices=list(FILTERS), nargs="+", default=[DEFAULT_CURSOR_FILTER])
+    parser.add_argument("--mapping", choices=list(MAPPING_MODES), nargs="+", default=[DEFAULT_MAPPING_MODE])
+    parser.add_argument("--csv", metavar="PATH", help="write every row to PATH")
+    args = parser.parse_args()
+
+    store = LandmarkStore(args.store)
+    print(f"{args.store}: {len(store)} frames, {int(np.sum(store.has_face))} with a face")
+    rows = sweep(store, args.sensitivity, args.deadzone, args.ear_threshold, args.cursor_filter, args.mapping)
+
+    columns = list(rows[0])
+    print(" ".join(f"{name:>14}" for name in columns))
+    for row in rows:
+        print(" ".join(f"{value:>14.3f}" if isinstance(value, float) else f"{str(value):>14}" for value in row.values()))
+
+    if args.csv:
+        with open(args.csv, "w", newline="") as f:
+            writer = csv.DictWriter(f, fieldnames=columns)
+            writer.writeheader()
+            writer.writerows(rows)
@@ -0,0 +1,126 @@
+"""
+Replays frame recordings (see frameRecording.py) through HeadPoseEstimator
+without a camera or a real cursor and reports throughput, per-stage latency,
+the detected blinks and what the mouse would have done. A landmark store (see
+landmarkStore.py) skips the landmarker and replays only the stored results,
+e.g. to check blink and click logic.
+
+    python backend/replayBenchmark.py session.frames
+    python backend/replayBenchmark.py session.frames --running-mode video --roi --json results.json
+    python backend/replayBenchmark.py session.landmarks
+"""
+import argparse
+import json
+import os
+import time
+
+import numpy as np
+
+from frameProfiler import FrameProfiler
+from frameRecording import FrameRecording, replay
+from headPoseEstimator import HeadPoseEstimator, DEFAULT_INFERENCE_WIDTH
+from inputBackends import RecordingBackend
+from landmarkStore import LandmarkStore, StoredLandmarker, META_FILE, replay_store
+
+# live_stream results arrive asynchronously, so benchmarks stick to the synchronous modes
+BENCHMARK_RUNNING_MODES = ("image", "video")
+OUTPUT_SETTLE_TIME = 0.05  # seconds given to the mouse output thread to drain before closing
+
+
+def open_replay_source(path):
+    if os.path.isfile(os.path.join(path, META_FILE)):
+        return LandmarkStore(path)
+    return FrameRecording(path)
+
+
+# recording is a FrameRecording or a LandmarkStore
+def run_benchmark(recording, runningMode="video", inferenceWidth=DEFAULT_INFERENCE_WIDTH, roiTracking=False,
+                  controlOnly=False, realtime=False):
+    profiler = FrameProfiler()
+    backend = RecordingBackend()
+    stored = isinstance(recording, LandmarkStore)
+    # no calibration profile, results should not depend on the machine's saved profile
+    tracker = HeadPoseEstimator(runningMode=runningMode, inferenceWidth=inferenceWidth, roiTracking=roiTracking,
+                                controlOnly=controlOnly, inputBackend=backend, profilePath=None, profiler=profiler,
+                                backgroundGlasses=False, detector=StoredLandmarker(recording) if stored else None)
+    faces = []
+    blinks = []
+    try:
+        def on_frame(i, img):
+            faces.append(tracker.landmarks.count > 0)
+            detector = tracker.blink_detector
+            if detector.events > len(blinks):
+                # timed from the first recorded frame, so runs and commits can be diffed
+                event = detector.last_event
+                end = float(recording.timestamps[i] - recording.timestamps[0])
+                blinks.append({"frame": i, "start": round(end - event.duration, 4), "end": round(end, 4),
+                               "eyes": event.eyes})
+
+        if stored:
+            elapsed = replay_store(recording, tracker, realtime=realtime, on_frame=on_frame)
+        else:
+            elapsed = replay(recording, tracker, realtime=realtime, profiler=profiler, on_frame=on_frame)
+        # let a click sequence that was still waiting for more blinks fire; clicks are timed
+        # on the replay clock, which runs ahead of perf_counter unless realtime
+        mouse = tracker.mouse
+        mouse.checkClick(now=max(time.perf_counter(), mouse.last_click_time) + mouse.click_interval + 1e-3)
+        time.sleep(OUTPUT_SETTLE_TIME)
+        latencies = np.array(tracker.mouse.get_output_latencies()) * 1000
+    finally:
+        tracker.close()
+
+    moves = backend.events_of("move")
+    result = {
+        "frames": len(faces),
+        "seconds": elapsed,
+        "fps": len(faces) / elapsed if elapsed > 0 else 0.0,
+        "face_rate": float(np.mean(faces)) if faces else 0.0,
+        "stages": profiler.summary(),
+        "blinks": blinks,
+        "clicks": {kind: len(backend.events_of(kind)) for kind in ("click", "right_click", "double_click")},
+        "cursor_moves": len(moves),
+        "final_cursor": list(moves[-1][2]) if moves else None,
+        "output_latency_ms": {f"p{p}": float(np.percentile(latencies, p)) for p in (50, 95)} if len(latencies) else {},
+    }
+    return result, profiler
+
+
+def report(name, result, profiler):
+    print(f"{name}: {result['frames']} frames in {result['seconds']:.2f}s = {result['fps']:.1f} fps, "
+          f"face found in {result['face_rate'] * 100:.0f}%")
+    print(profiler.format_overlay())
+    for blink in result["blinks"]:
+        print(f"  blink at frame {blink['frame']}: {blink['start']:.3f}-{blink['end']:.3f}s ({blink['eyes']})")
+    clicks = ", ".join(f"{kind}={count}" for kind, count in result["clicks"].items())
+    print(f"  mouse: {result['cursor_moves']} moves, {clicks}, final cursor {result['final_cursor']}")
+    if result["output_latency_ms"]:
+        print("  frame-to-cursor latency: " +
+              ", ".join(f"{p} {value:.1f} ms" for p, value in result["output_latency_ms"].items()))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("recordings", nargs="+", help="recordings made with frameRecording.py or landmark stores")
+    parser.add_argument("--running-mode", choices=BENCHMARK_RUNNING_MODES, default="video")
+    parser.add_argument("--inference-width", type=int, default=DEFAULT_INFERENCE_WIDTH)
+    parser.add_argument("--roi", action="store_true", help="crop the landmarker input around the last face")
+    parser.add_argument("--control-only", action="store_true", help="skip annotating frames")
+    parser.add_argument("--realtime", action="store_true", help="replay at the recorded frame rate")
+    parser.add_argument("--repeat", type=int, default=1, help="replay each recording this many times")
+    parser.add_argument("--json", metavar="PATH", help="write all results to PATH for comparing commits")
+    args = parser.parse_args()
+
+    results = {}
+    for path in args.recordings:
+        recording = open_replay_source(path)
+        for run in range(args.repeat):
+            name = path if args.repeat == 1 else f"{path} (run {run + 1})"
+            result, profiler = run_benchmark(recording, runningMode=args.running_mode,
+                                             inferenceWidth=args.inference_width, roiTracking=args.roi,
+                                             controlOnly=args.control_only, realtime=args.realtime)
+            report(name, result, profiler)
+            results[name] = result
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump({"settings": vars(args), "results": results}, f, indent=2)
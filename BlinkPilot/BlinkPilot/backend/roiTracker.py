@@ -0,0 +1,69 @@
+import cv2
+import numpy as np
+
+DEFAULT_ROI_PADDING = 0.4  # extra margin around the face box, as a fraction of the face size
+MIN_ROI_SIZE = 64  # pixels, smaller boxes fall back to the full frame
+
+
+# Shrinks what the landmarker sees: crops to a padded square around the last
+# frame's face and/or downscales to a fixed inference width. Landmarks come
+# back normalized to the crop and are mapped back to full-frame coordinates.
+class RoiTracker:
+    def __init__(self, inference_width=None, track_roi=True, padding=DEFAULT_ROI_PADDING):
+        self.inference_width = inference_width
+        self.track_roi = track_roi
+        self.padding = padding
+        self.box = None  # (x0, y0, x1, y1) in full-frame pixels, None = use the full frame
+
+    def reset(self):
+        self.box = None
+
+    # returns (inference image, crop box used)
+    def prepare(self, frame):
+        h, w = frame.shape[:2]
+        box = self.box if self.track_roi and self.box is not None else (0, 0, w, h)
+        x0, y0, x1, y1 = box
+        crop = frame[y0:y1, x0:x1]
+
+        crop_w = x1 - x0
+        if self.inference_width is not None and crop_w > self.inference_width:
+            scale = self.inference_width / crop_w
+            size = (self.inference_width, max(1, round((y1 - y0) * scale)))
+            crop = cv2.resize(crop, size, interpolation=cv2.INTER_AREA)
+        else:
+            # no-op for the full frame, mediapipe needs contiguous data for crops
+            crop = np.ascontiguousarray(crop)
+        return crop, box
+
+    # maps landmarks normalized to the crop back to full-frame normalized coordinates, in place
+    def to_full_frame(self, points, box, frame_shape):
+        h, w = frame_shape[:2]
+        x0, y0, x1, y1 = box
+        if box == (0, 0, w, h):
+            return points
+
+        crop_w, crop_h = x1 - x0, y1 - y0
+        points[:, 0] = (x0 + points[:, 0] * crop_w) / w
+        points[:, 1] = (y0 + points[:, 1] * crop_h) / h
+        points[:, 2] *= crop_w / w  # z uses roughly the same scale as x
+        return points
+
+    # picks the crop for the next frame from this frame's full-frame landmarks
+    def update(self, points, frame_shape):
+        if points is None:
+            self.box = None  # face lost, search the whole frame again
+            return
+
+        h, w = frame_shape[:2]
+        x_min, y_min = points[:, :2].min(axis=0) * (w, h)
+        x_max, y_max = points[:, :2].max(axis=0) * (w, h)
+
+        half = max(x_max - x_min, y_max - y_min) * (0.5 + self.padding)
+        cx, cy = (x_min + x_max) / 2, (y_min + y_max) / 2
+        x0, y0 = max(0, int(cx - half)), max(0, int(cy - half))
+        x1, y1 = min(w, int(cx + half)), min(h, int(cy + half))
+
+        if x1 - x0 < MIN_ROI_SIZE or y1 - y0 < MIN_ROI_SIZE:
+            self.box = None
+        else:
+            self.box = (x0, y0, x1, y1)
@@ -0,0 +1,316 @@
+import sys
+import threading
+
+REFRESH_SECONDS = 2.0  # how often the watcher asks the OS for the monitor layout
+BASE_DPI = 96  # DPI of scale factor 1.0 on X11 and Windows
+SPANS = ("desktop", "monitor")  # cursor range: every monitor, or only the active one
+
+
+# One monitor in the input backend's coordinate space (physical pixels of the
+# virtual desktop); scale is the OS scale factor (2.0 on a 200% display)
+class Monitor:
+    def __init__(self, x, y, width, height, scale=1.0, primary=False, name=""):
+        self.x = x
+        self.y = y
+        self.width = width
+        self.height = height
+        self.scale = scale
+        self.primary = primary
+        self.name = name
+
+    def key(self):
+        return self.x, self.y, self.width, self.height, self.scale, self.primary
+
+    def contains(self, x, y):
+        return self.x <= x < self.x + self.width and self.y <= y < self.y + self.height
+
+    # nearest point inside the monitor
+    def clamp(self, x, y):
+        return (min(max(x, self.x), self.x + self.width - 1),
+                min(max(y, self.y), self.y + self.height - 1))
+
+    def __repr__(self):
+        return f"Monitor({self.name!r}, {self.width}x{self.height}+{self.x}+{self.y}, scale={self.scale})"
+
+
+# Lists the monitors; called by ScreenGeometry on refresh only, never per frame
+class LayoutProvider:
+    name = "base"
+
+    def monitors(self):
+        raise NotImplementedError
+
+    def close(self):
+        pass
+
+
+# One fixed screen, e.g. the input backend's screen_size() when nothing better is available
+class SingleScreenProvider(LayoutProvider):
+    name = "single"
+
+    def __init__(self, size):
+        self.size = tuple(size)
+
+    def monitors(self):
+        return [Monitor(0, 0, self.size[0], self.size[1], primary=True)]
+
+
+# A layout set by hand, for tests and replays; set_monitors simulates a display change
+class FakeLayoutProvider(LayoutProvider):
+    name = "fake"
+
+    def __init__(self, monitors):
+        self.set_monitors(monitors)
+        self.queries = 0
+
+    def set_monitors(self, monitors):
+        self.layout = list(monitors)
+
+    def monitors(self):
+        self.queries += 1
+        return list(self.layout)
+
+
+# X11 through the RandR extension (python-xlib), the scale comes from Xft.dpi
+class XrandrProvider(LayoutProvider):
+    name = "xrandr"
+
+    def __init__(self):
+        from Xlib import X, display
+        from Xlib.ext import randr  # noqa: F401, registers the xrandr_* methods
+        self.X = X
+        # a connection of its own, Xlib displays are not shared across threads
+        self.display = display.Display()
+        self.root = self.display.screen().root
+
+    def monitors(self):
+        scale = self.__scale()
+        monitors = []
+        for monitor in self.root.xrandr_get_monitors(is_active=True).monitors:
+            monitors.append(Monitor(monitor.x, monitor.y, monitor.width_in_pixels, monitor.height_in_pixels,
+                                    scale, bool(monitor.primary), self.display.get_atom_name(monitor.name)))
+        return monitors
+
+    def close(self):
+        self.display.close()
+
+    def __scale(self):
+        resources = self.root.get_full_property(self.display.intern_atom("RESOURCE_MANAGER"), self.X.AnyPropertyType)
+        if resources is not None:
+            value = resources.value.decode() if isinstance(resources.value, bytes) else str(resources.value)
+            for line in value.splitlines():
+                if line.startswith("Xft.dpi:"):
+                    return float(line.split(":", 1)[1]) / BASE_DPI
+        return 1.0
+
+
+# Windows: makes the process per-monitor DPI aware so that every coordinate
+# (including pyautogui's) is in physical pixels, then enumerates the monitors
+class WindowsProvider(LayoutProvider):
+    name = "windows"
+
+    PER_MONITOR_DPI_AWARE = 2
+    MONITORINFOF_PRIMARY = 1
+    MDT_EFFECTIVE_DPI = 0
+
+    def __init__(self):
+        import ctypes
+        from ctypes import wintypes
+        self.ctypes = ctypes
+        self.wintypes = wintypes
+        self.user32 = ctypes.windll.user32
+        self.shcore = ctypes.windll.shcore
+        try:
+            self.shcore.SetProcessDpiAwareness(self.PER_MONITOR_DPI_AWARE)
+        except OSError:
+            pass  # already set, e.g. by the manifest or an earlier call
+
+        class MONITORINFOEXW(ctypes.Structure):
+            _fields_ = [("cbSize", wintypes.DWORD), ("rcMonitor", wintypes.RECT), ("rcWork", wintypes.RECT),
+                        ("dwFlags", wintypes.DWORD), ("szDevice", wintypes.WCHAR * 32)]
+        self.MONITORINFOEXW = MONITORINFOEXW
+        self.MONITORENUMPROC = ctypes.WINFUNCTYPE(wintypes.BOOL, wintypes.HMONITOR, wintypes.HDC,
+                                                  ctypes.POINTER(wintypes.RECT), wintypes.LPARAM)
+
+    def monitors(self):
+        ctypes, wintypes = self.ctypes, self.wintypes
+        monitors = []
+
+        def add(handle, hdc, rect, data):
+            info = self.MONITORINFOEXW()
+            info.cbSize = ctypes.sizeof(info)
+            self.user32.GetMonitorInfoW(handle, ctypes.byref(info))
+            dpi_x, dpi_y = wintypes.UINT(), wintypes.UINT()
+            scale = 1.0
+            if self.shcore.GetDpiForMonitor(handle, self.MDT_EFFECTIVE_DPI, ctypes.byref(dpi_x), ctypes.byref(dpi_y)) == 0:
+                scale = dpi_x.value / BASE_DPI
+            r = info.rcMonitor
+            monitors.append(Monitor(r.left, r.top, r.right - r.left, r.bottom - r.top, scale,
+                                    bool(info.dwFlags & self.MONITORINFOF_PRIMARY), info.szDevice))
+            return True
+
+        self.user32.EnumDisplayMonitors(None, None, self.MONITORENUMPROC(add), 0)
+        return monitors
+
+
+# Any platform the screeninfo package supports (macOS mainly), no scale factors
+class ScreeninfoProvider(LayoutProvider):
+    name = "screeninfo"
+
+    def __init__(self):
+        import screeninfo
+        self.screeninfo = screeninfo
+
+    def monitors(self):
+        return [Monitor(m.x, m.y, m.width, m.height, 1.0, bool(m.is_primary), m.name or "")
+                for m in self.screeninfo.get_monitors()]
+
+
+LAYOUT_PROVIDERS = {
+    "xrandr": XrandrProvider,
+    "windows": WindowsProvider,
+    "screeninfo": ScreeninfoProvider,
+}
+
+
+# "auto" picks the platform's provider and falls back to one screen of fallback_size
+def create_layout_provider(name="auto", fallback_size=None):
+    if name == "auto":
+        candidates = ["xrandr"] if sys.platform.startswith("linux") else (
+            ["windows"] if sys.platform == "win32" else [])
+        for candidate in candidates + ["screeninfo"]:
+            try:
+                provider = LAYOUT_PROVIDERS[candidate]()
+                if provider.monitors():
+                    return provider
+            except Exception:
+                pass
+        if fallback_size is None:
+            raise RuntimeError("No monitor layout provider available")
+        return SingleScreenProvider(fallback_size)
+    if name not in LAYOUT_PROVIDERS:
+        raise ValueError(f"Unknown layout provider '{name}', expected one of {['auto'] + list(LAYOUT_PROVIDERS)}")
+    return LAYOUT_PROVIDERS[name]()
+
+
+# Cached monitor layout and the mapping from [-1, 1] cursor vectors to backend
+# coordinates. The layout is only re-read by refresh() (or the watch() thread),
+# vector_to_pos reads one immutable snapshot and never talks to the OS.
+# span "desktop" spreads the vector over the bounding box of every monitor and
+# pulls points in gaps between monitors onto the nearest one; "monitor" keeps the
+# cursor on the active monitor, which next_monitor() switches.
+# fallback_size is the one screen used until the provider reports any monitors.
+class ScreenGeometry:
+    def __init__(self, provider, span="desktop", refresh_seconds=REFRESH_SECONDS, fallback_size=None):
+        if span not in SPANS:
+            raise ValueError(f"Unknown screen span '{span}', expected one of {list(SPANS)}")
+        self.provider = provider
+        self.span = span
+        self.refresh_seconds = refresh_seconds
+        self.lock = threading.Lock()
+        self.monitors = []
+        self.active = 0
+        self.version = 0  # bumped whenever the layout, span or active monitor changes
+        self.stop_event = threading.Event()
+        self.watch_thread = None
+        self.refresh()
+        if not self.monitors:
+            if fallback_size is None:
+                raise RuntimeError(f"The '{provider.name}' layout provider found no monitors")
+            with self.lock:
+                self.monitors = [Monitor(0, 0, fallback_size[0], fallback_size[1], primary=True)]
+                self.__update_snapshot()
+
+    # re-reads the layout, returns True if it changed
+    def refresh(self):
+        monitors = self.provider.monitors()
+        if not monitors:
+            return False
+        with self.lock:
+            if [m.key() for m in monitors] == [m.key() for m in self.monitors]:
+                return False
+            # keep the active monitor if it is still connected, the primary otherwise
+            active_key = self.monitors[self.active].key() if self.monitors else None
+            keys = [m.key() for m in monitors]
+            if active_key in keys:
+                self.active = keys.index(active_key)
+            else:
+                self.active = next((i for i, m in enumerate(monitors) if m.primary), 0)
+            self.monitors = monitors
+            self.__update_snapshot()
+        return True
+
+    def watch(self):
+        if self.watch_thread is not None:
+            return
+        self.watch_thread = threading.Thread(target=self.__watch_loop, name="screen-geometry", daemon=True)
+        self.watch_thread.start()
+
+    def close(self, timeout=1.0):
+        self.stop_event.set()
+        if self.watch_thread is not None:
+            self.watch_thread.join(timeout)
+        self.provider.close()
+
+    def set_span(self, span):
+        if span not in SPANS:
+            raise ValueError(f"Unknown screen span '{span}', expected one of {list(SPANS)}")
+        with self.lock:
+            self.span = span
+            self.__update_snapshot()
+
+    # moves the cursor range to the next monitor (and out of desktop span)
+    def next_monitor(self):
+        with self.lock:
+            self.span = "monitor"
+            self.active = (self.active + 1) % len(self.monitors)
+            self.__update_snapshot()
+        return self.monitors[self.active]
+
+    def active_monitor(self):
+        return self.monitors[self.active]
+
+    # (width, height) of the area the vector spans, in backend pixels
+    @property
+    def size(self):
+        return self.snapshot[0][2:]
+
+    # the same size in the OS's logical pixels, for speeds that should feel the same on any display
+    @property
+    def logical_size(self):
+        width, height = self.size
+        scale = self.snapshot[1]
+        return width / scale, height / scale
+
+    # vector x right, y up, both in [-1, 1] -> (x, y) in backend coordinates
+    def vector_to_pos(self, x, y):
+        (left, top, width, height), _, monitors = self.snapshot
+        px = left + (1 + x) * width / 2
+        py = top + (1 - y) * height / 2
+        if len(monitors) == 1:
+            return monitors[0].clamp(px, py)
+        for monitor in monitors:
+            if monitor.contains(px, py):
+                return px, py
+        # in a gap of an uneven layout, onto the closest monitor
+        return min((monitor.clamp(px, py) for monitor in monitors),
+                   key=lambda p: (p[0] - px) ** 2 + (p[1] - py) ** 2)
+
+    # (bounds, scale, monitors in range), replaced as a whole so readers need no lock
+    def __update_snapshot(self):
+        monitors = self.monitors if self.span == "desktop" else [self.monitors[self.active]]
+        left = min(m.x for m in monitors)
+        top = min(m.y for m in monitors)
+        right = max(m.x + m.width for m in monitors)
+        bottom = max(m.y + m.height for m in monitors)
+        scale = max(m.scale for m in monitors)
+        self.snapshot = ((left, top, right - left, bottom - top), scale, list(monitors))
+        self.version += 1
+
+    def __watch_loop(self):
+        while not self.stop_event.wait(self.refresh_seconds):
+            try:
+                if self.refresh():
+                    print(f"Monitor layout changed: {self.monitors}")
+            except Exception as e:
+                print(f"Could not read the monitor layout: {e}")
@@ -0,0 +1,151 @@
+import json
+import os
+
+import numpy as np
+
+# download from https://alphacephei.com/vosk/models (vosk-model-small-en-us-0.15) and unpack here
+DEFAULT_VOSK_MODEL_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "vosk-model-small-en-us")
+UNKNOWN_WORD = "[unk]"  # what Vosk returns for speech outside the grammar
+
+ENERGY_THRESHOLD = 300  # RMS of 16-bit samples that counts as speech, speech_recognition's default
+PAUSE_SECONDS = 0.8  # silence that ends a phrase for backends that only recognise whole phrases
+
+
+# Turns a stream of 16-bit mono PCM chunks into text. accept() returns
+# (text, is_final) whenever there is something new, partial results let
+# SpeechListener act before the speaker has finished the phrase.
+class SpeechBackend:
+    name = "base"
+    streaming = False  # True if accept() reports partial results
+
+    # starts a new stream; phrases limits recognition to those phrases, None = free dictation
+    def reset(self, sample_rate, phrases=None):
+        raise NotImplementedError
+
+    def accept(self, chunk):
+        raise NotImplementedError
+
+    # end of stream, returns the last final text or None
+    def flush(self):
+        return None
+
+    def close(self):
+        pass
+
+
+# Offline streaming recognizer. With phrases the Kaldi decoder only considers
+# the command grammar, which is both faster and far more accurate than
+# free-form decoding.
+class VoskBackend(SpeechBackend):
+    name = "vosk"
+    streaming = True
+
+    def __init__(self, model_path=DEFAULT_VOSK_MODEL_PATH):
+        # imported here so the app still starts without vosk installed
+        import vosk
+        vosk.SetLogLevel(-1)
+        if not os.path.isdir(model_path):
+            raise FileNotFoundError(f"Vosk model not found at {model_path}")
+        self.vosk = vosk
+        self.model = vosk.Model(model_path)
+        self.recognizer = None
+        self.last_partial = ""
+
+    def reset(self, sample_rate, phrases=None):
+        if phrases:
+            grammar = json.dumps(list(phrases) + [UNKNOWN_WORD])
+            self.recognizer = self.vosk.KaldiRecognizer(self.model, sample_rate, grammar)
+        else:
+            self.recognizer = self.vosk.KaldiRecognizer(self.model, sample_rate)
+        self.last_partial = ""
+
+    def accept(self, chunk):
+        if self.recognizer.AcceptWaveform(chunk):
+            self.last_partial = ""
+            return clean_text(json.loads(self.recognizer.Result()).get("text", "")), True
+        partial = clean_text(json.loads(self.recognizer.PartialResult()).get("partial", ""))
+        if not partial or partial == self.last_partial:
+            return None
+        self.last_partial = partial
+        return partial, False
+
+    def flush(self):
+        if self.recognizer is None:
+            return None
+        text = clean_text(json.loads(self.recognizer.FinalResult()).get("text", ""))
+        return text or None
+
+
+# The old behaviour: buffers a phrase until PAUSE_SECONDS of silence and sends it
+# to Google's web API. Needs a connection and only ever returns final results.
+class GoogleBackend(SpeechBackend):
+    name = "google"
+
+    def __init__(self, energy_threshold=ENERGY_THRESHOLD, pause_seconds=PAUSE_SECONDS):
+        import speech_recognition as sr
+        self.sr = sr
+        self.recognizer = sr.Recognizer()
+        self.energy_threshold = energy_threshold
+        self.pause_seconds = pause_seconds
+        self.sample_rate = None
+        self.chunks = []
+        self.silence = 0.0
+
+    def reset(self, sample_rate, phrases=None):
+        self.sample_rate = sample_rate
+        self.chunks = []
+        self.silence = 0.0
+
+    def accept(self, chunk):
+        loud = rms(chunk) > self.energy_threshold
+        if not self.chunks and not loud:
+            return None
+        self.chunks.append(chunk)
+        self.silence = 0.0 if loud else self.silence + len(chunk) / 2 / self.sample_rate
+        if self.silence < self.pause_seconds:
+            return None
+        return self.__recognize()
+
+    def flush(self):
+        result = self.__recognize() if self.chunks else None
+        return result[0] if result else None
+
+    def __recognize(self):
+        audio = self.sr.AudioData(b"".join(self.chunks), self.sample_rate, 2)
+        self.chunks = []
+        self.silence = 0.0
+        try:
+            return self.recognizer.recognize_google(audio).lower(), True
+        except self.sr.UnknownValueError:
+            print("Could not understand audio.")
+        except self.sr.RequestError as e:
+            print(f"Could not request results; {e}")
+        return None
+
+
+def rms(chunk):
+    samples = np.frombuffer(chunk, dtype=np.int16).astype(np.float32)
+    return float(np.sqrt(np.mean(samples ** 2))) if len(samples) else 0.0
+
+
+def clean_text(text):
+    return " ".join(word for word in text.split() if word != UNKNOWN_WORD)
+
+
+SPEECH_BACKENDS = {
+    VoskBackend.name: VoskBackend,
+    GoogleBackend.name: GoogleBackend,
+}
+
+
+# "auto" prefers the offline engine and falls back to Google when vosk or its model is missing
+def create_speech_backend(name="auto"):
+    if name == "auto":
+        try:
+            return VoskBackend()
+        except Exception as e:
+            print(f"Offline speech recognition unavailable ({e}), falling back to Google")
+        return GoogleBackend()
+    if name not in SPEECH_BACKENDS:
+        raise ValueError(f"Unknown speech backend '{name}', expected one of {['auto'] + list(SPEECH_BACKENDS)}")
+    return SPEECH_BACKENDS[name]()
@@ -0,0 +1,205 @@
+"""
+Streams microphone (or WAV file) audio through a SpeechBackend and fires
+voice commands as soon as a command phrase shows up in a partial result.
+
+    python backend/speechListener.py --wav commands.wav
+    python backend/speechListener.py --wav commands.wav --backend google --realtime
+"""
+import threading
+import time
+import wave
+
+from speechBackends import create_speech_backend
+from audioFrontEnd import AudioFrontEnd
+
+SAMPLE_RATE = 16000  # Hz, what the small Vosk models are trained on
+CHUNK_MS = 30  # audio per chunk, bounds how soon a partial result can arrive
+
+
+# Yields 16-bit mono PCM chunks from the default microphone
+class MicrophoneSource:
+    def __init__(self, sample_rate=SAMPLE_RATE, chunk_ms=CHUNK_MS):
+        self.sample_rate = sample_rate
+        self.chunk_frames = sample_rate * chunk_ms // 1000
+
+    def __iter__(self):
+        import speech_recognition as sr
+        with sr.Microphone(sample_rate=self.sample_rate, chunk_size=self.chunk_frames) as source:
+            while True:
+                yield source.stream.read(self.chunk_frames)
+
+
+# Yields chunks from a 16-bit mono WAV file; realtime paces them like a microphone would
+class WavFileSource:
+    def __init__(self, path, chunk_ms=CHUNK_MS, realtime=False):
+        self.path = path
+        self.chunk_ms = chunk_ms
+        self.realtime = realtime
+        with wave.open(path, "rb") as wav:
+            if wav.getsampwidth() != 2 or wav.getnchannels() != 1:
+                raise ValueError(f"{path} must be 16-bit mono PCM")
+            self.sample_rate = wav.getframerate()
+        self.chunk_frames = self.sample_rate * chunk_ms // 1000
+
+    def __iter__(self):
+        start = time.perf_counter()
+        sent = 0
+        with wave.open(self.path, "rb") as wav:
+            while True:
+                chunk = wav.readframes(self.chunk_frames)
+                if not chunk:
+                    return
+                sent += len(chunk) // 2
+                if self.realtime:
+                    delay = start + sent / self.sample_rate - time.perf_counter()
+                    if delay > 0:
+                        time.sleep(delay)
+                yield chunk
+
+
+# Feeds source into backend on its own thread and matches every (partial) result
+# as a whole against commands, a CommandRegistry (see commandRegistry.py), which
+# also supplies the recognizer grammar. Commands fire once per utterance, on the
+# first result that contains them; exact ones ("quit") wait for the final result,
+# as a partial "quit" may still become "quit smoking".
+# on_command(match, text) gets each CommandMatch, or None for a final result
+# without any command; it runs on the listener thread, like the old listen loop.
+# With on_dictation(text, is_final), free-form mode streams every partial and
+# final result to it (see dictationSession.py) and only commands registered
+# with dictation=True ("stop typing") still fire.
+# source yields PCM chunks, and None where a speech segment ends (see audioFrontEnd.py).
+class SpeechListener:
+    def __init__(self, backend, source, commands, on_command, on_dictation=None):
+        self.backend = backend
+        self.source = source
+        self.commands = commands
+        self.phrases = commands.grammar_phrases()
+        self.on_command = on_command
+        self.on_dictation = on_dictation
+
+        self.free_form = False
+        self.reconfigure = True
+        self.fired = 0  # commands fired so far in the current utterance
+        self.audio_time = 0.0  # seconds of audio consumed, for latency reports
+        self.running = False
+        self.thread = None
+
+    def start(self):
+        self.running = True
+        self.thread = threading.Thread(target=self.run, name="speech", daemon=True)
+        self.thread.start()
+
+    def stop(self, timeout=1.0):
+        self.running = False
+        if hasattr(self.source, "close"):
+            self.source.close()
+        if self.thread is not None and self.thread is not threading.current_thread():
+            self.thread.join(timeout)
+        self.backend.close()
+
+    # free-form decoding for dictation, the command grammar otherwise
+    def set_free_form(self, enabled):
+        if enabled != self.free_form:
+            self.free_form = enabled
+            self.reconfigure = True
+
+    # blocking, returns when the source runs out or stop() is called
+    def run(self):
+        self.running = True
+        for chunk in self.source:
+            if not self.running:
+                break
+            if self.reconfigure:
+                self.reconfigure = False
+                self.fired = 0
+                self.backend.reset(self.source.sample_rate, None if self.free_form else self.phrases)
+            if chunk is None:
+                # end of a speech segment, finish the utterance now instead of waiting for more audio
+                text = self.backend.flush()
+                if text:
+                    self.__handle(text, True)
+                continue
+            self.audio_time += len(chunk) / 2 / self.source.sample_rate
+
+            result = self.backend.accept(chunk)
+            if result is not None:
+                self.__handle(*result)
+        else:
+            text = self.backend.flush()
+            if text:
+                self.__handle(text, True)
+        self.running = False
+
+    def __handle(self, text, is_final):
+        dictating = self.free_form and self.on_dictation is not None
+        if dictating:
+            self.on_dictation(text, is_final)
+        # misheard phrases are only corrected on the final result, never in dictated text
+        matches = self.commands.match_all(text, fuzzy=is_final and not dictating, dictation=dictating)
+        if not is_final:
+            matches = [match for match in matches if not match.command.exact]
+        # partial results grow, the first self.fired matches already ran
+        for match in matches[self.fired:]:
+            self.fired += 1
+            self.on_command(match, text)
+        if is_final:
+            if not self.fired and text and not dictating:
+                self.on_command(None, text)
+            self.fired = 0
+
+
+if __name__ == "__main__":
+    import argparse
+
+    from commandRegistry import CommandRegistry
+    from speechBackends import SPEECH_BACKENDS
+
+    # a few of the commands Frontend registers in main.py, handlers only print
+    commands = CommandRegistry()
+    for phrases, exact, dictation in [
+        (("start webcam",), False, False), (("increase sensitivity",), False, False),
+        (("decrease sensitivity",), False, False), (("sensitivity {n}",), False, False),
+        (("exit", "quit"), True, False), (("right click",), False, False), (("left click",), False, False),
+        (("start typing",), False, False), (("stop typing",), False, True),
+    ]:
+        commands.register(phrases, print, exact=exact, dictation=dictation)
+
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--wav", required=True, help="16-bit mono WAV file")
+    parser.add_argument("--backend", choices=["auto"] + list(SPEECH_BACKENDS), default="auto")
+    parser.add_argument("--realtime", action="store_true", help="feed audio at its real speed")
+    parser.add_argument("--free-form", action="store_true", help="decode without the command grammar")
+    parser.add_argument("--dictate", action="store_true",
+                        help="free-form, and print the keystrokes dictation would send")
+    parser.add_argument("--no-vad", action="store_true", help="send all audio to the recognizer")
+    args = parser.parse_args()
+
+    source = WavFileSource(args.wav, realtime=args.realtime)
+    if not args.no_vad:
+        source = AudioFrontEnd(source, lossless=not args.realtime)
+    wall_start = time.perf_counter()
+
+    def report(match, text):
+        audio_time = source.stream_time if not args.no_vad else listener.audio_time
+        found = f"{match.command.name} {match.args}" if match is not None else "(no command)"
+        print(f"{audio_time:7.2f}s audio  {time.perf_counter() - wall_start:7.2f}s wall  {found}  <- {text!r}")
+
+    on_dictation = None
+    if args.dictate:
+        from MouseAction import Mouse
+        from dictationSession import DictationSession, KeystrokeBatcher
+
+        mouse = Mouse(backend="recording")
+        dictation = DictationSession(KeystrokeBatcher(mouse))
+        on_dictation = dictation.update
+
+    listener = SpeechListener(create_speech_backend(args.backend), source, commands, report, on_dictation)
+    listener.set_free_form(args.free_form or args.dictate)
+    listener.run()
+    listener.stop()
+    if args.dictate:
+        mouse.close()
+        for timestamp, kind, key_args in mouse.backend.events:
+            print(f"{timestamp - wall_start:7.2f}s wall  {kind} {key_args[0]!r}")
+    if not args.no_vad:
+        print(source.stats())
@@ -0,0 +1,113 @@
+import customtkinter
+import cv2
+from PIL import Image, ImageTk
+from backend.headPoseEstimator import HeadPoseEstimator as Tracker
+
+FRAME_COLOR = "#1F1F1F"
+PREVIEW_SIZE = (320, 240)
+UPDATE_MS = 15
+
+
+# Runs the calibration phases from backend/calibration.py on the webcam and
+# saves the fitted profile, which the tracker loads on the next start
+class CalibrationDialogue(customtkinter.CTkToplevel):
+    def __init__(self, parent, cap=None):
+        super().__init__(parent)
+        self.title("Calibration - VisualLink")
+        self.geometry("420x480")
+        self.transient(parent)
+        self.grab_set()
+        self.resizable(False, False)
+
+        # reuse the app's camera when it already has one open
+        self.owns_cap = cap is None
+        self.cap = cap if cap is not None else cv2.VideoCapture(0)
+
+        self.main_frame = customtkinter.CTkFrame(self, corner_radius=15, fg_color=FRAME_COLOR)
+        self.main_frame.pack(padx=20, pady=20, fill="both", expand=True)
+
+        self.instructions_label = customtkinter.CTkLabel(
+            self.main_frame,
+            text="Loading face tracker...",
+            font=("Arial", 14),
+            text_color="white",
+            wraplength=340
+        )
+        self.instructions_label.pack(pady=(20, 10))
+
+        self.preview_label = customtkinter.CTkLabel(self.main_frame, text="")
+        self.preview_label.pack(pady=10)
+
+        self.progressbar = customtkinter.CTkProgressBar(self.main_frame, width=300)
+        self.progressbar.set(0)
+        self.progressbar.pack(pady=10)
+
+        self.close_button = customtkinter.CTkButton(
+            self.main_frame,
+            text="Cancel",
+            command=self.close,
+            font=("Arial", 14),
+            corner_radius=10,
+            height=40
+        )
+        self.close_button.pack(pady=10)
+
+        self.protocol("WM_DELETE_WINDOW", self.close)
+
+        # Stores the fitted CalibrationProfile
+        self.result = None
+        self.tracker = None
+        self.after(100, self.start)
+
+    def start(self):
+        self.tracker = Tracker(profilePath=None)
+        self.tracker.start_calibration()
+        self.updateCalibration()
+
+    def updateCalibration(self):
+        if self.tracker is None:
+            return
+        ret, frame = self.cap.read()
+        if ret:
+            frame = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
+            frame = self.tracker.process_img(frame, moveMouse=False)
+
+            if frame is not None:
+                pilImg = Image.fromarray(frame).resize(PREVIEW_SIZE)
+                imgtk = ImageTk.PhotoImage(image=pilImg)
+                self.preview_label.imgtk = imgtk
+                self.preview_label.configure(image=imgtk)
+
+        calibrator = self.tracker.calibrator
+        if calibrator is not None:
+            phase = calibrator.current_phase()
+            if phase is not None:
+                self.instructions_label.configure(text=phase[2])
+            self.progressbar.set(calibrator.progress())
+            self.after(UPDATE_MS, self.updateCalibration)
+        else:
+            self.finish()
+
+    def finish(self):
+        profile = self.tracker.profile
+        profile.save()
+        self.result = profile
+        self.progressbar.set(1)
+        self.instructions_label.configure(
+            text=f"Calibration saved.\n"
+                 f"Range: {profile.max_yaw:.0f}° yaw, {profile.max_pitch:.0f}° pitch")
+        self.close_button.configure(text="Done")
+        self.__release()
+
+    def close(self):
+        self.__release()
+        self.grab_release()
+        self.destroy()
+
+    def __release(self):
+        if self.tracker is not None:
+            self.tracker.close()
+            self.tracker = None
+        if self.owns_cap:
+            self.cap.release()
+            self.owns_cap = False
@@ -1,12 +1,14 @@
 import customtkinter
 from frame import Frame
+from calibrationDialogue import CalibrationDialogue
 
 FRAME_COLOR = "#1F1F1F"
 class ConfigDialogue(customtkinter.CTkToplevel):
     def __init__(self, parent):
         super().__init__(parent)
+        self.parent = parent
         self.title("Initial Configuration - VisualLink")
-        self.geometry("450x500")  # Slightly larger for better spacing
+        self.geometry("450x680")  # Slightly larger for better spacing
         self.transient(parent)  # Connects this class to the parent
         self.grab_set()  # Makes this window modal
         self.resizable(False, False)  # Prevent resizing for consistent layout
@@ -15,6 +17,8 @@ class ConfigDialogue(customtkinter.CTkToplevel):
         self.sensitivity = customtkinter.DoubleVar(value=1.0)
         self.blink = customtkinter.IntVar(value=1)
         self.countdown = customtkinter.IntVar(value=3)
+        self.controlOnly = customtkinter.BooleanVar(value=False)
+        self.mappingMode = customtkinter.StringVar(value="absolute")
 
         # Main Frame for Content
         self.main_frame = customtkinter.CTkFrame(self, corner_radius=15, fg_color=FRAME_COLOR)
@@ -87,6 +91,46 @@ class ConfigDialogue(customtkinter.CTkToplevel):
         )
         countdown_entry.grid(row=7, column=0, pady=5, sticky="w")
 
+        # Control-only mode (skips most preview annotation to save CPU)
+        control_only_checkbox = customtkinter.CTkCheckBox(
+            self.settings_frame,
+            text="Control-only mode (low CPU preview)",
+            variable=self.controlOnly,
+            font=("Arial", 14),
+            text_color="white"
+        )
+        control_only_checkbox.grid(row=8, column=0, pady=(20, 5), sticky="w")
+
+        # Cursor mapping mode
+        mapping_label = customtkinter.CTkLabel(
+            self.settings_frame,
+            text="Cursor Mode:",
+            font=("Arial", 14),
+            text_color="white"
+        )
+        mapping_label.grid(row=9, column=0, pady=(20, 5), sticky="w")
+        mapping_menu = customtkinter.CTkOptionMenu(
+            self.settings_frame,
+            values=["absolute", "relative", "hybrid"],
+            variable=self.mappingMode,
+            font=("Arial", 12),
+            corner_radius=8
+        )
+        mapping_menu.grid(row=10, column=0, pady=5, sticky="w")
+
+        # Calibration Button (learns neutral pose, head range and blink thresholds)
+        calibrate_button = customtkinter.CTkButton(
+            self.main_frame,
+            text="Calibrate",
+            command=self.calibrate,
+            font=("Arial", 14),
+            corner_radius=10,
+            height=40,
+            fg_color="gray30",
+            hover_color="gray40"
+        )
+        calibrate_button.pack(pady=(20, 0))
+
         # Submit Button
         submit_button = customtkinter.CTkButton(
             self.main_frame, 
@@ -103,14 +147,23 @@ class ConfigDialogue(customtkinter.CTkToplevel):
         # Stores Results
         self.result = None
 
+    def calibrate(self):
+        # the profile is saved to disk, the tracker picks it up when the webcam starts
+        calibration = CalibrationDialogue(self, cap=getattr(self.parent, "cap", None))
+        self.wait_window(calibration)
+        self.grab_set()
+
     def submit(self):
         try:
             settings = {
                 "sensitivity": self.sensitivity.get(),
                 "blinkInterval": self.blink.get(),
-                "countdown": self.countdown.get()
+                "countdown": self.countdown.get(),
+                "controlOnly": self.controlOnly.get(),
+                "mappingMode": self.mappingMode.get()
             }
-            if all(v >= 0 for v in settings.values()):
+            numeric = [settings["sensitivity"], settings["blinkInterval"], settings["countdown"]]
+            if all(v >= 0 for v in numeric):
                 self.result = settings
                 self.grab_release()
                 self.destroy()
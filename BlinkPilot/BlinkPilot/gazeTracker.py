@@ -0,0 +1,326 @@
+"""
+Eye-gaze cursor control from the FaceLandmarker's iris landmarks.
+
+Calibrate (9 dots, full screen) and then drive the cursor with gaze + head pose:
+    python gazeTracker.py
+    python gazeTracker.py --skip-calibration --mode gaze
+"""
+import json
+import os
+
+import numpy as np
+
+DEFAULT_GAZE_PROFILE_PATH = os.path.join(os.path.expanduser("~"), ".blinkpilot", "gaze.json")
+
+# landmark indices per eye (478-point model): iris center, the two corners, upper and lower lid
+GAZE_EYES = np.array([
+    [468, 33, 133, 159, 145],
+    [473, 263, 362, 386, 374],
+], dtype=np.intp)
+MIN_EYE_OPENNESS = 0.12  # lid gap / eye width, below this the iris is hidden and the sample is dropped
+
+# 3x3 grid in mouse-vector units ([-1, 1], y up), corners pulled in so the dots stay visible
+CALIBRATION_MARGIN = 0.8
+CALIBRATION_TARGETS = [(x, y) for y in (CALIBRATION_MARGIN, 0.0, -CALIBRATION_MARGIN)
+                       for x in (-CALIBRATION_MARGIN, 0.0, CALIBRATION_MARGIN)]
+SETTLE_SECONDS = 0.6  # after a dot appears, the eyes need this long to land on it
+SAMPLE_SECONDS = 1.0
+RIDGE_LAMBDA = 1e-2  # regularization of the fit, keeps the head terms sane when the head barely moved
+MIN_TARGET_SAMPLES = 5  # a dot with fewer usable samples is skipped by the fit
+
+GAZE_MODES = ("head", "gaze", "fused")
+GAZE_SMOOTHING = 0.3  # EMA weight of a new gaze estimate, raw iris positions are noisy
+JUMP_DISTANCE = 0.3  # fused: gaze this far from the cursor (mouse-vector units) triggers a jump
+JUMP_DWELL = 0.12  # seconds the gaze has to stay away before jumping, ignores glances and saccades
+FINE_GAIN = 0.5  # fused: head vector offset since the last jump -> cursor offset
+
+
+# (gaze_x, gaze_y) iris position in eye coordinates, averaged over both eyes, or
+# None while the eyes are closed. x runs from one corner to the other (0..1),
+# y is the offset from the lid midpoint across the corner axis, both in eye widths.
+# aspect is frame width / height, the landmarks are normalized per axis.
+def gaze_features(points, aspect=1.0):
+    eyes = points[GAZE_EYES, :2] * (aspect, 1.0)  # (2 eyes, 5 points, xy)
+    iris, corner_a, corner_b, top, bottom = (eyes[:, i] for i in range(5))
+    axis = corner_b - corner_a
+    width = np.linalg.norm(axis, axis=-1)
+    if np.any(width == 0):
+        return None
+    along = axis / width[:, None]
+    across = np.stack([-along[:, 1], along[:, 0]], axis=-1)
+
+    openness = np.abs(np.sum((bottom - top) * across, axis=-1)) / width
+    if np.mean(openness) < MIN_EYE_OPENNESS:
+        return None
+    x = np.sum((iris - corner_a) * along, axis=-1) / width
+    y = np.sum((iris - (top + bottom) / 2) * across, axis=-1) / width
+    return float(np.mean(x)), float(np.mean(y))
+
+
+# Second-order polynomial in the gaze features plus linear head-vector terms, so
+# turning the head while looking at the same spot does not move the estimate
+def design_matrix(features, head):
+    features = np.atleast_2d(features)
+    head = np.atleast_2d(head)
+    a, b = features[:, 0], features[:, 1]
+    return np.column_stack([np.ones(len(a)), a, b, a * b, a * a, b * b, head[:, 0], head[:, 1]])
+
+
+# Ridge regression from (gaze features, head vector) to the screen position in
+# mouse-vector units; features are standardized with the calibration statistics
+class GazeModel:
+    def __init__(self, coefficients, feature_mean, feature_scale):
+        self.coefficients = np.asarray(coefficients, dtype=np.float64)  # (8, 2)
+        self.feature_mean = np.asarray(feature_mean, dtype=np.float64)
+        self.feature_scale = np.asarray(feature_scale, dtype=np.float64)
+
+    @classmethod
+    def fit(cls, features, head, targets, ridge=RIDGE_LAMBDA):
+        features = np.asarray(features, dtype=np.float64)
+        mean = features.mean(axis=0)
+        scale = features.std(axis=0)
+        scale[scale == 0] = 1.0
+        X = design_matrix((features - mean) / scale, np.asarray(head, dtype=np.float64))
+        penalty = ridge * np.eye(X.shape[1])
+        penalty[0, 0] = 0.0  # the intercept is not shrunk
+        coefficients = np.linalg.solve(X.T @ X + penalty, X.T @ np.asarray(targets, dtype=np.float64))
+        return cls(coefficients, mean, scale)
+
+    # (x, y) in mouse-vector units
+    def predict(self, features, head):
+        X = design_matrix((np.asarray(features) - self.feature_mean) / self.feature_scale, head)
+        x, y = (X @ self.coefficients)[0]
+        return float(x), float(y)
+
+    def to_dict(self):
+        return {"coefficients": self.coefficients.tolist(), "feature_mean": self.feature_mean.tolist(),
+                "feature_scale": self.feature_scale.tolist()}
+
+    def save(self, path=DEFAULT_GAZE_PROFILE_PATH):
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with open(path, "w") as f:
+            json.dump(self.to_dict(), f, indent=2)
+
+    # returns None when there is no usable model at path
+    @classmethod
+    def load(cls, path=DEFAULT_GAZE_PROFILE_PATH):
+        if not os.path.exists(path):
+            return None
+        try:
+            with open(path) as f:
+                return cls(**json.load(f))
+        except (OSError, ValueError, TypeError) as e:
+            print(f"Could not load gaze profile {path}: {e}")
+            return None
+
+
+# Shows CALIBRATION_TARGETS one after another (the caller draws current_target())
+# and collects gaze features and head vectors once the eyes have settled on each
+class GazeCalibrator:
+    def __init__(self, targets=CALIBRATION_TARGETS, settle_seconds=SETTLE_SECONDS, sample_seconds=SAMPLE_SECONDS):
+        self.targets = targets
+        self.settle_seconds = settle_seconds
+        self.sample_seconds = sample_seconds
+        self.samples = [[] for _ in targets]  # per target: (gaze_x, gaze_y, head_x, head_y)
+        self.start_time = None
+        self.last_time = None
+
+    # moves the target clock, also called on frames without a face
+    def advance(self, timestamp):
+        if self.start_time is None:
+            self.start_time = timestamp
+        self.last_time = timestamp
+
+    def add_sample(self, features, head_vector, timestamp):
+        self.advance(timestamp)
+        index, settled = self.__position()
+        if features is not None and index is not None and settled:
+            self.samples[index].append((*features, head_vector.x, head_vector.y))
+
+    # (x, y) of the dot to show, None once finished
+    def current_target(self):
+        index, _ = self.__position()
+        return None if index is None else self.targets[index]
+
+    def progress(self):
+        total = len(self.targets) * (self.settle_seconds + self.sample_seconds)
+        return 0.0 if self.start_time is None else min(1.0, (self.last_time - self.start_time) / total)
+
+    @property
+    def done(self):
+        return self.start_time is not None and self.__position()[0] is None
+
+    def fit(self, ridge=RIDGE_LAMBDA):
+        usable = [(target, np.array(samples)) for target, samples in zip(self.targets, self.samples)
+                  if len(samples) >= MIN_TARGET_SAMPLES]
+        if len(usable) < len(self.targets) - 1:
+            raise ValueError(f"Only {len(usable)} of {len(self.targets)} calibration dots have enough samples")
+        samples = np.concatenate([samples for _, samples in usable])
+        targets = np.concatenate([np.tile(target, (len(samples), 1)) for target, samples in usable])
+        return GazeModel.fit(samples[:, :2], samples[:, 2:], targets, ridge)
+
+    # (target index or None when finished, whether the settle time is over)
+    def __position(self):
+        if self.start_time is None:
+            return 0, False
+        elapsed = self.last_time - self.start_time
+        per_target = self.settle_seconds + self.sample_seconds
+        index = int(elapsed // per_target)
+        if index >= len(self.targets):
+            return None, False
+        return index, elapsed - index * per_target >= self.settle_seconds
+
+
+class GazePoint:
+    def __init__(self, x, y):
+        self.x = x
+        self.y = y
+
+
+# Turns landmarks and the head-pose mouse vector into the cursor vector:
+# head - the head vector unchanged (no gaze)
+# gaze - the smoothed gaze estimate
+# fused - gaze for coarse jumps, head pose for fine adjustment: when the gaze
+#         rests JUMP_DISTANCE away from the cursor for JUMP_DWELL seconds the
+#         cursor jumps there, in between the head offset since that jump moves it
+# Without a model every mode falls back to the head vector.
+class GazeTracker:
+    def __init__(self, model=None, mode="fused", smoothing=GAZE_SMOOTHING, jump_distance=JUMP_DISTANCE,
+                 jump_dwell=JUMP_DWELL, fine_gain=FINE_GAIN):
+        if mode not in GAZE_MODES:
+            raise ValueError(f"Unknown gaze mode '{mode}', expected one of {list(GAZE_MODES)}")
+        self.model = model
+        self.mode = mode
+        self.smoothing = smoothing
+        self.jump_distance = jump_distance
+        self.jump_dwell = jump_dwell
+        self.fine_gain = fine_gain
+        self.reset()
+
+    @classmethod
+    def from_profile(cls, path=DEFAULT_GAZE_PROFILE_PATH, **kwargs):
+        return cls(GazeModel.load(path), **kwargs)
+
+    def reset(self):
+        self.gaze = None  # smoothed (x, y)
+        self.anchor = None  # fused: cursor position right after the last jump
+        self.head_anchor = None  # fused: head vector at the last jump
+        self.away_since = None
+        self.jumps = 0
+
+    def set_model(self, model):
+        self.model = model
+        self.reset()
+
+    def update(self, points, head_vector, aspect=1.0, timestamp=None):
+        if self.model is None or self.mode == "head" or points is None:
+            return head_vector
+        features = gaze_features(points, aspect)
+        if features is not None:
+            x, y = self.model.predict(features, (head_vector.x, head_vector.y))
+            x, y = float(np.clip(x, -1, 1)), float(np.clip(y, -1, 1))
+            if self.gaze is None:
+                self.gaze = (x, y)
+            else:
+                self.gaze = (self.gaze[0] + self.smoothing * (x - self.gaze[0]),
+                             self.gaze[1] + self.smoothing * (y - self.gaze[1]))
+        if self.gaze is None:
+            return head_vector  # eyes closed since start
+        if self.mode == "gaze":
+            return GazePoint(*self.gaze)
+        return self.__fuse(head_vector, timestamp)
+
+    def __fuse(self, head_vector, timestamp):
+        if self.anchor is None:
+            self.__jump(head_vector)
+        cursor = (float(np.clip(self.anchor[0] + (head_vector.x - self.head_anchor[0]) * self.fine_gain, -1, 1)),
+                  float(np.clip(self.anchor[1] + (head_vector.y - self.head_anchor[1]) * self.fine_gain, -1, 1)))
+
+        if np.hypot(self.gaze[0] - cursor[0], self.gaze[1] - cursor[1]) > self.jump_distance:
+            if self.away_since is None:
+                self.away_since = timestamp
+            elif timestamp is None or timestamp - self.away_since >= self.jump_dwell:
+                self.__jump(head_vector)
+                cursor = self.anchor
+        else:
+            self.away_since = None
+        return GazePoint(*cursor)
+
+    def __jump(self, head_vector):
+        self.anchor = self.gaze
+        self.head_anchor = (head_vector.x, head_vector.y)
+        self.away_since = None
+        self.jumps += 1
+
+
+if __name__ == "__main__":
+    import argparse
+    import time
+
+    import cv2
+
+    from backend.headPoseEstimator import HeadPoseEstimator
+
+    WINDOW = "gaze calibration"
+
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--mode", choices=list(GAZE_MODES), default="fused")
+    parser.add_argument("--profile", default=DEFAULT_GAZE_PROFILE_PATH, help="where the gaze model is saved")
+    parser.add_argument("--skip-calibration", action="store_true", help="use the saved model")
+    args = parser.parse_args()
+
+    cap = cv2.VideoCapture(0)
+    model = GazeModel.load(args.profile) if args.skip_calibration else None
+
+    if model is None:
+        # the tracker only supplies landmarks and head vectors here, the cursor stays put
+        # and looking at the dots must not click
+        tracker = HeadPoseEstimator(profilePath=None, blinkClicks=False, gestures=None)
+        calibrator = GazeCalibrator()
+        # targets cover the active monitor, the one the cursor is limited to below;
+        # the whole desktop would put dots off screen or across the monitor gap
+        monitor = tracker.mouse.screen.active_monitor()
+        cv2.namedWindow(WINDOW, cv2.WND_PROP_FULLSCREEN)
+        cv2.moveWindow(WINDOW, monitor.x, monitor.y)
+        cv2.setWindowProperty(WINDOW, cv2.WND_PROP_FULLSCREEN, cv2.WINDOW_FULLSCREEN)
+        w, h = monitor.width, monitor.height
+        canvas = np.zeros((h, w, 3), dtype=np.uint8)
+        while not calibrator.done:
+            success, img = cap.read()
+            if not success:
+                break
+            frame_time = time.perf_counter()
+            tracker.process_img(img, moveMouse=False, frameTime=frame_time)
+            points, _ = tracker.last_landmarker_output()
+            features = gaze_features(points, img.shape[1] / img.shape[0]) if points is not None else None
+            calibrator.add_sample(features, tracker.last_head_vector, frame_time)
+
+            target = calibrator.current_target()
+            canvas[:] = 0
+            if target is not None:
+                center = (int((1 + target[0]) * w / 2), int((1 - target[1]) * h / 2))
+                cv2.circle(canvas, center, 18, (255, 255, 255), -1)
+                cv2.circle(canvas, center, 4, (0, 0, 255), -1)
+            cv2.imshow(WINDOW, canvas)
+            if cv2.waitKey(1) == ord('q'):
+                break
+        cv2.destroyWindow(WINDOW)
+        tracker.close()
+        model = calibrator.fit()
+        model.save(args.profile)
+        print(f"Gaze model written to {args.profile}")
+
+    tracker = HeadPoseEstimator(controlOnly=True, previewInterval=0, gazeTracker=GazeTracker(model, args.mode))
+    tracker.mouse.setScreenSpan("monitor")  # the model was fit on the active monitor
+    try:
+        while cap.isOpened():
+            success, img = cap.read()
+            if not success:
+                break
+            tracker.process_img(img)
+    except KeyboardInterrupt:
+        pass
+    tracker.close()
+    cap.release()
@@ -3,13 +3,20 @@ from frame import Frame
 from welcomeWindow import *
 from configDialogue import *
 import cv2
-from PIL import Image, ImageTk
 import time
-import threading
-import speech_recognition as sr
-import pyautogui
+import queue
+from backend.speechBackends import create_speech_backend
+from backend.speechListener import SpeechListener, MicrophoneSource
+from backend.commandRegistry import CommandRegistry, voice_command
+from backend.audioFrontEnd import AudioFrontEnd
 from backend.MouseAction import Mouse
+from backend.dictationSession import DictationSession, KeystrokeBatcher
 from backend.headPoseEstimator import HeadPoseEstimator as Tracker
+from backend.frameEngine import FrameEngine
+from backend.frameProfiler import FrameProfiler
+from backend.gestureEngine import GestureEngine, DwellClicker, DEFAULT_GESTURE_ACTIONS
+from previewDisplay import PreviewDisplay
+from gazeTracker import GazeTracker
 
 customtkinter.set_default_color_theme("dark-blue")
 
@@ -21,33 +28,49 @@ class Frontend(customtkinter.CTk):
     SENSITIVTY_LABEL = "Sensitivity"
     BLINK_INTERVAL_CLICK_LABEL = "Blink Interval Click"
     COUNTDOWN_LABEL = "Countdown"
-
-    VOICE_COMMANDS = [
-        "start webcam - Starts the webcam feed",
-        "increase sensitivity - Increases sensitivity by 1",
-        "decrease sensitivity - Decreases sensitivity by 1",
-        "exit/quit - Closes the application",
-        "right click - (Right mouse click)",
-        "left click - (Left mouse click)",
-        "start typing - Begins typing mode (speak to type)",
-        "stop typing - Ends typing mode"
-    ]
-
-    def __init__(self, blinkIntervalClick, sensitivity=1, countdown=3):
+    VIDEO_POLL_MS = 10  # how often the Tk loop checks the engine for a finished frame
+    RUNNING_MODE = "live_stream"  # landmarker runs async, results drive the mouse from its callback
+    INFERENCE_WIDTH = 640  # landmarker input width, keeps 1080p webcams from costing more than 480p
+    ROI_TRACKING = False  # crop the landmarker input around the previous face; head pose is not corrected for the crop yet
+    MESH_DETAIL = "full"  # "contours" skips the tesselation lines in the preview
+    GESTURE_CLICKS = False  # winks/brow raise click at once instead of counting blinks, see backend/gestureEngine.py
+    DWELL_CLICK_SECONDS = 0  # left click when the cursor rests this long, 0 = off
+    GAZE_MODE = "head"  # "fused" jumps to where you look and fine-tunes with the head, needs `python gazeTracker.py` once
+    SPEECH_BACKEND = "auto"  # "vosk" (offline, streaming), "google" (web API) or "auto" to prefer vosk
+    DICTATION_ENTER = False  # press Enter after every dictated phrase; "press enter" works either way
+    PROFILING = False  # time every pipeline stage and overlay p50/p95/p99 on the webcam feed
+    PROFILE_DUMP_PATH = "frame_profile.csv"  # written on exit when profiling, .json also works
+    PROFILE_OVERLAY_MS = 500  # how often the timing overlay is refreshed
+    VOICE_SCROLL_CLICKS = 3  # wheel clicks per step of "scroll up/down <number>"
+    COMMAND_POLL_MS = 20  # how often the Tk loop runs voice commands queued by the speech thread
+
+
+    def __init__(self, blinkIntervalClick, sensitivity=1, countdown=3, controlOnly=False, mappingMode="absolute"):
         super().__init__()
         self.sensitivity = sensitivity
         self.blinkIntervalClick = blinkIntervalClick
+        self.controlOnly = controlOnly
+        self.mappingMode = mappingMode
         
         self.countdown = countdown
         self.typing_mode = False
 
+        # voice commands are the @voice_command methods below; the speech thread
+        # queues their handlers and drainCommandQueue runs them on the Tk thread
+        self.commands = CommandRegistry()
+        self.commands.register_object(self)
+        self.commandQueue = queue.SimpleQueue()
+
         import tkinter as tk
 
         if tk._default_root is None:
             tk._default_root = self
 
-        # Initialize Mouse
+        # Initialize Mouse; the tracker drives this one too, so voice, gestures and the head
+        # share one output thread and one drag/held-key state
         self.mouse = Mouse(smoothing_alpha=0.2)
+        # typing mode streams recognized text into keystrokes, see backend/dictationSession.py
+        self.dictation = DictationSession(KeystrokeBatcher(self.mouse), enter_after_utterance=self.DICTATION_ENTER)
 
         # tkinter setup
         # Window SETUP
@@ -105,17 +128,31 @@ class Frontend(customtkinter.CTk):
         self.initSliders()
 
         self.cap = cv2.VideoCapture(0)
+        self.engine = None
+        self.profiler = FrameProfiler(enabled=self.PROFILING)
+        self.profileOverlay = None
 
 
         # Voice recognition setup
-        self.recognizer = sr.Recognizer()
-        self.microphone = sr.Microphone()
+        # the recognizer's grammar and the matching of each utterance come from the registry, see
+        # backend/speechListener.py; the front end captures continuously and only hands speech segments on
+        self.speech = SpeechListener(create_speech_backend(self.SPEECH_BACKEND), AudioFrontEnd(MicrophoneSource()),
+                                     self.commands, self.on_voice_command, self.on_dictation)
         self.listening = False
+        self.drainCommandQueue()
         self.start_listening()
 
     def cleanup(self) -> None:
         try:
             self.listening = False
+            self.speech.stop()
+            if self.engine is not None:
+                self.engine.stop()
+                self.tracker.close()
+            if self.profiler.enabled:
+                self.profiler.dump(self.PROFILE_DUMP_PATH)
+                print(f"Frame profile written to {self.PROFILE_DUMP_PATH}")
+            self.mouse.close()
             self.cap.release()
             self.quit()
             exit()
@@ -132,44 +169,59 @@ class Frontend(customtkinter.CTk):
             self.start_model_and_camera()
 
     def start_model_and_camera(self):
-        self.tracker = Tracker(self.sensitivity, blinkInterval=self.blinkIntervalClick)
+        self.tracker = Tracker(self.sensitivity, blinkInterval=self.blinkIntervalClick, controlOnly=self.controlOnly,
+                               runningMode=self.RUNNING_MODE, inferenceWidth=self.INFERENCE_WIDTH,
+                               roiTracking=self.ROI_TRACKING, mappingMode=self.mappingMode,
+                               profiler=self.profiler, meshDetail=self.MESH_DETAIL,
+                               gazeTracker=GazeTracker.from_profile(mode=self.GAZE_MODE),
+                               gestures=self.create_gesture_engine(), blinkClicks=not self.GESTURE_CLICKS,
+                               onGestureAction=self.process_command, mouse=self.mouse)
+        # capture and inference run on their own threads, see backend/frameEngine.py
+        self.engine = FrameEngine(self.cap, self.tracker, profiler=self.profiler)
+        self.preview = PreviewDisplay(self.webcam_area)
+        self.engine.start()
         self.updateVideoFeed()
+        if self.profiler.enabled:
+            self.updateProfileOverlay()
+
+    # None when neither gesture nor dwell clicks are enabled, the tracker then skips blendshapes
+    def create_gesture_engine(self):
+        dwell = DwellClicker(self.DWELL_CLICK_SECONDS) if self.DWELL_CLICK_SECONDS else None
+        if not self.GESTURE_CLICKS and dwell is None:
+            return None
+        return GestureEngine(actions=DEFAULT_GESTURE_ACTIONS if self.GESTURE_CLICKS else {}, dwell=dwell)
 
     """
     This is where all the camera stuff is
     """
     def updateVideoFeed(self):
-        ret, frame = self.cap.read()
-
         self.webcam_area.configure(text="+") # mark the center of the screen
 
-        # turns cv footage into image so we can display it in
-        # tkinter
-        if ret:
-            frame = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
+        # only picks up the newest finished frame, the engine drops the rest
+        frame = self.engine.latest()
+        if frame is not None:
+            # scaled into the preview's own buffer and pasted into its PhotoImage, see previewDisplay.py
+            with self.profiler.stage("tk"):
+                self.preview.show(frame)
 
-            frame = self.tracker.process_img(frame) # add more params here
+        if self.engine.running:
+            self.webcam_area.after(self.VIDEO_POLL_MS, self.updateVideoFeed)
 
-            imgtk = Image.fromarray(frame)
-            imgtk = ImageTk.PhotoImage(image=imgtk)
+    # stage timings drawn in the top-left corner of the webcam feed
+    def updateProfileOverlay(self):
+        if self.profileOverlay is None:
+            self.profileOverlay = customtkinter.CTkLabel(self.webcam_area,
+                                                         text="",
+                                                         font=("Courier", 12),
+                                                         text_color="white",
+                                                         fg_color="gray20",
+                                                         justify="left")
+            self.profileOverlay.place(x=10, y=10, anchor="nw")
 
-            self.webcam_area.imgtk = imgtk
-            self.webcam_area.configure(image=imgtk)
-
-            self.webcam_area.after(5, self.updateVideoFeed)
-
-    def updateWebCamImage(self, pilImg):
-        try:
-            #imgtk = ImageTk.PhotoImage(image=pilImg, master=self)
+        self.profileOverlay.configure(text=self.profiler.format_overlay())
 
-            width, height = pilImg.size
-
-            ctk_img = customtkinter.CTkImage(dark_image=pilImg, size=(width, height))
-
-            self.webcam_area.configure(image=ctk_img, text="")
-            self.webcam_area.image = ctk_img
-        except Exception as e:
-            print("Could not update webcam image: ",e)
+        if self.engine.running:
+            self.after(self.PROFILE_OVERLAY_MS, self.updateProfileOverlay)
 
     def updateSensitivity(self, newSensitivity):
         self.sensitivity = newSensitivity
@@ -315,7 +367,7 @@ class Frontend(customtkinter.CTk):
                                     sticky="nsew")
 
         # Format the voice commands with bullets
-        formatted_commands = "Voice Commands:\n\n" + "\n".join([f"• {cmd}" for cmd in self.VOICE_COMMANDS])
+        formatted_commands = "Voice Commands:\n\n" + "\n".join([f"• {cmd}" for cmd in self.commands.help_lines()])
         self.voiceCommandsTextbox.insert("0.0", formatted_commands)
         self.voiceCommandsTextbox.configure(state="disabled")
 
@@ -325,74 +377,183 @@ class Frontend(customtkinter.CTk):
     def start_listening(self):
         # Starts voice recognition on new thread
         self.listening = True
-        self.voice_thread = threading.Thread(target = self.listen_for_commands, daemon = True)
-        self.voice_thread.start()
-
-    def listen_for_commands(self):
-        # Listens for commands during recording
-        with self.microphone as source:
-            self.recognizer.adjust_for_ambient_noise(source, duration = 1)
-            print("Voice recognition started. Say 'start webcam', 'increase sensitivity', etc.")
-            while self.listening:
-                try:
-                    audio = self.recognizer.listen(source, timeout = None)
-                    command = self.recognizer.recognize_google(audio).lower()
-                    print(f"Recognized command: {command}")
-                    self.process_command(command)
-                except sr.UnknownValueError:
-                    print("Could not understand audio.")
-                except sr.RequestError as e:
-                    print(f"Could not request results; {e}")
-                except Exception as e:
-                    print(f"Error in voice recognition: {e}")
-
-    def type_text(self, text):
-        """Simulate typing the given text using pyautogui."""
+        self.speech.start()
+        print("Voice recognition started. Say 'start webcam', 'increase sensitivity', etc.")
+
+    def on_voice_command(self, match, text):
+        # Runs on the speech thread as soon as the listener matched a command in the utterance
+        if match is None:
+            print(f"Unknown command: {text}")
+            return
+        print(f"Recognized command: {match.command.phrases[0]}")
+        if match.fuzzy:
+            print(f"Treating '{text}' as '{match.command.phrases[0]}'")
+        self.queue_command(match)
+
+    def on_dictation(self, text, is_final):
+        # Runs on the speech thread for every partial and final result in typing mode;
+        # keystrokes go straight to the mouse's output thread, not through Tk.
+        # Only dictation commands ("stop typing") end the text, everything else is typed
+        match = self.commands.match(text, fuzzy=False, dictation=True)
+        if match is not None:
+            text = text[:match.offset].rstrip()  # the command itself is not typed
         try:
-            pyautogui.typewrite(text)
-            pyautogui.press("enter")  # Optional: press Enter after each phrase
+            # words before a command are final as they are, nothing is held back for revision
+            self.dictation.update(text, is_final, hold_back=match is None)
         except Exception as e:
             print(f"Error typing text: {e}")
 
+    # a command phrase from elsewhere, e.g. a gesture action (runs on the tracker's thread)
     def process_command(self, command):
-            # Process commands
-        if "start webcam" in command:
-            self.after(0, lambda: self.countDown(self.countdown))  # Run countdown on main thread
-        elif "increase sensitivity" in command:
-            current_sensitivity = self.sensitivitySlider.get()
-            new_sensitivity = min(current_sensitivity + 1, 10)
-            self.after(0, lambda: self.sensitivitySlider.set(new_sensitivity))
-            self.after(0, lambda: self.updateSensitivity(new_sensitivity))
-        elif "decrease sensitivity" in command:
-            current_sensitivity = self.sensitivitySlider.get()
-            new_sensitivity = max(current_sensitivity - 1, 0)
-            self.after(0, lambda: self.sensitivitySlider.set(new_sensitivity))
-            self.after(0, lambda: self.updateSensitivity(new_sensitivity))
-        elif "exit" in command or "quit" in command:
-            self.after(0, self.cleanup)
-        elif "left click" in command:
-            self.after(0, lambda: self.mouse.left_click())
-            print("Performed left click")
-            self.after(0, lambda: self.webcam_area.configure(text="Left Click Performed"))
-        elif "right click" in command:
-            self.after(0, lambda: self.mouse.right_click())
-            print("Performed right click")
-            self.after(0, lambda: self.webcam_area.configure(text="Right Click Performed"))
-        elif "start typing" in command:
-            if not self.typing_mode:
-                self.typing_mode = True
-                print("Typing mode started. Speak text to type, or say 'stop typing' to end.")
-                self.after(0, lambda: self.webcam_area.configure(text="Typing Mode: ON"))
-        elif "stop typing" in command:
-            if self.typing_mode:
-                self.typing_mode = False
-                print("Typing mode stopped.")
-                self.after(0, lambda: self.webcam_area.configure(text="Typing Mode: OFF"))
-        elif self.typing_mode:
-            # If in typing mode, treat the command as text to type
-            print(f"Typing: {command}")
-            self.after(0, lambda: self.type_text(command))
-
+        match = self.commands.match(command)
+        if match is None:
+            print(f"Unknown command: {command}")
+            return
+        self.queue_command(match)
+
+    # handlers are queued for the Tk thread, see drainCommandQueue
+    def queue_command(self, match):
+        self.commandQueue.put((match.command.handler, tuple(match.args)))
+
+    # the only place queued voice commands run, always on the Tk thread
+    def drainCommandQueue(self):
+        while True:
+            try:
+                handler, args = self.commandQueue.get_nowait()
+            except queue.Empty:
+                break
+            try:
+                handler(*args)
+            except Exception as e:
+                print(f"Error running voice command: {e}")
+        self.after(self.COMMAND_POLL_MS, self.drainCommandQueue)
+
+    # VOICE COMMAND HANDLERS
+    # registered in __init__ through @voice_command, help text and grammar come from here
+
+    @voice_command("start webcam", description="Starts the webcam feed")
+    def startWebcamCommand(self):
+        self.countDown(self.countdown)
+
+    @voice_command("increase sensitivity", description="Increases sensitivity by 1")
+    def increaseSensitivityCommand(self):
+        self.setSensitivityCommand(self.sensitivitySlider.get() + 1)
+
+    @voice_command("decrease sensitivity", description="Decreases sensitivity by 1")
+    def decreaseSensitivityCommand(self):
+        self.setSensitivityCommand(self.sensitivitySlider.get() - 1)
+
+    @voice_command("sensitivity {n}", description="Sets sensitivity (0-10)")
+    def setSensitivityCommand(self, value):
+        new_sensitivity = min(max(value, 0), 10)
+        self.sensitivitySlider.set(new_sensitivity)
+        self.updateSensitivity(new_sensitivity)
+
+    @voice_command("exit", "quit", description="Closes the application", exact=True)
+    def exitCommand(self):
+        self.cleanup()
+
+    @voice_command("right click", description="(Right mouse click)")
+    def rightClickCommand(self):
+        self.mouse.right_click()
+        print("Performed right click")
+        self.webcam_area.configure(text="Right Click Performed")
+
+    @voice_command("left click", description="(Left mouse click)")
+    def leftClickCommand(self):
+        self.mouse.left_click()
+        print("Performed left click")
+        self.webcam_area.configure(text="Left Click Performed")
+
+    @voice_command("scroll up {n}", description="Scrolls up a few steps")
+    def scrollUpCommand(self, steps):
+        self.mouse.scroll(steps * self.VOICE_SCROLL_CLICKS)
+
+    @voice_command("scroll down {n}", description="Scrolls down a few steps")
+    def scrollDownCommand(self, steps):
+        self.mouse.scroll(-steps * self.VOICE_SCROLL_CLICKS)
+
+    @voice_command("start scrolling", "scroll mode", description="Tilt your head up/down to scroll")
+    def startScrollingCommand(self):
+        if self.engine is None:
+            print("Start the webcam before scrolling with your head.")
+            return
+        self.mouse.setScrollMode(True)
+        self.webcam_area.configure(text="Scroll Mode: ON")
+
+    @voice_command("stop scrolling", description="Ends scroll mode")
+    def stopScrollingCommand(self):
+        self.mouse.setScrollMode(False)
+        self.webcam_area.configure(text="Scroll Mode: OFF")
+
+    @voice_command("toggle scrolling")
+    def toggleScrollingCommand(self):
+        if self.mouse.scroll_mode:
+            self.stopScrollingCommand()
+        else:
+            self.startScrollingCommand()
+
+    @voice_command("start drag", description="Holds the left button down while you move")
+    def startDragCommand(self):
+        self.mouse.start_drag()
+        self.webcam_area.configure(text="Drag: ON")
+
+    @voice_command("stop drag", description="Releases the left button")
+    def stopDragCommand(self):
+        self.mouse.stop_drag()
+        self.webcam_area.configure(text="Drag: OFF")
+
+    @voice_command("toggle drag")
+    def toggleDragCommand(self):
+        if self.mouse.dragging:
+            self.stopDragCommand()
+        else:
+            self.startDragCommand()
+
+    @voice_command("hold shift", description="Keeps shift pressed until 'release keys'")
+    def holdShiftCommand(self):
+        self.mouse.hold_key("shift")
+
+    @voice_command("hold control", description="Keeps control pressed until 'release keys'")
+    def holdControlCommand(self):
+        self.mouse.hold_key("ctrl")
+
+    @voice_command("hold alt", description="Keeps alt pressed until 'release keys'")
+    def holdAltCommand(self):
+        self.mouse.hold_key("alt")
+
+    @voice_command("release keys", description="Releases held modifiers")
+    def releaseKeysCommand(self):
+        self.mouse.release_keys()
+
+    @voice_command("next monitor", "next screen", description="Keeps the cursor on the next monitor")
+    def nextMonitorCommand(self):
+        monitor = self.mouse.nextMonitor()
+        print(f"Cursor limited to {monitor}")
+        self.webcam_area.configure(text=f"Monitor: {monitor.name or 'next'}")
+
+    @voice_command("all monitors", "all screens", description="Lets the cursor reach every monitor")
+    def allMonitorsCommand(self):
+        self.mouse.setScreenSpan("desktop")
+        self.webcam_area.configure(text="Monitor: all")
+
+    @voice_command("start typing", description="Begins typing mode (speak to type; say 'new line', "
+                                                "'delete word', 'scratch that' or 'press enter' to edit)")
+    def startTypingCommand(self):
+        if not self.typing_mode:
+            self.typing_mode = True
+            self.speech.set_free_form(True)  # dictation needs the full vocabulary
+            print("Typing mode started. Speak text to type, or say 'stop typing' to end.")
+            self.webcam_area.configure(text="Typing Mode: ON")
+
+    @voice_command("stop typing", description="Ends typing mode", dictation=True)
+    def stopTypingCommand(self):
+        if self.typing_mode:
+            self.typing_mode = False
+            self.speech.set_free_form(False)
+            self.dictation.finish()
+            print("Typing mode stopped.")
+            self.webcam_area.configure(text="Typing Mode: OFF")
 
 
 def mainTest():
@@ -416,6 +577,8 @@ def mainTest():
         app.blinkIntervalClick = settings["blinkInterval"]
         app.sensitivity = settings["sensitivity"]
         app.countdown = settings["countdown"]
+        app.controlOnly = settings["controlOnly"]
+        app.mappingMode = settings["mappingMode"]
     else:
         app.destroy()
         return
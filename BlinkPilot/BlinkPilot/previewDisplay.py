@@ -0,0 +1,48 @@
+import cv2
+import numpy as np
+from PIL import Image, ImageTk
+
+
+# Shows processed frames in a label without per-frame allocations: each frame is
+# downscaled once into a preallocated buffer and pasted into one persistent
+# PhotoImage. Both are only rebuilt when the label or frame size changes.
+# Everything here runs on the Tk thread.
+class PreviewDisplay:
+    def __init__(self, label):
+        self.label = label
+        self.buffer = None  # downscaled RGB frame
+        self.rgba_buffer = None  # PIL only shares memory with 4-channel buffers
+        self.buffer_image = None  # PIL view onto rgba_buffer, no copy
+        self.photo = None
+        self.frame_shape = None
+        self.label_size = None
+
+    def show(self, frame):
+        self.__fit(frame.shape)
+        h, w = self.buffer.shape[:2]
+        if frame.shape[:2] == (h, w):
+            cv2.cvtColor(frame, cv2.COLOR_RGB2RGBA, dst=self.rgba_buffer)
+        else:
+            cv2.resize(frame, (w, h), dst=self.buffer, interpolation=cv2.INTER_AREA)
+            cv2.cvtColor(self.buffer, cv2.COLOR_RGB2RGBA, dst=self.rgba_buffer)
+        self.photo.paste(self.buffer_image)
+
+    def __fit(self, frame_shape):
+        label_size = (self.label.winfo_width(), self.label.winfo_height())
+        if self.photo is not None and frame_shape == self.frame_shape and label_size == self.label_size:
+            return
+        self.frame_shape = frame_shape
+        self.label_size = label_size
+
+        # largest size that keeps the frame's aspect ratio inside the label, never upscaled
+        frame_h, frame_w = frame_shape[:2]
+        label_w, label_h = max(1, label_size[0]), max(1, label_size[1])
+        scale = min(1.0, label_w / frame_w, label_h / frame_h)
+        w, h = max(1, round(frame_w * scale)), max(1, round(frame_h * scale))
+
+        self.buffer = np.zeros((h, w, 3), dtype=np.uint8)
+        self.rgba_buffer = np.full((h, w, 4), 255, dtype=np.uint8)
+        self.buffer_image = Image.frombuffer("RGBA", (w, h), self.rgba_buffer, "raw", "RGBA", 0, 1)
+        self.photo = ImageTk.PhotoImage("RGBA", (w, h))
+        self.label.configure(image=self.photo)
+        self.label.imgtk = self.photo  # keep a reference, Tk does not